@@ -5,103 +5,33 @@
 # Enfin, Copilot a aussi été utilisé pour mieux comprendre les différentes fonctions et commentaires présents dans le code. »
 
 
-from machine import Pin, PWM, I2C, UART
-import time
 
-# Configuration PWM
-pwm_out = PWM(Pin(16)) # pwm output sur la pin 16
-pwm_out.freq(1000)  # Fréquence 1kHz
+from station import Config, make_station
+from pico_async import duty_range
+
+DUAL_CORE = False # Échantillonnage de l'ADC sur le second coeur (dual_core.py)
+ADC_FILTER = "avg:8" # Filtre des lectures (adc_filter.py) : "none", "decim:16", "avg:8", "median:5", "iir:3"
+ASYNC_MODE = True # Tâches coopératives (pico_async.py) si le protocole binaire est négocié
+ADAPTIVE_STEP = True # Pas suivant dès que la mesure est stabilisée et confirmée par Pico 2 (sinon toutes les 3 s)
+STEP_TIMEOUT_MS = 3000 # Durée maximale d'un pas
+CALIBRATE = False # Balayage de calibration au démarrage, enregistré dans CALIBRATION_FILE (mode binaire)
+FAST_SWEEP = False # Balayage rapide de SWEEP_DUTIES au démarrage (courbe de transfert complète, mode binaire)
+SWEEP_DUTIES = duty_range(0, 100, 0.5)
+BAUD_NEGOTIATION = True # Essai de vitesses UART plus élevées après la négociation du protocole binaire (baud.py)
+RELIABLE_WINDOW = 0 # Transport fiable (transport.py) en mode ASYNC_MODE : trames non acquittées au plus, 0 sans ; même valeur sur Pico 2
+BATCH_SAMPLES = 0 # Réception des lots de mesures de Pico 2 (batch.py) en mode ASYNC_MODE : non nul si BATCH_SAMPLES l'est sur Pico 2
+TIMER_TICKS = True # Échantillonnage ADC et pas fixes cadencés par machine.Timer (ticker.py), gigue affichée
+I2C_PROBE = True # Fréquence I2C la plus rapide sans erreur de relecture (i2c_speed.py), 100 kHz sinon
+
+# Câblage de la carte d'extension (défauts de Config) : PWM sur GP16 à 1 kHz, UART 1 (GP8/GP9) à 115200 bauds,
+# ADS1015 (0x48) sur l'I2C 1 (GP15/GP14), tension filtrée sur AIN2 ; le code commun est dans station.py
+station = make_station(Config("generator", dual_core=DUAL_CORE, adc_filter=ADC_FILTER, async_mode=ASYNC_MODE,
+                              adaptive_step=ADAPTIVE_STEP, step_ms=STEP_TIMEOUT_MS, calibrate=CALIBRATE,
+                              fast_sweep=FAST_SWEEP, sweep_duties=SWEEP_DUTIES, baud_negotiation=BAUD_NEGOTIATION,
+                              reliable_window=RELIABLE_WINDOW, batch_samples=BATCH_SAMPLES, timer_ticks=TIMER_TICKS, i2c_probe=I2C_PROBE))
 
-# Configuration UART (canal UART= 1 pour notre carte d'extension)
-uart = UART(1, baudrate=115200, tx=Pin(8), rx=Pin(9)) #UART canal 1, vitesse de transmission 115200 bauds
-
-# Configuration I2C pour ADS1015(Ligne Horloge et données)
-i2c = I2C(1, scl=Pin(15), sda=Pin(14), freq=100000) #I2C canal 1
-ADS1015_ADDR = 0x48 #Convertisseur anlogique numérique ADS1015 "Hexa" 72 en decimal
-
-def read_ads1015_ain2():
-    """Lecture de la tension filtrée sur AIN2"""
-    try:
-        config = 0xE283  # AIN2, ±4.096V #Configuration de l'ADS1015 pour lire le canal AIN2
-        i2c.writeto_mem(ADS1015_ADDR, 0x01, config.to_bytes(2, 'big'))#Congiguration de l'ADS1015 pour lire le canal AIN2
-        time.sleep_ms(50)#Attente de la conversion
-        data = i2c.readfrom_mem(ADS1015_ADDR, 0x00, 2)#Lecture des données converties
-        raw = int.from_bytes(data, 'big') >> 4 #Conversion des données brutes
-        if raw > 2047:
-            raw -= 4096
-        return raw * 4.096 / 2048
-    except Exception as e: #    Gestion des erreurs de communication I2C
-        print(f"Erreur ADC: {e}")# Affichage de l'erreur
-        return 0
-
-def set_pwm_duty(duty_cycle):
-    """Définit le rapport cyclique PWM et envoie la valeur théorique"""
-    duty = int(max(0, min(100, duty_cycle)) * 65535 / 100)# Conversion du pourcentage en valeur 16 bits
-    pwm_out.duty_u16(duty)# Définition du duty cycle PWM
-    # Envoi de la valeur théorique à Pico 2
-    uart.write(f"TH:{duty_cycle:.1f}\n")# Envoi de la consigne théorique via UART
-    return duty_cycle #Retourne la valeur du duty cycle définie
-
-def calculate_real_duty(voltage):
-    """Calcule le rapport cyclique réel à partir de la tension"""
-    return max(0, min(100, (voltage / 3.3) * 100)) #Calcul du duty cycle réel en pourcentage
-
-def read_uart_measurement():
-    """Lit les mesures envoyées par Pico 2"""
-    if uart.any():# Vérifie si des données sont disponibles sur l'UART
-        try:
-            data = uart.readline().decode().strip() #type:ignore # Lecture et décodage de la ligne reçue
-            if data.startswith("ME:"):# Vérifie le format des données reçues
-                parts = data.split(":") # Sépare les différentes parties du message
-                received_duty = float(parts[1]) # Récupère la valeur théorique envoyée
-                measured_duty = float(parts[2]) # Récupère la valeur mesurée envoyée
-                error = float(parts[3]) # Récupère l'erreur envoyée
-                return received_duty, measured_duty, error # Retourne les valeurs extraites
-        except Exception as e:  # Gestion des erreurs de lecture ou de format
-            print(f"Erreur lecture UART: {e}")
-    return None, None, None
-
-    #En-tête du tableau des résultats
 def main():
-    print("=== Pico 1 - Générateur PWM Principal ===")
-    print("Duty | Tension | Réel | Erreur Pico2")
-    print("-" * 45) 
-    
-    # Séquence de tests des rapports cycliques
-    test_sequence = [0, 10, 25, 50, 75, 90, 100]
-    current_index = 0
-    last_change = time.time()
-
-    # Boucle principale
-    while True:
-        current_time = time.time()
-        
-        # Changement du duty cycle toutes les 3 secondes
-        if current_time - last_change > 3:
-            duty_cycle = test_sequence[current_index]
-            
-            # 1. Génération du signal PWM
-            set_pwm_duty(duty_cycle)
-            time.sleep(0.1)  # Stabilisation du filtre RC
-            
-            # 2. Mesure locale de la tension filtrée
-            voltage = read_ads1015_ain2()
-            real_duty_local = calculate_real_duty(voltage)
-            
-            # 3. Réception des mesures de Pico 2
-            received_duty, measured_duty, error_pico2 = read_uart_measurement()
-            
-            # 4. Affichage des résultats
-            if received_duty is not None:
-                print(f"{duty_cycle:3.0f}% | {voltage:6.2f}V | {real_duty_local:4.1f}% | Erreur Pico2: {error_pico2:+.1f}%")
-            else:
-                print(f"{duty_cycle:3.0f}% | {voltage:6.2f}V | {real_duty_local:4.1f}% | En attente Pico2...")
-            
-            # Passage au duty cycle suivant
-            current_index = (current_index + 1) % len(test_sequence)
-            last_change = current_time
-        
-        time.sleep(0.1)
+    station.main()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
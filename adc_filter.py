@@ -0,0 +1,222 @@
+# Filtrage numérique des codes de l'ADS1015 (suréchantillonnage, moyenne glissante,
+# médiane, IIR du premier ordre). Tout le calcul se fait sur des entiers, dans des
+# tampons alloués une fois ; la valeur filtrée est un entier en 1/16 de code
+# (FRAC_BITS bits fractionnaires).
+#
+# Choix du filtre par carte : ADC_FILTER = "avg:8" dans le script, puis
+# adc = FilteredADC(adc, make_filter(ADC_FILTER)). Chaque lecture filtrée lit
+# `window` conversions neuves : on échange explicitement du temps contre de la précision.
+#
+# Réglage      Lectures  Durée à 3300 ech/s  Bits effectifs (bruit blanc)  Remarques
+# none         1         0,3 ms              12                            l'ondulation PWM passe telle quelle
+# decim:N      N         N x 0,3 ms          12 + log4(N)  (N=16 : 14)     une sortie par bloc de N
+# avg:N        N         N x 0,3 ms          12 + log4(N)                  en continu (update) : retard (N-1)/2 éch
+# median:N     N         N x 0,3 ms          ≈ 12 + log4(0,64 N)           rejette les valeurs aberrantes
+# iir:K        2^(K+1)   2^(K+1) x 0,3 ms    12 + ½ log2(2^(K+1) - 1)      constante de temps 2^K éch
+#
+# Les bits supplémentaires supposent un bruit d'au moins un code ; l'ondulation PWM
+# (1 kHz) n'est annulée que si la fenêtre couvre un nombre entier de périodes
+# (33 échantillons à 3300 ech/s = 10 périodes). Sur le bus I2C à 100 kHz, chaque
+# lecture coûte en plus ~0,5 ms de transfert.
+
+import math
+from array import array
+
+from ads1015 import raw_to_voltage, raw_to_mv
+
+FRAC_BITS = 4 # Bits fractionnaires de la valeur filtrée
+_ONE = 1 << FRAC_BITS
+_LOG4 = math.log(4)
+
+
+class _Filter:
+    window = 1 # Conversions neuves nécessaires pour une valeur filtrée complète
+
+    def info(self, period_us=303):
+        """Lectures, durée et bits effectifs pour une conversion toutes les period_us"""
+        return {'reads': self.window, 'latency_us': self.window * period_us, 'bits': 12 + self.extra_bits()}
+
+    def voltage(self, pga):
+        return raw_to_voltage(self.value / _ONE, pga)
+
+
+class Decimator(_Filter):
+    """Suréchantillonnage : moyenne de blocs de n lectures, une sortie par bloc"""
+
+    def __init__(self, n=16):
+        self.window = n
+        self.reset()
+
+    def reset(self):
+        self.value = 0
+        self._sum = 0
+        self._count = 0
+
+    def update(self, raw):
+        """Ajoute une lecture ; vrai quand un bloc est complet (nouvelle valeur)"""
+        self._sum += raw
+        self._count += 1
+        if self._count < self.window:
+            return False
+        self.value = (self._sum << FRAC_BITS) // self.window
+        self._sum = 0
+        self._count = 0
+        return True
+
+    def extra_bits(self):
+        return math.log(self.window) / _LOG4
+
+
+class MovingAverage(_Filter):
+    """Moyenne glissante sur les n dernières lectures (somme courante, tampon circulaire)"""
+
+    def __init__(self, n=8):
+        self.window = n
+        self._ring = array('h', bytes(2 * n))
+        self.reset()
+
+    def reset(self):
+        self.value = 0
+        self._sum = 0
+        self._count = 0
+        self._index = 0
+
+    def update(self, raw):
+        ring = self._ring
+        index = self._index
+        if self._count < self.window:
+            self._count += 1
+        else:
+            self._sum -= ring[index]
+        ring[index] = raw
+        self._sum += raw
+        self._index = index + 1 if index + 1 < self.window else 0
+        self.value = (self._sum << FRAC_BITS) // self._count
+        return True
+
+    def extra_bits(self):
+        return math.log(self.window) / _LOG4
+
+
+class Median(_Filter):
+    """Médiane des n dernières lectures (n impair) ; fenêtre triée tenue à jour par insertion"""
+
+    def __init__(self, n=5):
+        if n % 2 == 0:
+            raise ValueError(f"Taille de médiane paire: {n}")
+        self.window = n
+        self._ring = array('h', bytes(2 * n))
+        self._sorted = array('h', bytes(2 * n))
+        self.reset()
+
+    def reset(self):
+        self.value = 0
+        self._count = 0
+        self._index = 0
+
+    def update(self, raw):
+        ring = self._ring
+        ordered = self._sorted
+        count = self._count
+        if count == self.window: # Retire la plus ancienne lecture de la fenêtre triée
+            old = ring[self._index]
+            i = 0
+            while ordered[i] != old:
+                i += 1
+            while i < count - 1:
+                ordered[i] = ordered[i + 1]
+                i += 1
+            count -= 1
+        i = count # Insertion triée de la nouvelle lecture
+        while i > 0 and ordered[i - 1] > raw:
+            ordered[i] = ordered[i - 1]
+            i -= 1
+        ordered[i] = raw
+        self._count = count + 1
+        ring[self._index] = raw
+        self._index = self._index + 1 if self._index + 1 < self.window else 0
+        self.value = ordered[self._count // 2] << FRAC_BITS
+        return True
+
+    def extra_bits(self):
+        return max(0.0, math.log(0.64 * self.window) / _LOG4) # Efficacité de la médiane ≈ 2/π
+
+
+class IIR(_Filter):
+    """Passe-bas du premier ordre y += (x - y) / 2**shift (constante de temps 2**shift lectures)"""
+
+    def __init__(self, shift=3):
+        self.shift = shift
+        self.window = 2 << shift
+        self.reset()
+
+    def reset(self):
+        self.value = 0
+        self._primed = False
+
+    def update(self, raw):
+        x = raw << FRAC_BITS
+        if not self._primed: # Première lecture : pas de montée depuis zéro
+            self.value = x
+            self._primed = True
+        elif self.shift:
+            self.value += (x - self.value + (1 << (self.shift - 1))) >> self.shift # Arrondi au plus proche
+        else:
+            self.value = x
+        return True
+
+    def extra_bits(self):
+        return 0.5 * math.log((2 << self.shift) - 1) / math.log(2)
+
+
+FILTERS = {'none': lambda n=1: Decimator(1), 'decim': Decimator, 'avg': MovingAverage, 'median': Median, 'iir': IIR}
+
+
+def make_filter(spec):
+    """Filtre décrit par "type:paramètre" ("none", "decim:16", "avg:8", "median:5", "iir:3")"""
+    name, _, param = spec.partition(":")
+    factory = FILTERS.get(name)
+    if factory is None:
+        raise ValueError(f"Filtre ADC inconnu: {spec}")
+    return factory(int(param)) if param else factory()
+
+
+class FilteredADC:
+    """ADC dont chaque lecture passe par un filtre (mêmes read_raw, read_voltage, pga que ADS1015).
+
+    Chaque lecture repart d'un filtre vide et lit filter.window conversions neuves,
+    par lots (read_into) quand l'ADC le permet ; read_raw() rend un code fractionnaire.
+    read_next() reste la lecture brute (détection de la stabilisation, settle.py).
+    """
+
+    def __init__(self, adc, filter):
+        self.adc = adc
+        self.filter = filter
+        self.pga = adc.pga
+        self.read_next = adc.read_next if hasattr(adc, 'read_next') else adc.read_raw
+        self._block = array('h', bytes(2 * filter.window))
+
+    def read_raw(self):
+        return self.read_q4() / _ONE
+
+    def read_q4(self):
+        """Valeur filtrée entière en 1/16 de code (chaîne en virgule fixe, fixed.py)"""
+        filt = self.filter
+        filt.reset()
+        block = self._block
+        if hasattr(self.adc, 'read_into'):
+            self.adc.read_into(block)
+        else: # ADC sans lecture par lots : un échantillon neuf à la fois
+            read = self.read_next
+            for i in range(len(block)):
+                block[i] = read()
+        for raw in block:
+            filt.update(raw)
+        return filt.value
+
+    def read_voltage(self):
+        return raw_to_voltage(self.read_raw(), self.pga)
+
+    def read_mv(self):
+        """Tension filtrée en millivolts entiers"""
+        return raw_to_mv(self.read_q4(), self.pga, FRAC_BITS)
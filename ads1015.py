@@ -0,0 +1,291 @@
+# Pilote ADS1015 en mode conversion continue.
+# L'ancienne lecture (read_ads1015_ain2) réécrivait le registre de configuration,
+# attendait 50 ms puis lisait le résultat, soit moins de 20 mesures/s.
+# Ici la puce est configurée une seule fois en mode continu et on ne lit ensuite
+# que le registre de conversion, dès qu'une nouvelle conversion est prête.
+
+from compat import const, ticks_us, ticks_diff, ticks_add, sleep_us
+
+ADS1015_ADDR = const(0x48) # Adresse par défaut (broche ADDR à GND)
+
+# Registres
+REG_CONVERSION = const(0x00)
+REG_CONFIG = const(0x01)
+REG_LO_THRESH = const(0x02)
+REG_HI_THRESH = const(0x03)
+
+# Multiplexeur d'entrée (bits 14:12)
+MUX_AIN0_AIN1 = const(0x0000)
+MUX_AIN0_AIN3 = const(0x1000)
+MUX_AIN1_AIN3 = const(0x2000)
+MUX_AIN2_AIN3 = const(0x3000)
+MUX_AIN0 = const(0x4000)
+MUX_AIN1 = const(0x5000)
+MUX_AIN2 = const(0x6000)
+MUX_AIN3 = const(0x7000)
+
+# Gain de l'amplificateur (bits 11:9)
+PGA_6_144 = const(0x0000)
+PGA_4_096 = const(0x0200)
+PGA_2_048 = const(0x0400)
+PGA_1_024 = const(0x0600)
+PGA_0_512 = const(0x0800)
+PGA_0_256 = const(0x0A00)
+
+OS_SINGLE = const(0x8000) # Écriture : démarre une conversion / Lecture : 1 = au repos
+MODE_SINGLE = const(0x0100) # 0 = conversion continue
+COMP_QUE_DISABLE = const(0x0003) # Comparateur et broche ALERT/RDY désactivés
+COMP_QUE_1 = const(0x0000) # ALERT/RDY active après chaque conversion
+
+# Pleine échelle (V) selon le code PGA
+FULL_SCALE = {
+    PGA_6_144: 6.144,
+    PGA_4_096: 4.096,
+    PGA_2_048: 2.048,
+    PGA_1_024: 1.024,
+    PGA_0_512: 0.512,
+    PGA_0_256: 0.256,
+}
+
+# Pleine échelle en millivolts (calcul entier, raw_to_mv)
+FULL_SCALE_MV = {
+    PGA_6_144: 6144,
+    PGA_4_096: 4096,
+    PGA_2_048: 2048,
+    PGA_1_024: 1024,
+    PGA_0_512: 512,
+    PGA_0_256: 256,
+}
+
+# Débit de conversion (échantillons/s) -> bits 7:5
+DATA_RATES = {
+    128: 0x0000,
+    250: 0x0020,
+    490: 0x0040,
+    920: 0x0060,
+    1600: 0x0080,
+    2400: 0x00A0,
+    3300: 0x00C0,
+}
+
+# L'oscillateur interne peut dériver de ±10 %, on attend donc un peu plus d'une période
+RATE_MARGIN_PCT = const(10)
+READY_TIMEOUT_PERIODS = const(4) # Sans conversion prête après ce nombre de périodes : broche ou puce muette
+ETIMEDOUT = const(110) # Code d'erreur de MicroPython (errno.ETIMEDOUT)
+
+
+def raw_to_voltage(raw, pga=PGA_4_096):
+    """Convertit un code brut 12 bits signé en tension"""
+    return raw * FULL_SCALE[pga] / 2048
+
+
+def raw_to_mv(raw, pga=PGA_4_096, frac_bits=0):
+    """Code brut (entier, frac_bits bits fractionnaires) -> millivolts entiers, arrondis, sans flottant"""
+    shift = 11 + frac_bits
+    return (raw * FULL_SCALE_MV[pga] + (1 << (shift - 1))) >> shift
+
+
+class ADS1015:
+    """Convertisseur ADS1015 configuré une fois en mode continu.
+
+    La configuration (canal, gain, débit) est écrite à la première lecture ou
+    par start(). Si la broche ALERT/RDY est câblée (rdy_pin), elle est utilisée
+    en mode "conversion prête" via une interruption. Sinon on cadence les
+    lectures sur la période de conversion mesurée avec ticks_us.
+    Compteurs : read_us et read_max_us, durée de la dernière et de la plus longue
+    transaction I2C de lecture d'une conversion (limite le débit avant la puce à fréquence basse) ;
+    missed (conversions écrasées avant d'être lues) et stale (lectures qui ont pu rendre la même
+    conversion que la précédente). Exacts avec rdy_pin ; sans broche, la puce n'indique pas
+    qu'une conversion est prête en mode continu : ils sont estimés au débit nominal, d'après le
+    temps écoulé entre deux lectures (dérive de l'oscillateur de la puce non comprise).
+    """
+
+    def __init__(self, i2c, address=ADS1015_ADDR, mux=MUX_AIN2, pga=PGA_4_096, rate=3300, rdy_pin=None):
+        if rate not in DATA_RATES:
+            raise ValueError(f"Debit ADS1015 invalide: {rate}")
+        self.i2c = i2c
+        self.address = address
+        self.rdy_pin = rdy_pin
+        self.mux = mux
+        self.pga = pga
+        self.rate = rate
+        self.config = 0
+        self.period_us = 0
+        self.configured = False
+        self._due = 0
+        self._ready = 0
+        self.read_us = 0
+        self.read_max_us = 0
+        self.missed = 0
+        self.stale = 0
+        self._last_us = 0 # Dernière lecture (ou écriture de la configuration)
+        self._phase = 0 # Reste de l'estimation des conversions terminées, en µs x débit
+        # Tampons préalloués : aucune allocation dans la boucle de mesure
+        self._buf = bytearray(2) # Lecture des registres
+        self._wbuf = bytearray(2) # Écriture des seuils
+        self._cfg = bytearray(2) # Configuration mise en cache
+        if rdy_pin is not None:
+            rdy_pin.irq(trigger=rdy_pin.IRQ_FALLING, handler=self._on_ready)
+
+    def _on_ready(self, pin):
+        # Interruption ALERT/RDY : une nouvelle conversion est disponible
+        self._ready += 1
+
+    def _write_reg(self, reg, value):
+        buf = self._wbuf
+        buf[0] = value >> 8
+        buf[1] = value & 0xFF
+        self.i2c.writeto_mem(self.address, reg, buf)
+
+    def _read_reg(self, reg):
+        buf = self._buf
+        self.i2c.readfrom_mem_into(self.address, reg, buf)
+        return buf[0] << 8 | buf[1]
+
+    def _set_config(self, config):
+        # Écrit la configuration depuis le tampon en cache
+        cfg = self._cfg
+        cfg[0] = config >> 8
+        cfg[1] = config & 0xFF
+        self.i2c.writeto_mem(self.address, REG_CONFIG, cfg)
+
+    def start(self, mux=None, pga=None, rate=None):
+        """Configure la puce en conversion continue (une seule écriture)"""
+        if mux is not None:
+            self.mux = mux
+        if pga is not None:
+            self.pga = pga
+        if rate is not None:
+            if rate not in DATA_RATES:
+                raise ValueError(f"Debit ADS1015 invalide: {rate}")
+            self.rate = rate
+        comp = COMP_QUE_DISABLE
+        if self.rdy_pin is not None:
+            # Mode "conversion prête" : seuil haut MSB=1, seuil bas MSB=0
+            self._write_reg(REG_HI_THRESH, 0x8000)
+            self._write_reg(REG_LO_THRESH, 0x0000)
+            comp = COMP_QUE_1
+        self.config = self.mux | self.pga | DATA_RATES[self.rate] | comp
+        self.period_us = 1000000 * (100 + RATE_MARGIN_PCT) // (100 * self.rate)
+        self._ready = 0
+        self._set_config(self.config)
+        # La première conversion se termine une période après l'écriture
+        now = ticks_us()
+        self._due = ticks_add(now, self.period_us)
+        self._last_us = now
+        self._phase = 0
+        self.configured = True
+
+    def ready(self):
+        """Indique si une nouvelle conversion est disponible"""
+        if self.rdy_pin is not None:
+            return self._ready > 0
+        return ticks_diff(ticks_us(), self._due) >= 0
+
+    def _timeout_us(self):
+        return READY_TIMEOUT_PERIODS * 1000000 * (100 + RATE_MARGIN_PCT) // (100 * self.rate)
+
+    def wait_ready(self):
+        """Attend (par scrutation) la prochaine conversion ; OSError si ALERT/RDY ne signale rien à temps"""
+        if self.rdy_pin is not None:
+            start = ticks_us()
+            timeout = self._timeout_us()
+            while self._ready == 0:
+                if ticks_diff(ticks_us(), start) > timeout:
+                    self.configured = False # Puce peut-être réinitialisée : configuration réécrite à la prochaine lecture
+                    raise OSError(ETIMEDOUT)
+            self.missed += self._ready - 1 # Fronts comptés depuis la dernière lecture
+            self._ready = 0
+            return
+        remaining = ticks_diff(self._due, ticks_us())
+        if remaining > 0:
+            # Une seule attente plutôt qu'une boucle de lectures d'horloge : sur la Pico, sleep_us
+            # attend lui-même sur le compteur matériel (même précision) ; dans le simulateur,
+            # chaque lecture d'horloge est un appel Python et la boucle ralentissait tout
+            sleep_us(remaining)
+        now = ticks_us()
+        # Prochaine lecture une période (marge comprise) après celle-ci : au moins
+        # une nouvelle conversion se sera terminée entre deux lectures
+        self._due = ticks_add(now, self.period_us)
+
+    def _count(self, now):
+        # Sans rdy_pin : conversions terminées (débit nominal) depuis la lecture précédente
+        phase = self._phase + ticks_diff(now, self._last_us) * self.rate
+        done = phase // 1000000
+        self._phase = phase - done * 1000000
+        self._last_us = now
+        if done == 0:
+            self.stale += 1
+        elif done > 1:
+            self.missed += done - 1
+
+    def read_raw(self):
+        """Lit la prochaine conversion (code 12 bits signé)"""
+        if not self.configured:
+            self.start()
+        self.wait_ready()
+        start = ticks_us()
+        try:
+            raw = self._read_reg(REG_CONVERSION) >> 4
+        except OSError:
+            self.configured = False # On reconfigure la puce à la prochaine lecture
+            raise
+        elapsed = ticks_diff(ticks_us(), start)
+        self.read_us = elapsed
+        if elapsed > self.read_max_us:
+            self.read_max_us = elapsed
+        if self.rdy_pin is None:
+            self._count(start)
+        if raw > 2047:
+            raw -= 4096
+        return raw
+
+    def read_into(self, samples, n=None):
+        """Remplit samples (array('h') préalloué) avec n conversions successives, sans allocation"""
+        if n is None:
+            n = len(samples)
+        if not self.configured:
+            self.start()
+        i2c = self.i2c
+        address = self.address
+        buf = self._buf
+        try:
+            for i in range(n):
+                self.wait_ready()
+                start = ticks_us()
+                i2c.readfrom_mem_into(address, REG_CONVERSION, buf)
+                elapsed = ticks_diff(ticks_us(), start)
+                self.read_us = elapsed
+                if elapsed > self.read_max_us:
+                    self.read_max_us = elapsed
+                if self.rdy_pin is None:
+                    self._count(start)
+                raw = (buf[0] << 8 | buf[1]) >> 4
+                if raw > 2047:
+                    raw -= 4096
+                samples[i] = raw
+        except OSError:
+            self.configured = False
+            raise
+        return n
+
+    def read_voltage(self):
+        """Lit la prochaine conversion en volts"""
+        return raw_to_voltage(self.read_raw(), self.pga)
+
+    def read_single(self, mux=None):
+        """Conversion unique : démarre puis scrute le bit OS au lieu d'un délai fixe (OSError si elle ne finit pas)"""
+        if mux is None:
+            mux = self.mux
+        config = OS_SINGLE | mux | self.pga | MODE_SINGLE | DATA_RATES[self.rate] | COMP_QUE_DISABLE
+        self._set_config(config)
+        self.configured = False # La puce n'est plus en mode continu
+        start = ticks_us()
+        timeout = self._timeout_us()
+        while not self._read_reg(REG_CONFIG) & OS_SINGLE:
+            if ticks_diff(ticks_us(), start) > timeout:
+                raise OSError(ETIMEDOUT)
+        raw = self._read_reg(REG_CONVERSION) >> 4
+        if raw > 2047:
+            raw -= 4096
+        return raw
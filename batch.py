@@ -0,0 +1,158 @@
+# Envoi des mesures par lots : une trame pour plusieurs échantillons.
+# Une trame ME par consigne (ou une ligne "S...E" par mesure dans Test_5/6) coûte
+# à chaque échantillon l'en-tête, le CRC et un appel à uart.write. Ici, la carte
+# qui mesure range ses échantillons (int16) dans une trame préallouée et l'envoie
+# quand elle contient max_samples échantillons, ou quand le plus ancien attend
+# depuis max_age_ms : le premier seuil fixe le débit, le second borne la latence.
+#
+# Trame TYPE_BATCH :
+#   SYNC | TYPE_BATCH | SEQ | LEN | indice du 1er échantillon (u16) | âge du 1er (ms, u16) | n x int16 | CRC-8
+# L'indice (compteur d'échantillons modulo 65536) permet au récepteur de compter
+# les échantillons perdus avec les trames corrompues.
+
+from array import array
+import struct
+
+from compat import ticks_ms, ticks_diff
+from protocol import TYPE_BATCH, HEADER_SIZE, BATCH_MAX_PAYLOAD, finish_frame
+
+BATCH_HEADER = "<HH"
+BATCH_HEADER_SIZE = 4
+MAX_SAMPLES = (BATCH_MAX_PAYLOAD - BATCH_HEADER_SIZE) // 2 # 60 échantillons par trame
+
+
+class BatchWriter:
+    """Accumule des échantillons int16 et les envoie par trames TYPE_BATCH.
+
+    write(frame) transmet une trame (uart.write, ou la file d'émission d'un
+    runtime). Compteurs : batches, samples, bytes_sent.
+    """
+
+    def __init__(self, write, max_samples=MAX_SAMPLES, max_age_ms=50):
+        if not 0 < max_samples <= MAX_SAMPLES:
+            raise ValueError(f"Taille de lot invalide: {max_samples}")
+        self.write = write
+        self.max_samples = max_samples
+        self.max_age_ms = max_age_ms
+        self._buf = bytearray(HEADER_SIZE + BATCH_HEADER_SIZE + 2 * max_samples + 1)
+        self._count = 0
+        self._first_ms = 0
+        self.index = 0 # Indice du prochain échantillon
+        self.seq = 0
+        self.batches = 0
+        self.samples = 0
+        self.bytes_sent = 0
+
+    def add(self, value, now=None):
+        """Ajoute un échantillon ; envoie le lot s'il est plein"""
+        if not self._count:
+            self._first_ms = ticks_ms() if now is None else now
+        struct.pack_into("<h", self._buf, HEADER_SIZE + BATCH_HEADER_SIZE + 2 * self._count, value)
+        self._count += 1
+        self.index = (self.index + 1) & 0xFFFF
+        if self._count >= self.max_samples:
+            self.flush(now)
+
+    def poll(self, now=None):
+        """Envoie le lot en cours si son plus ancien échantillon a max_age_ms ; True si un lot est parti"""
+        if not self._count:
+            return False
+        if now is None:
+            now = ticks_ms()
+        if ticks_diff(now, self._first_ms) < self.max_age_ms:
+            return False
+        self.flush(now)
+        return True
+
+    def flush(self, now=None):
+        """Envoie le lot en cours, même incomplet"""
+        count = self._count
+        if not count:
+            return
+        if now is None:
+            now = ticks_ms()
+        buf = self._buf
+        age = min(0xFFFF, max(0, ticks_diff(now, self._first_ms)))
+        struct.pack_into(BATCH_HEADER, buf, HEADER_SIZE, (self.index - count) & 0xFFFF, age)
+        size = finish_frame(buf, TYPE_BATCH, self.seq, BATCH_HEADER_SIZE + 2 * count)
+        self.seq = (self.seq + 1) & 0xFF
+        self._count = 0
+        self.batches += 1
+        self.samples += count
+        self.bytes_sent += size
+        self.write(memoryview(buf)[:size])
+
+    def pending(self):
+        """Échantillons en attente dans le lot en cours"""
+        return self._count
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'samples': self.samples,
+            'bytes_sent': self.bytes_sent,
+        }
+
+
+def unpack_batch(buf, out, start=0):
+    """Décode les échantillons d'une trame TYPE_BATCH dans out[start:] (array 'h', circulaire) ;
+    retourne (indice du 1er échantillon, âge en ms, nombre d'échantillons)"""
+    first, age = struct.unpack_from(BATCH_HEADER, buf, HEADER_SIZE)
+    count = (buf[3] - BATCH_HEADER_SIZE) >> 1
+    size = len(out)
+    offset = HEADER_SIZE + BATCH_HEADER_SIZE
+    for i in range(count):
+        value = buf[offset] | buf[offset + 1] << 8
+        out[(start + i) % size] = value - 0x10000 if value & 0x8000 else value
+        offset += 2
+    return first, age, count
+
+
+class BatchReader:
+    """Reçoit les lots dans un tampon circulaire d'échantillons (array 'h', sans allocation).
+
+    Compteurs : batches, samples, lost (échantillons manquants d'après les
+    indices), age_ms et age_max_ms (âge du plus ancien échantillon d'un lot à son
+    envoi : dernier lot et maximum).
+    """
+
+    def __init__(self, capacity=1024):
+        self.samples_buf = array('h', bytes(2 * capacity))
+        self._head = 0 # Emplacement du prochain échantillon reçu
+        self._next_index = None
+        self.batches = 0
+        self.samples = 0
+        self.lost = 0
+        self.age_ms = 0
+        self.age_max_ms = 0
+
+    def on_frame(self, buf):
+        """Range les échantillons d'une trame TYPE_BATCH ; retourne leur nombre"""
+        first, age, count = unpack_batch(buf, self.samples_buf, self._head)
+        if self._next_index is not None:
+            gap = (first - self._next_index) & 0xFFFF
+            if gap < 0x8000: # Sinon : lot en double ou ancien, compté comme reçu
+                self.lost += gap
+        self._next_index = (first + count) & 0xFFFF
+        self._head = (self._head + count) % len(self.samples_buf)
+        self.batches += 1
+        self.samples += count
+        self.age_ms = age
+        if age > self.age_max_ms:
+            self.age_max_ms = age
+        return count
+
+    def last(self, n=1):
+        """n derniers échantillons reçus, du plus ancien au plus récent"""
+        buf = self.samples_buf
+        size = len(buf)
+        n = min(n, self.samples, size)
+        return [buf[(self._head - n + i) % size] for i in range(n)]
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'samples': self.samples,
+            'lost': self.lost,
+            'age_max_ms': self.age_max_ms,
+        }
@@ -0,0 +1,271 @@
+# Négociation de la vitesse UART entre les deux Pico, et repli si la liaison se dégrade.
+# Les deux cartes démarrent à BASE_BAUD (115200 bauds, ~11,5 ko/s). Une fois le
+# protocole binaire négocié, Pico 1 essaie les vitesses de BAUD_RATES dans l'ordre :
+#   1. BAUD (vitesse) à la vitesse courante ; Pico 2 répond BAUD_ACK puis change de vitesse
+#   2. Pico 1 change à son tour et envoie `patterns` motifs de test PATTERN (octets
+#      0x00/0xFF/0x55/0xAA, SYNC...), que Pico 2 renvoie ; chaque écho doit être identique
+#   3. BAUD_OK, renvoyé par Pico 2 : la vitesse est validée des deux côtés
+# Au premier écho manquant ou faux, Pico 1 revient à la dernière vitesse validée et
+# s'arrête là ; Pico 2, sans BAUD_OK dans les confirm_ms, y revient aussi.
+#
+# En fonctionnement, check() surveille le FrameReader : si la part de trames au CRC
+# faux (et, pour Pico 1, de consignes sans réponse) dépasse max_error_rate, si
+# max_burst erreurs se suivent, ou si des octets arrivent sans former aucune trame
+# valide pendant silence_ms (vitesses différentes), la carte revient à BASE_BAUD.
+# L'autre carte ne lit alors plus que des octets illisibles, ou plus rien du tout
+# pendant idle_ms (plus long qu'un pas de la séquence), et revient aussi à
+# BASE_BAUD ; Pico 1 renégocie ensuite sans dépasser la vitesse qui a échoué.
+
+import struct
+
+from compat import const, ticks_ms, ticks_diff, ticks_add, sleep_ms
+from protocol import (TYPE_BAUD, TYPE_BAUD_ACK, TYPE_BAUD_OK, TYPE_PATTERN, HEADER_SIZE, MAX_FRAME,
+                      MAX_PAYLOAD, finish_frame)
+
+BASE_BAUD = const(115200) # Vitesse de démarrage, toujours utilisable
+BAUD_RATES = (230400, 460800, 921600, 1000000) # Vitesses essayées, croissantes
+RATE_FORMAT = "<I"
+
+# Motif de test : transitions extrêmes, octet de synchronisation et compteur
+PATTERN = bytes([0x00, 0xFF, 0x55, 0xAA, 0xA5, 0x5A, 0x0F, 0xF0] + list(range(1, MAX_PAYLOAD - 7)))
+
+
+def _flush(uart):
+    # Attend la fin de l'émission avant de changer de vitesse
+    if hasattr(uart, 'flush'):
+        uart.flush()
+
+
+class BaudManager:
+    """Vitesse de la liaison : négociation (Pico 1), suivi des propositions (Pico 2) et repli.
+
+    Compteurs : negotiations, probes_failed (vitesses refusées par les motifs de
+    test), fallbacks (replis sur BASE_BAUD), errors et frames (CRC faux et trames
+    valides vus par check()).
+    """
+
+    def __init__(self, uart, rates=BAUD_RATES, base=BASE_BAUD, patterns=16, timeout_ms=100, propose_ms=500, confirm_ms=500,
+                 max_error_rate=0.05, min_frames=32, max_burst=3, silence_ms=1000, idle_ms=10000):
+        self.uart = uart
+        self.rates = rates
+        self.base = base
+        self.patterns = patterns
+        self.timeout_ms = timeout_ms # Attente d'une réponse pendant la négociation
+        self.propose_ms = propose_ms # Attente de BAUD_ACK : la boucle simple de Pico 2 ne lit l'UART que toutes les 300 ms
+        self.confirm_ms = confirm_ms # Pico 2 : retour à la vitesse validée sans BAUD_OK
+        self.max_error_rate = max_error_rate
+        self.min_frames = min_frames # Trames (valides ou non) avant de juger le taux d'erreur
+        self.max_burst = max_burst
+        self.silence_ms = silence_ms
+        self.idle_ms = idle_ms # Aucune trame valide : l'autre carte est revenue à BASE_BAUD
+        self.baudrate = base # Vitesse validée
+        self.ceiling = None # Vitesse qui a échoué en fonctionnement : on reste en dessous
+        self._buf = bytearray(MAX_FRAME)
+        self._probing = None # Pico 2 : vitesse en essai
+        self._deadline = 0
+        self.negotiations = 0
+        self.probes_failed = 0
+        self.fallbacks = 0
+        self.errors = 0
+        self.frames = 0
+        self._reader_counts = None # (trames, erreurs, octets rejetés) du FrameReader au dernier check()
+        self._window_frames = 0
+        self._window_errors = 0
+        self._last_frame = ticks_ms()
+        self._garbage = 0 # Octets rejetés depuis la dernière trame valide
+        self._burst = 0 # Erreurs depuis la dernière trame valide
+
+    def _set(self, rate):
+        _flush(self.uart)
+        self.uart.init(baudrate=rate)
+
+    def _send(self, ftype, seq, payload):
+        buf = self._buf
+        buf[HEADER_SIZE:HEADER_SIZE + len(payload)] = payload
+        self.uart.write(memoryview(buf)[:finish_frame(buf, ftype, seq, len(payload))])
+
+    def _send_rate(self, ftype, rate):
+        buf = self._buf
+        struct.pack_into(RATE_FORMAT, buf, HEADER_SIZE, rate)
+        self.uart.write(memoryview(buf)[:finish_frame(buf, ftype, 0, 4)])
+
+    # Pico 1
+
+    def _wait(self, reader, ftype, seq=None, timeout_ms=None):
+        # Trame de ce type (et de cette séquence) reçue avant timeout_ms, dans reader.buf
+        if timeout_ms is None:
+            timeout_ms = self.timeout_ms
+        start = ticks_ms()
+        while ticks_diff(ticks_ms(), start) < timeout_ms:
+            got = reader.read()
+            while got:
+                if got == ftype and (seq is None or reader.buf[2] == seq):
+                    return True
+                got = reader.read()
+            sleep_ms(1)
+        return False
+
+    def _probe(self, reader, rate):
+        # True : vitesse validée ; None : pas de BAUD_ACK ; False : motifs de test ou validation en échec
+        self._send_rate(TYPE_BAUD, rate)
+        if not (self._wait(reader, TYPE_BAUD_ACK, timeout_ms=self.propose_ms) and struct.unpack_from(RATE_FORMAT, reader.buf, HEADER_SIZE)[0] == rate):
+            return None
+        self._set(rate)
+        sleep_ms(2) # Pico 2 change de vitesse dès l'envoi de BAUD_ACK
+        for i in range(self.patterns):
+            self._send(TYPE_PATTERN, i, PATTERN)
+            if not self._wait(reader, TYPE_PATTERN, i) or reader.buf[3] != len(PATTERN):
+                return False
+            buf = reader.buf
+            for j in range(len(PATTERN)):
+                if buf[HEADER_SIZE + j] != PATTERN[j]:
+                    return False
+        for _ in range(3): # Confirmation, répétée si l'écho se perd
+            self._send_rate(TYPE_BAUD_OK, rate)
+            if self._wait(reader, TYPE_BAUD_OK):
+                return True
+        return False
+
+    def negotiate(self, reader, retry_ms=0):
+        """Pico 1 : essaie les vitesses croissantes et garde la plus rapide fiable ; retourne la vitesse.
+        Sans BAUD_ACK, la proposition est répétée pendant retry_ms"""
+        self.negotiations += 1
+        deadline = ticks_add(ticks_ms(), retry_ms)
+        for rate in self.rates:
+            if rate <= self.baudrate:
+                continue
+            if self.ceiling is not None and rate >= self.ceiling:
+                break
+            result = self._probe(reader, rate)
+            while result is None and ticks_diff(deadline, ticks_ms()) > 0:
+                result = self._probe(reader, rate)
+            if not result:
+                self.probes_failed += 1
+                self._set(self.baudrate)
+                sleep_ms(self.confirm_ms + self.timeout_ms) # Pico 2 revient à la vitesse validée
+                break
+            self.baudrate = rate
+        self._reader_counts = None
+        return self.baudrate
+
+    def renegotiate(self, reader):
+        """Pico 1, après un repli : Pico 2 peut être encore à l'ancienne vitesse ; les propositions,
+        illisibles pour lui, l'amènent à BASE_BAUD en silence_ms, puis la négociation reprend"""
+        return self.negotiate(reader, retry_ms=3 * self.silence_ms)
+
+    # Pico 2
+
+    def on_frame(self, ftype, buf):
+        """Pico 2 : traite une trame de négociation ; False pour les autres types"""
+        if ftype == TYPE_BAUD:
+            rate = struct.unpack_from(RATE_FORMAT, buf, HEADER_SIZE)[0]
+            self._send_rate(TYPE_BAUD_ACK, rate)
+            self._set(rate)
+            self._probing = rate
+            self._deadline = ticks_add(ticks_ms(), self.confirm_ms)
+        elif ftype == TYPE_PATTERN:
+            self._send(TYPE_PATTERN, buf[2], memoryview(buf)[HEADER_SIZE:HEADER_SIZE + buf[3]]) # Écho tel quel
+            self._deadline = ticks_add(ticks_ms(), self.confirm_ms)
+        elif ftype == TYPE_BAUD_OK:
+            rate = struct.unpack_from(RATE_FORMAT, buf, HEADER_SIZE)[0]
+            if rate == self._probing or rate == self.baudrate: # Répétée si notre écho s'est perdu
+                self.baudrate = rate
+                self._probing = None
+                self._send_rate(TYPE_BAUD_OK, rate)
+                self._reader_counts = None
+        else:
+            return False
+        return True
+
+    def follow(self, reader):
+        """Pico 2, boucle bloquante : suit la négociation jusqu'à la validation ou l'abandon de la vitesse en essai"""
+        while self._probing is not None:
+            ftype = reader.read()
+            while ftype:
+                self.on_frame(ftype, reader.buf)
+                ftype = reader.read()
+            self.poll()
+            sleep_ms(1)
+
+    def poll(self, now=None):
+        """Pico 2 : revient à la vitesse validée si la vitesse en essai n'est pas confirmée"""
+        if self._probing is None:
+            return
+        if now is None:
+            now = ticks_ms()
+        if ticks_diff(now, self._deadline) >= 0:
+            self._probing = None
+            self.probes_failed += 1
+            self._set(self.baudrate)
+
+    # Les deux cartes
+
+    def check(self, reader, lost=0, now=None):
+        """Surveille la qualité de la liaison ; True si la carte vient de revenir à BASE_BAUD.
+        lost : total des requêtes restées sans réponse (InFlight.lost), comptées comme erreurs"""
+        if now is None:
+            now = ticks_ms()
+        counts = (reader.frames, reader.errors + lost, reader.discarded)
+        previous = self._reader_counts
+        self._reader_counts = counts
+        if previous is None or self._probing is not None:
+            self._last_frame = now # Nouvelle vitesse : on repart de zéro
+            self._garbage = 0
+            self._burst = 0
+            self._window_frames = 0
+            self._window_errors = 0
+            return False
+        frames = counts[0] - previous[0]
+        errors = counts[1] - previous[1]
+        self.frames += frames
+        self.errors += errors
+        if frames:
+            self._last_frame = now
+            self._garbage = 0
+            self._burst = errors
+        else:
+            self._garbage += counts[2] - previous[2]
+            self._burst += errors
+        self._window_frames += frames + errors
+        self._window_errors += errors
+        degraded = False
+        if self._window_frames >= self.min_frames:
+            degraded = self._window_errors > self.max_error_rate * self._window_frames
+            self._window_frames = 0
+            self._window_errors = 0
+        if self._burst >= self.max_burst:
+            degraded = True # Erreurs consécutives, sans trame valide entre elles
+        if self._garbage and ticks_diff(now, self._last_frame) >= self.silence_ms:
+            degraded = True # Des octets arrivent, mais aucune trame valide : vitesses différentes
+        if ticks_diff(now, self._last_frame) >= self.idle_ms:
+            degraded = True
+        if not degraded or self.baudrate == self.base:
+            return False
+        self.fallback()
+        return True
+
+    def fallback(self):
+        """Revient à BASE_BAUD ; les renégociations resteront sous la vitesse abandonnée"""
+        if self.baudrate == self.base:
+            return
+        self.ceiling = self.baudrate
+        self.baudrate = self.base
+        self.fallbacks += 1
+        self._set(self.base)
+        self._reader_counts = None
+
+    def error_rate(self):
+        """Part des trames reçues au CRC faux depuis le démarrage"""
+        total = self.frames + self.errors
+        return self.errors / total if total else 0.0
+
+    def stats(self):
+        return {
+            'baudrate': self.baudrate,
+            'negotiations': self.negotiations,
+            'probes_failed': self.probes_failed,
+            'fallbacks': self.fallbacks,
+            'frames': self.frames,
+            'errors': self.errors,
+            'error_rate': self.error_rate(),
+        }
@@ -0,0 +1,993 @@
+# Bancs de mesure exécutables sur PC (python3 bench.py).
+# Ils utilisent le bus I2C simulé (fake_i2c.py) à la place du matériel, puis les
+# bancs de pico_bench.py sur les deux Pico simulées (sim/). Les résultats sont
+# écrits en JSON (--json) et comparables à ceux d'une exécution précédente (--compare).
+
+import argparse
+import gc
+import json
+import platform
+import random
+import subprocess
+import threading
+import time
+import tracemalloc
+from array import array
+
+from ads1015 import ADS1015, MUX_AIN2, PGA_4_096, raw_to_voltage
+from fake_i2c import FakeI2C, FakeADS1015
+from fake_uart import FakeUART
+from protocol import Encoder, FrameReader, TYPE_TH, TYPE_ME, TYPE_BATCH, BATCH_MAX_PAYLOAD, unpack_th, unpack_me, to_centi
+from dual_core import CoreSampler
+from pico_async import asyncio, GeneratorRuntime, ValidatorRuntime
+from compat import sleep_ms, ticks_us, ticks_diff, ticks_add
+from calibration import Calibrator, ideal, TABLE_SIZE
+from correlation import InFlight, SeqTracker
+from transport import ReliableLink
+from batch import BatchWriter, BatchReader
+from fake_pio import FakeStateMachine, SquareWave
+import pio_duty
+from pico_bench import percentiles
+import pico_bench
+import build
+
+ADS1015_ADDR = 0x48
+
+
+def read_single_shot(i2c):
+    """Ancienne lecture de read_ads1015_ain2() : configuration + attente 50 ms à chaque mesure"""
+    config = 0xE283
+    i2c.writeto_mem(ADS1015_ADDR, 0x01, config.to_bytes(2, 'big'))
+    sleep_ms(50)
+    data = i2c.readfrom_mem(ADS1015_ADDR, 0x00, 2)
+    raw = int.from_bytes(data, 'big') >> 4
+    if raw > 2047:
+        raw -= 4096
+    return raw * 4.096 / 2048
+
+
+def bench_adc_single_shot(samples=20):
+    """Débit de l'ancienne lecture en conversion unique"""
+    i2c = FakeI2C({ADS1015_ADDR: FakeADS1015(1.65)})
+    start = time.perf_counter()
+    for _ in range(samples):
+        read_single_shot(i2c)
+    elapsed = time.perf_counter() - start
+    return {'samples_per_s': samples / elapsed}
+
+
+def bench_adc_continuous(samples=3000, rate=3300, clock_error=0.0):
+    """Débit et exactitude du pilote en conversion continue : doublons et pertes vus par la puce simulée
+    et estimés par le pilote (sans broche ALERT/RDY)"""
+    device = FakeADS1015(1.65, clock_error=clock_error)
+    adc = ADS1015(FakeI2C({ADS1015_ADDR: device}), ADS1015_ADDR, mux=MUX_AIN2, pga=PGA_4_096, rate=rate)
+    adc.start()
+    start = time.perf_counter()
+    for _ in range(samples):
+        raw = adc.read_raw()
+    elapsed = time.perf_counter() - start
+    return {
+        'samples_per_s': samples / elapsed,
+        'voltage': raw_to_voltage(raw, PGA_4_096),
+        'stale_reads': device.stale_reads,
+        'missed': device.missed,
+        'driver_stale': adc.stale,
+        'driver_missed': adc.missed,
+    }
+
+
+def count_allocs(i2c, read, samples):
+    """Allocations par échantillon : tampons I2C créés, octets et blocs gardés entre deux instantanés
+    tracemalloc autour de la boucle (hors bus simulé et banc), et pic alloué pendant une lecture"""
+    read() # Premier appel : configuration et tampons initiaux
+    gc.collect()
+    allocs_before = i2c.buffer_allocs
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        peak = 0
+        for _ in range(samples):
+            # Objets temporaires libérés à la fin de la lecture : absents des instantanés, visibles au pic
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            read()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    ignore = [tracemalloc.Filter(False, path) for path in (tracemalloc.__file__, __file__, "*fake_*.py")]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'filename')
+    return {'buffers_per_sample': (i2c.buffer_allocs - allocs_before) / samples,
+            'bytes_per_sample': sum(stat.size_diff for stat in stats) / samples,
+            'blocks_per_sample': sum(stat.count_diff for stat in stats) / samples,
+            'peak_bytes': peak}
+
+
+def bench_adc_alloc(samples=1000):
+    """Allocations de l'ancienne lecture, de read_raw() et de read_into() par lot"""
+    results = {}
+    i2c = FakeI2C({ADS1015_ADDR: FakeADS1015(1.65)})
+    results['single_shot'] = count_allocs(i2c, lambda: read_single_shot(i2c), 20)
+    i2c = FakeI2C({ADS1015_ADDR: FakeADS1015(1.65)})
+    adc = ADS1015(i2c, ADS1015_ADDR, mux=MUX_AIN2, pga=PGA_4_096, rate=3300)
+    results['read_raw'] = count_allocs(i2c, adc.read_raw, samples)
+    block = array('h', bytes(2 * 100))
+    i2c = FakeI2C({ADS1015_ADDR: FakeADS1015(1.65)})
+    adc = ADS1015(i2c, ADS1015_ADDR, mux=MUX_AIN2, pga=PGA_4_096, rate=3300)
+    result = count_allocs(i2c, lambda: adc.read_into(block), samples // 100)
+    results['read_into'] = {key: value if key == 'peak_bytes' else value / 100 for key, value in result.items()}
+    return results
+
+
+def bench_protocol(messages=5000):
+    """Messages ME/s et octets/message : lignes ASCII contre trames binaires (aller-retour vérifié)"""
+    values = [(d / 2, d / 2 - 0.37, -0.37) for d in range(200)]
+    uart = FakeUART(rx_size=1 << 20)
+    start = time.perf_counter()
+    errors = 0
+    for i in range(messages):
+        theoretical, measured, error = values[i % len(values)]
+        uart.write(f"ME:{theoretical:.1f}:{measured:.1f}:{error:.1f}\n")
+        parts = uart.readline().decode().strip().split(":")
+        if abs(float(parts[1]) - theoretical) > 0.05:
+            errors += 1
+    ascii_elapsed = time.perf_counter() - start
+    ascii_bytes = uart.bytes_written
+
+    uart = FakeUART(rx_size=1 << 20)
+    encoder = Encoder()
+    reader = FrameReader(uart)
+    start = time.perf_counter()
+    for i in range(messages):
+        theoretical, measured, error = values[i % len(values)]
+        uart.write(encoder.pack_me(theoretical, measured, error))
+        if reader.read() != TYPE_ME or unpack_me(reader.buf) != (to_centi(theoretical), to_centi(measured), to_centi(error)):
+            errors += 1
+    binary_elapsed = time.perf_counter() - start
+    return {
+        'ascii_msgs_per_s': messages / ascii_elapsed,
+        'ascii_bytes_per_msg': ascii_bytes / messages,
+        'binary_msgs_per_s': messages / binary_elapsed,
+        'binary_bytes_per_msg': uart.bytes_written / messages,
+        'roundtrip_errors': errors + reader.errors,
+    }
+
+
+def bench_parser(frames=5000, corrupt_every=50, burst=20):
+    """Trames extraites par rafales, avec un octet corrompu toutes les corrupt_every trames"""
+    uart = FakeUART(rx_size=1 << 20)
+    encoder = Encoder()
+    reader = FrameReader(uart)
+    received = 0
+    start = time.perf_counter()
+    for i in range(frames):
+        frame = bytearray(encoder.pack_me(i % 100, i % 100, 0))
+        if i % corrupt_every == 0:
+            frame[5] ^= 0xFF
+        uart.write(frame)
+        if i % burst == burst - 1: # Plusieurs trames arrivent entre deux lectures
+            received += reader.poll(lambda ftype, buf: None)
+    received += reader.poll(lambda ftype, buf: None)
+    elapsed = time.perf_counter() - start
+    expected = frames - len(range(0, frames, corrupt_every))
+    return {
+        'frames_per_s': received / elapsed,
+        'received': received,
+        'expected': expected,
+        'discarded': reader.discarded,
+        'crc_errors': reader.errors,
+        'overflows': reader.overflows,
+    }
+
+
+class NullPWM:
+    """Sortie PWM sans effet (seule la consigne est mémorisée)"""
+
+    def __init__(self):
+        self.duty = 0
+
+    def duty_u16(self, duty):
+        self.duty = duty
+
+
+def bench_latency_legacy(exchanges=10):
+    """Délai TH -> ME avec l'ancienne boucle de Pico 2 (readline, ADC 50 ms, pause 0.3 s)"""
+    uart1, uart2 = FakeUART(), FakeUART()
+    uart1.link(uart2)
+    i2c = FakeI2C({ADS1015_ADDR: FakeADS1015(1.65)})
+    stop = threading.Event()
+
+    def pico2_loop():
+        while not stop.is_set():
+            if uart2.any():
+                data = uart2.readline().decode().strip()
+                if data.startswith("TH:"):
+                    theoretical = float(data[3:])
+                    measured = read_single_shot(i2c) / 3.3 * 100
+                    uart2.write(f"ME:{theoretical:.1f}:{measured:.1f}:{measured - theoretical:.1f}\n")
+            time.sleep(0.3)
+
+    thread = threading.Thread(target=pico2_loop)
+    thread.start()
+    latencies = []
+    try:
+        for i in range(exchanges):
+            time.sleep(random.uniform(0, 0.3)) # Phase quelconque par rapport à la boucle de Pico 2
+            start = time.perf_counter()
+            uart1.write(f"TH:{i:.1f}\n")
+            while not uart1.any():
+                time.sleep(0.0005)
+            uart1.readline()
+            latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        stop.set()
+        thread.join()
+    return percentiles(latencies)
+
+
+def bench_latency_async(duration_s=3.0, step_ms=100):
+    """Délai TH -> ME avec les tâches coopératives de pico_async sur les deux Pico"""
+    uart1, uart2 = FakeUART(), FakeUART()
+    uart1.link(uart2)
+    adc1 = ADS1015(FakeI2C({ADS1015_ADDR: FakeADS1015(1.65)}), ADS1015_ADDR)
+    adc2 = ADS1015(FakeI2C({ADS1015_ADDR: FakeADS1015(1.65)}), ADS1015_ADDR)
+
+    async def run():
+        pico1 = GeneratorRuntime(uart1, adc1, NullPWM(), step_ms=step_ms, report_ms=3600000)
+        pico2 = ValidatorRuntime(uart2, adc2, NullPWM(), step_ms=3600000, report_ms=3600000)
+        tasks = [asyncio.create_task(coro) for coro in pico1.tasks() + pico2.tasks()]
+        await asyncio.sleep(duration_s)
+        for task in tasks:
+            task.cancel()
+        return pico1.inflight.latencies_us()
+
+    latencies = asyncio.run(run())
+    return percentiles([us / 1000 for us in latencies])
+
+
+def bench_dual_core(duration_s=1.0, consumer_period_ms=5):
+    """Débit du passage d'échantillons entre le thread d'acquisition et le consommateur"""
+    device = FakeADS1015(1.65)
+    sampler = CoreSampler(ADS1015(FakeI2C({ADS1015_ADDR: device}), ADS1015_ADDR, rate=3300))
+    block = array('h', bytes(2 * sampler.ring.size))
+    consumed = 0
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        while time.perf_counter() - start < duration_s:
+            time.sleep(consumer_period_ms / 1000)
+            consumed += sampler.ring.pop_into(block)
+    finally:
+        sampler.stop()
+    consumed += sampler.ring.pop_into(block)
+    elapsed = time.perf_counter() - start
+    return {
+        'produced_per_s': sampler.produced / elapsed,
+        'consumed_per_s': consumed / elapsed,
+        'lost': sampler.produced - consumed,
+        'overruns': sampler.ring.overruns,
+    }
+
+
+def bench_correlation(requests=5000, loss=0.02, reorder=0.01, duplicate=0.005, period_us=2000, timeout_ms=50, seed=3):
+    """Corrélation TH/ME sur une liaison simulée (pertes, inversions, doublons injectés), sur ~20 rebouclages des séquences.
+    Les compteurs détectés doivent égaler les événements injectés"""
+    rng = random.Random(seed)
+    inflight = InFlight(timeout_ms=timeout_ms)
+    tracker = SeqTracker()
+    injected = {'lost': 0, 'reordered': 0, 'duplicates': 0}
+    replies = [] # [instant, séquence, indice de la requête]
+    swapped = -1
+    for i in range(requests):
+        if rng.random() < loss:
+            injected['lost'] += 1
+            continue
+        replies.append([i * period_us + rng.randrange(1000, 1500), i & 0xFF, i])
+        previous = replies[-2] if len(replies) > 1 else None
+        if previous and previous[2] == i - 1 and swapped != i - 1 and rng.random() < reorder:
+            previous[0] = replies[-1][0] + 1 # La réponse i - 1, retardée, arrive après la réponse i
+            swapped = i
+            injected['reordered'] += 1
+    for reply in list(replies):
+        if rng.random() < duplicate:
+            replies.append([reply[0] + 1, reply[1], reply[2]])
+            injected['duplicates'] += 1
+    replies.sort()
+    delivered = 0
+    now = 0
+    for i in range(requests):
+        inflight.add(i & 0xFF, i & 0x7FFF, now)
+        now += period_us
+        while delivered < len(replies) and replies[delivered][0] <= now:
+            at, seq, _ = replies[delivered]
+            inflight.match(seq, at)
+            tracker.update(seq)
+            delivered += 1
+        inflight.expire(now)
+    for at, seq, _ in replies[delivered:]:
+        inflight.match(seq, at)
+        tracker.update(seq)
+    inflight.expire(now + timeout_ms * 1000)
+    result = inflight.stats()
+    result['injected'] = injected
+    result['rtt_us'] = percentiles(inflight.latencies_us())
+    result['tracker'] = {'missing': tracker.missing, 'reordered': tracker.reordered, 'duplicates': tracker.duplicates}
+    start = time.perf_counter()
+    for i in range(requests):
+        inflight.add(i & 0xFF, 0, i)
+        inflight.match(i & 0xFF, i + 1)
+    result['pairs_per_s'] = requests / (time.perf_counter() - start)
+    return result
+
+
+def bench_transport(window, messages=400, bit_error_rate=0.0005, consume_ms=5, queue=8, timeout_ms=50, seed=1):
+    """Consignes TH de Pico 1 vers une Pico 2 lente (une consigne toutes les consume_ms), sur la liaison simulée
+    avec erreurs binaires : sans transport (window=0, file de queue consignes, surplus perdu) ou par ReliableLink"""
+    from sim import Simulation
+    sim = Simulation(bit_error_rate=bit_error_rate, echo=False, seed=seed)
+    uart1, uart2 = sim.pico1.uart(1), sim.pico2.uart(1)
+    for port in (uart1, uart2):
+        port.bit_error_rate = bit_error_rate
+    received = []
+    done = {}
+
+    def sender():
+        encoder = Encoder()
+        reader = FrameReader(uart1)
+        link = ReliableLink(uart1.write, window, timeout_ms, queue) if window else None
+        start = ticks_us()
+        for i in range(messages):
+            frame = encoder.pack_th_centi(i)
+            if link is None:
+                uart1.write(frame)
+                continue
+            while not link.send(frame):
+                reader.poll(link.on_frame)
+                link.poll()
+                sleep_ms(1)
+        while link is not None and link.in_flight(): # Dernières trames acquittées
+            reader.poll(link.on_frame)
+            link.poll()
+            sleep_ms(1)
+        done['us'] = ticks_diff(ticks_us(), start)
+        done['link'] = link
+
+    def receiver():
+        reader = FrameReader(uart2)
+        link = ReliableLink(uart2.write, window, timeout_ms, queue) if window else None
+        pending = [] # Sans transport : consignes reçues en attente de traitement
+        next_us = ticks_us()
+        while True:
+            ftype = reader.read()
+            while ftype:
+                if link is not None:
+                    link.on_frame(ftype, reader.buf)
+                elif ftype == TYPE_TH:
+                    if len(pending) < queue:
+                        pending.append(unpack_th(reader.buf))
+                    else:
+                        done['dropped'] = done.get('dropped', 0) + 1
+                ftype = reader.read()
+            if ticks_diff(ticks_us(), next_us) >= 0:
+                next_us = ticks_add(next_us, consume_ms * 1000)
+                if link is not None:
+                    frame = link.receive()
+                    if frame is not None:
+                        received.append(unpack_th(frame))
+                elif pending:
+                    received.append(pending.pop(0))
+            sleep_ms(1)
+
+    sim.pico2.spawn("receiver", receiver)
+    sim.pico1.spawn("sender", sender)
+    sim.scheduler.run(messages * consume_ms / 1000 * 4 + 2)
+    for name, error in sim.scheduler.errors:
+        raise RuntimeError(f"{name}: {error!r}")
+    in_order = all(value == index for index, value in enumerate(received))
+    result = {'sent': messages, 'delivered': len(received), 'in_order': in_order,
+              'delivered_per_s': len(received) / (done['us'] / 1000000) if done.get('us') else None,
+              'dropped': done.get('dropped', 0)}
+    link = done.get('link')
+    if link is not None:
+        result.update({key: value for key, value in link.stats().items() if key in ('retransmits', 'timeouts', 'stalls')})
+    return result
+
+
+def bench_baud(max_baudrate=460800, degraded_baudrate=230400, degrade_at_s=5.0, duration_s=30.0):
+    """Scripts des deux Pico sur un câblage fiable jusqu'à max_baudrate : vitesse négociée au démarrage,
+    puis repli et renégociation quand le câblage ne tient plus que degraded_baudrate"""
+    from sim import Simulation
+    sim = Simulation(max_baudrate=max_baudrate, echo=False)
+    sim.run_scripts(duration_s=degrade_at_s)
+    uart1, uart2 = sim.pico1.uart(1), sim.pico2.uart(1)
+    result = {'negotiated': uart1.baudrate, 'agreed': uart1.baudrate == uart2.baudrate}
+    times = {line: t for t, line in sim.pico1.output}
+    start = next(t for line, t in times.items() if line.startswith("Protocole"))
+    end = next((t for line, t in times.items() if line.startswith("Vitesse:") and line.endswith("bauds")), None)
+    result['negotiation_ms'] = None if end is None else (end - start) * 1000
+    for port in (uart1, uart2):
+        port.max_baudrate = degraded_baudrate
+    sim.scheduler.run(duration_s - degrade_at_s)
+    for name, error in sim.scheduler.errors:
+        raise RuntimeError(f"{name}: {error!r}")
+    renegotiated = [t for t, line in sim.pico1.output if line.startswith("Vitesse renegociee")]
+    result['after_fallback'] = uart1.baudrate
+    result['agreed_after_fallback'] = uart1.baudrate == uart2.baudrate
+    result['recovery_s'] = renegotiated[-1] - degrade_at_s if renegotiated else None
+    return result
+
+
+def bench_batch(max_samples, max_age_ms=20, rate_hz=2000, duration_s=2.0):
+    """Mesures produites à rate_hz par Pico 2 vers Pico 1 à 115200 bauds : une ligne "S...E" par mesure
+    (ancien format de Test_5/6, max_samples=0) ou des lots BatchWriter ; débit reçu, octets par mesure et latence de chaque
+    mesure (de sa production prévue à son décodage, temps simulé commun aux deux cartes)"""
+    from sim import Simulation
+    sim = Simulation(echo=False)
+    uart1, uart2 = sim.pico1.uart(1), sim.pico2.uart(1)
+    period_us = 1000000 // rate_hz
+    count = int(duration_s * rate_hz)
+    produced = array('i', [0]) * count # Instant prévu de chaque mesure (us)
+    latencies_us = []
+
+    def producer():
+        writer = BatchWriter(uart2.write, max_samples, max_age_ms) if max_samples else None
+        start = ticks_us()
+        for i in range(count):
+            due = ticks_add(start, i * period_us)
+            while ticks_diff(due, ticks_us()) > 0:
+                if writer is not None:
+                    writer.poll()
+                sleep_ms(0) if ticks_diff(due, ticks_us()) < 1000 else sleep_ms(1)
+            produced[i] = due
+            value = i % 10000 # Rapport cyclique en centièmes de pourcent
+            if writer is None:
+                uart2.write(f"S{i % 1000:03d}D{value // 100:03d}V{value / 3000:.2f}R{value / 100:.1f}E\n")
+            else:
+                writer.add(value)
+        if writer is not None:
+            writer.flush()
+
+    def consumer():
+        reader = FrameReader(uart1, max_payload=BATCH_MAX_PAYLOAD)
+        batches = BatchReader(256)
+        received = 0
+        line = b""
+        while True:
+            if not max_samples:
+                while uart1.any():
+                    line += uart1.readline() # Ligne éventuellement incomplète : complétée au tour suivant
+                    if not line.endswith(b"\n"):
+                        break
+                    if line.startswith(b'S') and line.rstrip().endswith(b'E'):
+                        latencies_us.append(ticks_diff(ticks_us(), produced[received]))
+                        received += 1
+                    line = b""
+            else:
+                ftype = reader.read()
+                while ftype:
+                    if ftype == TYPE_BATCH:
+                        n = batches.on_frame(reader.buf)
+                        now = ticks_us()
+                        for _ in range(n):
+                            latencies_us.append(ticks_diff(now, produced[received]))
+                            received += 1
+                    ftype = reader.read()
+            sleep_ms(1)
+
+    sim.pico1.spawn("consumer", consumer)
+    sim.pico2.spawn("producer", producer)
+    sim.scheduler.run(duration_s * 10)
+    for name, error in sim.scheduler.errors:
+        raise RuntimeError(f"{name}: {error!r}")
+    delivered = len(latencies_us)
+    last_us = max(ticks_diff(produced[i], produced[0]) + latencies_us[i] for i in range(delivered)) if delivered else 0
+    return {'produced': count, 'delivered': delivered,
+            'samples_per_s': delivered * 1000000 / last_us if last_us else None,
+            'bytes_per_sample': uart2.bytes_sent / count,
+            'latency_ms': {key: None if value is None else value / 1000 for key, value in percentiles(latencies_us).items()}}
+
+
+def bench_pio_duty(periods=2000, pwm_freq=1000, seed=5):
+    """Programme PIO de pio_duty.py exécuté par le modèle fake_pio sur des PWM de rapport cyclique aléatoire :
+    erreur de chaque période décodée et coût du modèle sur PC"""
+    rng = random.Random(seed)
+    freq = pio_duty.sm_freq(pwm_freq)
+    period = freq // pwm_freq
+    errors = []
+    steps = 0
+    start = time.perf_counter()
+    for _ in range(periods // 10):
+        high = rng.randrange(8, period - 8)
+        sm = FakeStateMachine(pio_duty.duty_program, SquareWave(period, high), fifo_depth=16, start_cycle=rng.randrange(period))
+        for _ in range(10):
+            word_high, word_low = pio_duty.decode(sm.get())
+            errors.append(max(abs(word_high - high), abs(word_low - (period - high))))
+            errors.append(abs(pio_duty.duty_centi(word_high, word_low) - (high * 10000 + period // 2) // period))
+        steps += sm.steps
+    elapsed = time.perf_counter() - start
+    cycles = errors[0::2]
+    return {'sm_freq': freq, 'max_error_cycles': max(cycles), 'max_error_centi': max(errors[1::2]),
+            'resolution_pct': pio_duty.CYCLES_PER_COUNT * 100 / period,
+            'periods_per_s': periods / elapsed, 'steps_per_period': steps / periods}
+
+
+def bench_duty_response(source, steps=16, step_ms=200, duties=(10, 90, 25, 75, 50, 0, 100, 33)):
+    """Pico 1 change de consigne toutes les step_ms ; Pico 2 mesure juste après chaque changement, par PIO
+    (read_next_centi) ou par le filtre RC (stabilisation de settle.py) : délai et erreur de la mesure"""
+    from sim import Simulation
+    from fixed import duty_u16
+    from settle import SettlingDetector
+    sim = Simulation(echo=False)
+    from machine import Pin # Module simulé, installé par Simulation
+    pwm = sim.pico1.pwm(16)
+    changes = []
+    results = []
+
+    def generator():
+        for i in range(steps):
+            centi = to_centi(duties[i % len(duties)])
+            pwm.duty_u16(duty_u16(centi))
+            changes.append((ticks_us(), centi))
+            sleep_ms(step_ms)
+
+    def measurer():
+        if source == "pio":
+            meter = pio_duty.PioDutyMeter(Pin(18, Pin.IN))
+        else:
+            adc = ADS1015(sim.pico2.i2c(1), ADS1015_ADDR, mux=MUX_AIN2, pga=PGA_4_096, rate=3300)
+            settler = SettlingDetector()
+            table = ideal(PGA_4_096)
+        seen = 0
+        while True:
+            if len(changes) > seen:
+                start, centi = changes[seen]
+                seen += 1
+                if source == "pio":
+                    measured = meter.read_next_centi()
+                else:
+                    settler.reset()
+                    while not settler.feed(adc.read_raw()):
+                        pass
+                    measured = table.duty_centi_q4(settler.value_q4)
+                results.append((ticks_diff(ticks_us(), start), abs(measured - centi)))
+            sleep_ms(1)
+
+    sim.pico2.spawn("measurer", measurer)
+    sim.pico1.spawn("generator", generator)
+    sim.scheduler.run(steps * step_ms / 1000 + 0.5)
+    for name, error in sim.scheduler.errors:
+        raise RuntimeError(f"{name}: {error!r}")
+    return {'measurements': len(results),
+            'delay_ms': {key: value / 1000 for key, value in percentiles([delay for delay, _ in results]).items()},
+            'error_pct': {key: value / 100 for key, value in percentiles([error for _, error in results]).items()}}
+
+
+def bench_capture(duty=0.5, dma_rate=100000, dma_samples=2000, ads_samples=300, i2c_freq=400000):
+    """Blocs capture.py sur les Pico simulées : ondulation PWM vue par l'ADC interne (DMA), puis transitoire
+    du filtre RC après un échelon 0 -> duty vu par l'ADS1015 (boucle à échéances fixes) ; tau estimé à 63 %"""
+    from sim import Simulation, analog
+    from capture import AdcDmaCapture, Ads1015Capture, adc_to_mv
+    from fixed import duty_u16
+    sim = Simulation(echo=False)
+    from machine import I2C, Pin # Modules simulés, installés par Simulation
+    pwm = sim.pico1.pwm(16)
+    result = {}
+
+    def measurer():
+        pwm.duty_u16(int(duty * 65535))
+        sleep_ms(200) # Filtre RC stabilisé
+        dma = AdcDmaCapture(0, rate=dma_rate)
+        samples = array('H', bytes(2 * dma_samples))
+        start = ticks_us()
+        view = dma.capture(samples)
+        elapsed = ticks_diff(ticks_us(), start)
+        per_period = dma.rate // pwm.freq() # Moyenne par phase de la période PWM : le bruit s'annule
+        periods = len(view) // per_period
+        folded = [sum(view[k * per_period + i] for k in range(periods)) // periods for i in range(per_period)]
+        result['dma'] = {'rate': dma.rate, 'samples': len(view), 'samples_per_s': len(view) * 1000000 / elapsed,
+                         'ripple_mv': adc_to_mv(max(folded)) - adc_to_mv(min(folded)),
+                         'ripple_model_mv': analog.VDD * duty * (1 - duty) / (pwm.freq() * sim.rc1.tau) * 1000}
+        dma.close()
+
+        pwm.duty_u16(0)
+        sleep_ms(200)
+        adc = ADS1015(I2C(1, scl=Pin(15), sda=Pin(14), freq=i2c_freq), ADS1015_ADDR, mux=MUX_AIN2, pga=PGA_4_096, rate=3300)
+        ads = Ads1015Capture(adc)
+        codes = array('h', bytes(2 * ads_samples))
+        stamps = array('i', bytes(4 * ads_samples))
+        pwm.duty_u16(duty_u16(to_centi(duty * 100)))
+        view = ads.capture(codes, stamps=stamps)
+        final = sum(view[-ads_samples // 10:]) / (ads_samples // 10)
+        initial = view[0]
+        crossing = next(i for i, code in enumerate(view) if code - initial >= 0.632 * (final - initial))
+        result['ads1015'] = {'rate': ads.rate, 'samples': len(view), 'samples_per_s': len(view) * 1000000 / ads.duration_us,
+                             'late': ads.late, 'max_late_us': ads.max_late_us,
+                             'tau_ms': ticks_diff(stamps[crossing], stamps[0]) / 1000, 'tau_model_ms': sim.rc1.tau * 1000}
+
+    sim.pico2.spawn("measurer", measurer)
+    sim.scheduler.run(1.0)
+    for name, error in sim.scheduler.errors:
+        raise RuntimeError(f"{name}: {error!r}")
+    return result
+
+
+def bench_i2c_speed(max_freq=400000, samples=1000):
+    """Fréquence I2C retenue par i2c_speed.py sur une Pico simulée dont le bus n'est fiable que jusqu'à
+    max_freq, puis débit de lecture de l'ADS1015 à 3300 ech/s à chaque fréquence validée : durée d'une
+    transaction, échantillons/s et conversions perdues"""
+    from sim import Simulation
+    from i2c_speed import I2CSpeed
+    sim = Simulation(echo=False, i2c_max_freq=max_freq)
+    from machine import I2C, Pin # Modules simulés, installés par Simulation
+    device = sim.pico1.i2c(1).devices[ADS1015_ADDR]
+    result = {}
+
+    def make_bus(freq):
+        return I2C(1, scl=Pin(15), sda=Pin(14), freq=freq)
+
+    def measurer():
+        speed = I2CSpeed(make_bus)
+        result['freq'] = speed.probe()
+        result['results'] = {str(freq): {'errors': errors, 'read_us': read_us} for freq, (errors, read_us) in speed.results.items()}
+        result['reads'] = {}
+        for freq, (errors, _) in speed.results.items():
+            if errors:
+                continue
+            adc = ADS1015(make_bus(freq), ADS1015_ADDR, mux=MUX_AIN2, pga=PGA_4_096, rate=3300)
+            adc.read_raw()
+            missed = device.missed
+            driver_missed = adc.missed
+            start = ticks_us()
+            for _ in range(samples):
+                adc.read_raw()
+            elapsed = ticks_diff(ticks_us(), start)
+            result['reads'][str(freq)] = {'samples_per_s': samples * 1000000 / elapsed, 'read_us': adc.read_us,
+                                          'read_max_us': adc.read_max_us, 'missed': device.missed - missed,
+                                          'driver_missed': adc.missed - driver_missed}
+
+    sim.pico1.spawn("measurer", measurer)
+    sim.scheduler.run(5.0)
+    for name, error in sim.scheduler.errors:
+        raise RuntimeError(f"{name}: {error!r}")
+    return result
+
+
+def bench_scan(channels=("ain2", "ain3", "ain2-ain3:2.048:1600"), conversions=600, i2c_freq=400000, duties=(0.3, 0.7)):
+    """Balayage de plusieurs entrées (scanner.py) sur une Pico simulée, Pico 1 à duties[0] (AIN2) et Pico 2 à
+    duties[1] (AIN3) : débit total, contre des conversions uniques lues l'une après l'autre (read_single),
+    et tension de chaque canal"""
+    from sim import Simulation, analog
+    from scanner import MuxScanner
+    sim = Simulation(echo=False)
+    from machine import I2C, Pin # Modules simulés, installés par Simulation
+    result = {}
+
+    def measurer():
+        sim.pico1.pwm(16).duty_u16(int(duties[0] * 65535))
+        sim.pico2.pwm(16).duty_u16(int(duties[1] * 65535))
+        sleep_ms(300) # Filtres RC stabilisés
+        adc = ADS1015(I2C(1, scl=Pin(15), sda=Pin(14), freq=i2c_freq), ADS1015_ADDR)
+        scanner = MuxScanner(adc, channels, i2c_freq=i2c_freq)
+        start = ticks_us()
+        scanner.scan(conversions)
+        elapsed = ticks_diff(ticks_us(), start)
+        result['pipelined_per_s'] = conversions * 1000000 / elapsed
+        result['model_per_s'] = scanner.rate()
+        result['late'] = scanner.late
+        result['collisions'] = scanner.collisions
+        result['pipelined'] = sum(scanner.pipelined)
+        result['channels'] = {}
+        for k, channel in enumerate(channels):
+            stamps = [stamp for stamp, _ in scanner.samples(k)]
+            result['channels'][channel] = {'mv': scanner.mv(k, scanner.latest(k)[0]), 'samples': scanner.count[k],
+                                           'interval_us': ticks_diff(stamps[-1], stamps[0]) // (len(stamps) - 1)}
+        start = ticks_us()
+        for i in range(conversions):
+            mux, pga, rate = scanner.channels[i % len(channels)]
+            adc.pga = pga
+            adc.rate = rate
+            adc.read_single(mux)
+        result['sequential_per_s'] = conversions * 1000000 / ticks_diff(ticks_us(), start)
+
+    sim.pico1.spawn("measurer", measurer)
+    sim.scheduler.run(5.0)
+    for name, error in sim.scheduler.errors:
+        raise RuntimeError(f"{name}: {error!r}")
+    vdd_mv = analog.VDD * 1000
+    result['expected_mv'] = {'ain2': duties[0] * vdd_mv, 'ain3': duties[1] * vdd_mv, 'ain2-ain3': (duties[0] - duties[1]) * vdd_mv}
+    return result
+
+
+def bench_channels(devices=(1, 2, 4), conversions=800, i2c_freq=1000000, pins=(16, 18, 20, 22)):
+    """Voies PWM + ADS1015 (channels.py) sur Pico 1 simulée, une voie par puce (AIN2, filtre RC propre) :
+    débit total selon le nombre de puces, contre un ADS1015 seul, et tension de chaque voie"""
+    from sim import Simulation, RCFilter, AnalogInput, analog
+    from ads1015 import ADS1015_ADDR
+    from channels import ChannelManager, ADS1015_ADDRESSES
+    results = {}
+    for n in devices:
+        sim = Simulation(echo=False)
+        from machine import I2C, Pin # Modules simulés, installés par Simulation
+        addresses = ADS1015_ADDRESSES[:n]
+        for pin, address in zip(pins, addresses):
+            if address != ADS1015_ADDR: # 0x48 déjà relié à GP16 par Simulation
+                rc = RCFilter(sim.pico1.pwm(pin), 0.02)
+                sim.pico1.attach_ads1015(1, address, {MUX_AIN2: AnalogInput(rc.voltage, 0.002, seed=pin)})
+        duties = [2000 + 1500 * k for k in range(n)] # Centièmes de pourcent, distincts par voie
+        result = {}
+
+        def measurer():
+            manager = ChannelManager(I2C(1, scl=Pin(15), sda=Pin(14), freq=i2c_freq),
+                                     [(pin, address, MUX_AIN2) for pin, address in zip(pins, addresses)], i2c_freq=i2c_freq)
+            for k, duty in enumerate(duties):
+                manager.set_duty(k, duty)
+            sleep_ms(300) # Filtres RC stabilisés
+            start = ticks_us()
+            manager.run(conversions)
+            result['per_s'] = conversions * 1000000 / ticks_diff(ticks_us(), start)
+            result['late'] = sum(scanner.late for scanner in manager.scanners.values())
+            result['mv'] = [manager.mv(k, manager.latest(k)[0]) for k in range(n)]
+            result['expected_mv'] = [duty / 10000 * analog.VDD * 1000 for duty in duties]
+
+        sim.pico1.spawn("measurer", measurer)
+        sim.scheduler.run(5.0)
+        for name, error in sim.scheduler.errors:
+            raise RuntimeError(f"{name}: {error!r}")
+        result['scaling'] = result['per_s'] / results[devices[0]]['per_s'] * devices[0] if results else float(n)
+        results[n] = result
+    return results
+
+
+def bench_calibration(conversions=20000, vdd=3.22, offset=12):
+    """Conversion code ADC -> rapport cyclique : calcul flottant contre table, et précision sur une chaîne non idéale"""
+    full_scale = 4.096
+    codes = [random.randrange(TABLE_SIZE) for _ in range(conversions)]
+    table = ideal(PGA_4_096)
+    results = {}
+    codes_q4 = [raw << 4 | raw & 15 for raw in codes]
+    for name, convert, inputs in (
+            ('float', lambda raw: max(0, min(100, raw * full_scale / 2048 / 3.3 * 100)), codes),
+            ('table', table.duty_centi, codes),
+            ('table_q4', table.duty_centi_q4, codes_q4)):
+        start = time.perf_counter()
+        for raw in inputs:
+            convert(raw)
+        results[f"{name}_per_s"] = conversions / (time.perf_counter() - start)
+
+    def code(duty): # Chaîne non idéale : sortie PWM à vdd, décalage ADC de offset codes
+        return duty / 100 * vdd * 2048 / full_scale + offset
+
+    calibrator = Calibrator(201)
+    for step in range(201):
+        duty = step * 50
+        calibrator.add(duty, code(duty / 100))
+    fitted = calibrator.fit(PGA_4_096)
+    ideal_errors, fitted_errors = [], []
+    for step in range(1, 1000):
+        duty = step / 10
+        raw = code(duty)
+        ideal_errors.append(abs(table.duty(raw) - duty))
+        fitted_errors.append(abs(fitted.duty(raw) - duty))
+    results['ideal_error_pct'] = percentiles(ideal_errors)
+    results['fitted_error_pct'] = percentiles(fitted_errors)
+    results['knots'] = len(fitted.knots)
+    return results
+
+
+def bench_import():
+    """Import de station et de ses dépendances depuis les sources puis précompilés (build.py, CPython)"""
+    modules = build.deploy_modules()
+    return {variant: build.measure_host(modules, variant) for variant in ("source", "mpy")}
+
+
+def bench_sim(duration_s=5.0, step_ms=20):
+    """Bancs de pico_bench.py sur les deux Pico simulées, avec leurs propres scripts"""
+    from sim import Simulation
+    sim = Simulation(echo=False)
+    results = {}
+    for role, board in ((2, sim.pico2), (1, sim.pico1)):
+        board.spawn("bench", lambda role=role: results.__setitem__(
+            f"pico{role}", pico_bench.run(role, duration_ms=int(duration_s * 1000), step_ms=step_ms)))
+    sim.scheduler.run(duration_s + 10) # Échange puis bancs locaux (ADC 1 s, boucle ~2 s)
+    for name, error in sim.scheduler.errors:
+        raise RuntimeError(f"{name}: {error!r}")
+    return results
+
+
+def bench_sim_speed(duration_s=10.0, scripts=(("Code Pico 1.py", "Code Pico 2.py"), ("Test_5.py", "Test_6.py"))):
+    """Accélération du simulateur (temps simulé / temps réel) et passages de jeton entre threads par seconde
+    simulée, pour les scripts par défaut (ADC lu en continu) et un essai cadencé en millisecondes"""
+    from sim import Simulation
+    results = {}
+    for script1, script2 in scripts:
+        sim = Simulation(echo=False)
+        real_s = sim.run_scripts(script1, script2, duration_s)
+        for name, error in sim.scheduler.errors:
+            raise RuntimeError(f"{name}: {error!r}")
+        results[f"{script1[:-3]} + {script2[:-3]}"] = {'speedup': duration_s / real_s,
+                                                     'switches_per_s': sim.scheduler.switches / duration_s,
+                                                     'switch_us': real_s * 1000000 / max(1, sim.scheduler.switches)}
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def flatten(results, prefix=""):
+    """Valeurs numériques d'un résultat imbriqué, indexées par chemin ("sim.pico1.adc.samples_per_s")"""
+    values = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[path] = value
+    return values
+
+
+def compare(old, new):
+    """Affiche l'évolution de chaque mesure numérique entre deux exécutions"""
+    old, new = flatten(old), flatten(new)
+    print(f"=== Comparaison ({len(old.keys() & new.keys())} mesures communes) ===")
+    for path in sorted(old.keys() & new.keys()):
+        before, after = old[path], new[path]
+        change = f"{(after - before) / abs(before):+7.1%}" if before else "   n/d"
+        print(f"{path:55s} {before:12.4g} -> {after:12.4g} {change}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bancs de mesure (hote et Pico simulees)")
+    parser.add_argument("--json", default="bench_results.json", help="Fichier de resultats")
+    parser.add_argument("--compare", help="Resultats d'une execution precedente")
+    parser.add_argument("--sim-duration", type=float, default=5.0, help="Duree de l'echange TH/ME simule (s)")
+    args = parser.parse_args(argv)
+    results = {'meta': {'time': time.strftime("%Y-%m-%dT%H:%M:%S"), 'git': git_revision(),
+                        'python': platform.python_version(), 'machine': platform.machine()}}
+    host = results['host'] = {}
+
+    print("=== Bancs de mesure (hote) ===")
+    result = host['adc_single_shot'] = bench_adc_single_shot()
+    print(f"ADC conversion unique : {result['samples_per_s']:8.1f} ech/s")
+    for clock_error in (0.0, -0.08, 0.08):
+        result = host[f"adc_continuous_{clock_error:+.2f}"] = bench_adc_continuous(clock_error=clock_error)
+        print(f"ADC continu 3300 SPS (horloge {clock_error:+.0%}) : {result['samples_per_s']:8.1f} ech/s | "
+              f"{result['voltage']:.3f}V | doublons: {result['stale_reads']} (pilote {result['driver_stale']}) | "
+              f"pertes: {result['missed']} (pilote {result['driver_missed']})")
+    host['adc_alloc'] = bench_adc_alloc()
+    for name, result in host['adc_alloc'].items():
+        print(f"Allocations {name:12s}: {result['buffers_per_sample']:.2f} tampon(s)/ech | gardes : "
+              f"{result['bytes_per_sample']:.1f} o, {result['blocks_per_sample']:.2f} bloc(s)/ech | "
+              f"pic par appel {result['peak_bytes']} o, bus simule compris (tracemalloc)")
+    result = host['protocol'] = bench_protocol()
+    for mode in ('ascii', 'binary'):
+        bytes_per_msg = result[mode + '_bytes_per_msg']
+        print(f"Protocole {mode:6s} : {result[mode + '_msgs_per_s']:8.0f} msg/s (PC) | {bytes_per_msg:.1f} o/msg | "
+              f"max {11520 / bytes_per_msg:.0f} msg/s a 115200 bauds")
+    print(f"Gain binaire : x{result['ascii_bytes_per_msg'] / result['binary_bytes_per_msg']:.1f} messages par seconde de liaison | "
+          f"decodage PC x{result['binary_msgs_per_s'] / result['ascii_msgs_per_s']:.2f} (trame analysee octet par octet en Python, "
+          f"ligne ASCII par les fonctions C de CPython) | erreurs aller-retour : {result['roundtrip_errors']}")
+    result = host['parser'] = bench_parser()
+    print(f"Analyseur par rafales : {result['frames_per_s']:8.0f} trames/s (PC) | {result['received']}/{result['expected']} trames | "
+          f"rejetes: {result['discarded']} o | CRC: {result['crc_errors']} | debordements: {result['overflows']}")
+    for name, bench in (('legacy', bench_latency_legacy), ('async', bench_latency_async)):
+        result = host[f"latency_{name}_ms"] = bench()
+        print(f"Latence TH->ME {name:6s}: p50 {result['p50']:6.1f} ms | p95 {result['p95']:6.1f} ms | max {result['max']:6.1f} ms")
+    result = host['dual_core'] = bench_dual_core()
+    print(f"Double coeur : {result['produced_per_s']:6.0f} ech/s produits | {result['consumed_per_s']:6.0f} ech/s consommes | "
+          f"pertes: {result['lost']} | debordements: {result['overruns']}")
+    result = host['correlation'] = bench_correlation()
+    injected = result['injected']
+    print(f"Correlation TH/ME : {result['sent']} requetes | pertes {result['lost']} (injectees {injected['lost']}) | "
+          f"inversions {result['reordered']} ({injected['reordered']}) | doublons {result['duplicates']} ({injected['duplicates']}) | "
+          f"{result['pairs_per_s']:.0f} paires/s (PC)")
+    for consume_ms in (1, 5): # Pico 2 rapide puis lente : débit selon la fenêtre, puis contre-pression
+        for window in (0, 1, 4, 8):
+            result = host[f"transport_{consume_ms}ms_window_{window}"] = bench_transport(window, consume_ms=consume_ms)
+            name = f"fenetre {window}" if window else "sans transport"
+            rate = "n/d" if result['delivered_per_s'] is None else f"{result['delivered_per_s']:.0f} msg/s"
+            print(f"Transport {name:14s} (Pico 2 {consume_ms} ms/consigne) : {result['delivered']}/{result['sent']} consignes | "
+                  f"dans l'ordre: {result['in_order']} | {rate} | reemissions {result.get('retransmits', 0)} | "
+                  f"emissions bloquees {result.get('stalls', 0)}")
+    result = host['baud'] = bench_baud()
+    recovery = "n/d" if result['recovery_s'] is None else f"{result['recovery_s']:.1f} s"
+    print(f"Vitesse UART (cablage 460800 bauds) : {result['negotiated']} bauds en {result['negotiation_ms']:.0f} ms | "
+          f"cablage degrade a 230400 : {result['after_fallback']} bauds apres {recovery} | "
+          f"accord des deux Pico: {result['agreed'] and result['agreed_after_fallback']}")
+    for max_samples, max_age_ms in ((0, 0), (1, 0), (8, 20), (32, 20), (60, 20), (60, 5)): # Débit contre latence
+        result = host[f"batch_{max_samples}_{max_age_ms}ms"] = bench_batch(max_samples, max_age_ms)
+        name = f"lots de {max_samples:2d}, {max_age_ms:2d} ms" if max_samples else "ligne S...E/mesure"
+        latency = result['latency_ms']
+        print(f"Mesures 2000/s {name:19s}: {result['samples_per_s']:6.0f} mesures/s recues | {result['bytes_per_sample']:4.1f} o/mesure | "
+              f"latence p50 {latency['p50']:6.1f} ms | p95 {latency['p95']:6.1f} ms | max {latency['max']:6.1f} ms")
+    result = host['pio_duty_model'] = bench_pio_duty()
+    print(f"Mesure PIO (modele, {result['sm_freq'] / 1e6:.0f} MHz, PWM 1 kHz) : resolution {result['resolution_pct']:.4f} % | "
+          f"erreur max {result['max_error_cycles']} cycles ({result['max_error_centi']} centieme de %) | "
+          f"{result['periods_per_s']:.0f} periodes/s (PC) | {result['steps_per_period']:.0f} instructions interpretees/periode")
+    for source in ("adc", "pio"):
+        result = host[f"duty_response_{source}"] = bench_duty_response(source)
+        delay, error = result['delay_ms'], result['error_pct']
+        name = "filtre RC + ADS1015" if source == "adc" else "PIO"
+        print(f"Mesure apres changement de consigne ({name:19s}) : delai p50 {delay['p50']:5.1f} ms | max {delay['max']:5.1f} ms | "
+              f"erreur p50 {error['p50']:.2f} % | max {error['max']:.2f} % ({result['measurements']} mesures)")
+    result = host['capture'] = bench_capture()
+    dma, ads = result['dma'], result['ads1015']
+    print(f"Capture DMA (ADC interne, {dma['rate']} ech/s) : {dma['samples']} ech a {dma['samples_per_s']:.0f} ech/s | "
+          f"ondulation PWM {dma['ripple_mv']} mV c-c (modele {dma['ripple_model_mv']:.0f} mV)")
+    print(f"Capture ADS1015 ({ads['rate']} ech/s, I2C 400 kHz) : {ads['samples']} ech a {ads['samples_per_s']:.0f} ech/s | "
+          f"echeances manquees {ads['late']} (max {ads['max_late_us']} us) | tau RC {ads['tau_ms']:.1f} ms (modele {ads['tau_model_ms']:.0f} ms)")
+    result = host['i2c_speed'] = bench_i2c_speed()
+    print(f"Bus I2C (fiable jusqu'a 400 kHz) : {result['freq']} Hz retenus | " + " | ".join(
+        f"{freq} Hz {probe['errors']} erreurs" if probe['errors'] else f"{freq} Hz {probe['read_us']} us" for freq, probe in result['results'].items()))
+    for freq, reads in result['reads'].items():
+        print(f"ADS1015 3300 SPS, I2C {int(freq) // 1000:4d} kHz : {reads['samples_per_s']:6.0f} ech/s | transaction {reads['read_us']} us "
+              f"(max {reads['read_max_us']}) | conversions perdues {reads['missed']} (pilote {reads['driver_missed']})")
+    result = host['scan'] = {freq: bench_scan(i2c_freq=freq) for freq in (400000, 100000)}
+    for freq, scan in result.items():
+        print(f"Balayage ADS1015 ({len(scan['channels'])} canaux, I2C {freq // 1000} kHz) : {scan['pipelined_per_s']:.0f} conversions/s "
+              f"(modele {scan['model_per_s']}, {scan['pipelined']} canaux lus pendant la conversion suivante) | "
+              f"conversions uniques successives {scan['sequential_per_s']:.0f}/s | en retard {scan['late']} | lectures jetees {scan['collisions']}")
+        for channel, bench in scan['channels'].items():
+            print(f"  {channel:20s}: {bench['mv']:5d} mV (attendu {scan['expected_mv'][channel.split(':')[0]]:5.0f}) | "
+                  f"{bench['samples']} ech, un toutes les {bench['interval_us']} us")
+    result = host['channels'] = bench_channels()
+    for n, bench in result.items():
+        print(f"Voies PWM + ADS1015 ({n} puce{'s' if n > 1 else ''}, I2C 1 MHz) : {bench['per_s']:6.0f} conversions/s "
+              f"(x{bench['scaling']:.2f}) | en retard {bench['late']} | " +
+              " ".join(f"{mv} mV ({expected:.0f})" for mv, expected in zip(bench['mv'], bench['expected_mv'])))
+    result = host['calibration'] = bench_calibration()
+    print(f"Conversion duty : flottant {result['float_per_s']:8.0f}/s | table {result['table_per_s']:8.0f}/s | "
+          f"table 1/16 {result['table_q4_per_s']:8.0f}/s (PC)")
+    print(f"Calibration (3,22 V, +12 codes) : erreur max ideale {result['ideal_error_pct']['max']:.2f} % | "
+          f"table ajustee {result['fitted_error_pct']['max']:.2f} % ({result['knots']} points)")
+    result = host['import'] = bench_import()
+    for variant, bench in result.items():
+        print(f"Import station ({'source' if variant == 'source' else 'precompile'}) : {bench['import_us'] / 1000:6.1f} ms | "
+              f"pic memoire {bench['peak_bytes'] / 1024:5.0f} ko | gardee {bench['kept_bytes'] / 1024:4.0f} ko (PC)")
+    result = host['fixed'] = pico_bench.bench_fixed(ideal(PGA_4_096), PGA_4_096, iterations=20000)
+    for name, bench in result.items(): # Octets alloués sur le tas : mesurés sur la carte (gc.mem_alloc)
+        unit = "blocs de 64 codes/s" if name.startswith("block") else "mesures/s"
+        print(f"Chaine de mesure {name:13s}: {bench['ops_per_s']:9.0f} {unit} | pic {bench['peak_bytes_per_op']:4d} o/appel (PC)")
+
+    print("=== Pico simulees (temps virtuel) ===")
+    results['sim_speed'] = bench_sim_speed()
+    for name, result in results['sim_speed'].items():
+        print(f"Simulateur {name} : x{result['speedup']:.1f} | {result['switches_per_s']:.0f} passages de jeton/s simulee "
+              f"({result['switch_us']:.0f} us reels chacun)")
+    results['sim'] = bench_sim(args.sim_duration)
+    for name, result in sorted(results['sim'].items()):
+        exchange = result['exchange']
+        print(f"{name} : read_voltage {result['adc']['samples_per_s']:7.0f} ech/s | "
+              f"{exchange['msgs_per_s']:5.1f} msg/s | TX {exchange['tx_bytes_per_s']:6.1f} o/s | RX {exchange['rx_bytes_per_s']:6.1f} o/s | "
+              f"gigue ADC p95 {exchange['adc_jitter_us']['p95']} us | gigue boucle p95 {result['loop']['jitter_us']['p95']} us")
+        ticker = result['ticker']
+        print(f"{name} : machine.Timer 10 ms, boucle chargee : gigue interruption p95 {ticker['tick_jitter_us']['p95']} us | "
+              f"gigue callback p95 {ticker['handler_jitter_us']['p95']} us, max {ticker['handler_jitter_us']['max']} us | "
+              f"retard max {ticker['latency_max_us']} us | ticks en retard {ticker['overruns']}")
+        if 'rtt_ms' in exchange:
+            rtt = exchange['rtt_ms']
+            link = exchange['link']
+            print(f"{name} : aller-retour TH->ME p50 {rtt['p50']:.2f} ms | p95 {rtt['p95']:.2f} ms | max {rtt['max']:.2f} ms | "
+                  f"{exchange['replies']}/{exchange['frames_sent']} reponses | pertes {link['loss_rate']:.1%} | "
+                  f"inversions {link['reordered']} | doublons {link['duplicates']}")
+        if 'settle' in result:
+            settle = result['settle']
+            print(f"{name} : stabilisation RC p50 {settle['settle_ms']['p50']:.0f} ms | max {settle['settle_ms']['max']:.0f} ms | "
+                  f"balayage {settle['steps']} pas en {settle['sweep_ms']:.0f} ms | erreur max {settle['error_pct']['max']:.2f} %")
+        for spec, filt in result.get('filters', {}).items():
+            print(f"{name} : filtre {spec:9s} {filt['read_ms']:5.2f} ms/lecture | ecart type {filt['std_mv']:5.2f} mV | "
+                  f"erreur moyenne {filt['mean_error_mv']:+6.2f} mV | max {filt['max_error_mv']:5.2f} mV | {filt['bits']:.1f} bits")
+
+    with open(args.json, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Resultats ecrits dans {args.json}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# Préparation du déploiement sur les Pico (python3 build.py).
+# Au démarrage, MicroPython compile chaque module .py importé : analyse des
+# commentaires compris, avec un compilateur qui occupe le tas le temps de l'import.
+# Ce script compile à l'avance les modules du projet avec mpy-cross (pip install
+# mpy-cross, même version de format .mpy que le firmware) :
+#   - build/*.mpy : modules importés par les scripts des cartes (station.py et ses
+#     dépendances), niveau d'optimisation -O, code machine ARMv6-M (Cortex-M0+ du
+#     RP2040) pour les fonctions @micropython.native / @micropython.viper ;
+#   - --manifest : manifest.py pour un firmware avec ces modules gelés (frozen),
+#     exécutés depuis la flash sans les copier dans le tas ;
+#   - --measure : temps d'import de station et RAM restante après l'import, source
+#     contre .mpy (et gelé si le firmware l'est). Sur la carte avec --device (mpremote),
+#     sinon sur le PC où CPython tient lieu de MicroPython : .py sans cache contre .pyc
+#     seul, l'équivalent du .mpy (pas d'équivalent gelé).
+# Les scripts des cartes ("Code Pico 1.py", "Code Pico 2.py") restent en source :
+# copiés en main.py, seuls leurs réglages sont analysés au démarrage.
+
+import argparse
+import ast
+import importlib.util
+import os
+import py_compile
+import shutil
+import subprocess
+import sys
+import tempfile
+
+SCRIPTS = ("Code Pico 1.py", "Code Pico 2.py")
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BUILD_DIR = os.path.join(ROOT, "build")
+MARCH = "armv6m" # Émetteurs native et viper du RP2040
+OPT = 1 # -O1 : assert retirés ; -O3 retire aussi les numéros de ligne des traces d'erreur
+PROBE_MODULE = "station"
+
+# Exécuté dans un interpréteur neuf (MicroPython ou CPython) : affiche la durée de
+# l'import (us), le tas libre avant et après (octets, MicroPython) et, avec trace,
+# la mémoire gardée et maximale pendant l'import (octets, CPython) ; -1 si non
+# disponible. Les modules externes (asyncio, array...) sont importés avant la mesure :
+# gelés dans le firmware, ils coûtent autant quelle que soit la forme du projet
+PROBE = """
+import gc, time
+for name in {preload}:
+    try:
+        __import__(name)
+    except ImportError:
+        pass
+tracemalloc = None
+if {trace}:
+    import tracemalloc
+    tracemalloc.start()
+try:
+    ticks, diff = time.ticks_us, time.ticks_diff
+except AttributeError:
+    ticks, diff = lambda: time.perf_counter_ns() // 1000, lambda a, b: a - b
+gc.collect()
+free = gc.mem_free() if hasattr(gc, 'mem_free') else -1
+start = ticks()
+import {module}
+elapsed = diff(ticks(), start)
+gc.collect()
+kept, peak = tracemalloc.get_traced_memory() if tracemalloc else (-1, -1)
+print('PROBE', elapsed, free, gc.mem_free() if hasattr(gc, 'mem_free') else -1, kept, peak, getattr({module}, '__file__', ''))
+"""
+
+
+def imports(path):
+    """Modules importés par path, imports différés (dans les fonctions) compris"""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    return names
+
+
+def is_local(name):
+    return os.path.isfile(os.path.join(ROOT, name + ".py"))
+
+
+def deploy_modules(scripts=SCRIPTS):
+    """Modules du dépôt nécessaires aux scripts des cartes, triés"""
+    modules = set()
+    pending = [os.path.join(ROOT, script) for script in scripts]
+    while pending:
+        for name in imports(pending.pop()):
+            if is_local(name) and name not in modules:
+                modules.add(name)
+                pending.append(os.path.join(ROOT, name + ".py"))
+    return sorted(modules)
+
+
+def external_modules(modules):
+    """Modules hors dépôt importés par modules (bibliothèque de MicroPython ou de CPython)"""
+    names = set()
+    for name in modules:
+        names.update(imports(os.path.join(ROOT, name + ".py")))
+    return tuple(sorted(name for name in names if not is_local(name)))
+
+
+def probe(modules, module=PROBE_MODULE, trace=False):
+    return PROBE.format(preload=external_modules(modules), trace=trace, module=module)
+
+
+def has_native_code(name):
+    with open(os.path.join(ROOT, name + ".py"), encoding="utf-8") as f:
+        source = f.read()
+    return "@micropython.native" in source or "@micropython.viper" in source
+
+
+def mpy_cross_command():
+    """Commande mpy-cross : exécutable dans le PATH, sinon le paquet pip mpy_cross"""
+    if shutil.which("mpy-cross"):
+        return ["mpy-cross"]
+    if importlib.util.find_spec("mpy_cross") is None:
+        raise RuntimeError("mpy-cross introuvable (pip install mpy-cross)")
+    return [sys.executable, "-m", "mpy_cross"]
+
+
+def compile_modules(modules, out_dir=BUILD_DIR, opt=OPT, march=MARCH):
+    """Compile chaque module en out_dir/<module>.mpy ; retourne {module: (octets source, octets .mpy)}"""
+    command = mpy_cross_command()
+    os.makedirs(out_dir, exist_ok=True)
+    sizes = {}
+    for name in modules:
+        source = os.path.join(ROOT, name + ".py")
+        target = os.path.join(out_dir, name + ".mpy")
+        args = command + [f"-O{opt}", "-s", name + ".py", "-o", target]
+        if march:
+            args.append(f"-march={march}")
+        subprocess.run(args + [source], check=True)
+        sizes[name] = (os.path.getsize(source), os.path.getsize(target))
+    return sizes
+
+
+def write_manifest(modules, path, opt=OPT):
+    """manifest.py du firmware rp2 (make BOARD=RPI_PICO FROZEN_MANIFEST=path) avec les modules gelés"""
+    with open(path, "w") as f:
+        f.write("# Généré par build.py : modules du projet gelés dans le firmware\n")
+        f.write('include("$(PORT_DIR)/boards/manifest.py")\n')
+        for name in modules:
+            f.write(f'module("{name}.py", base_path="{ROOT}", opt={opt})\n')
+
+
+def parse_probe(output):
+    for line in output.splitlines():
+        if line.startswith("PROBE "):
+            fields = line.split(" ", 6)
+            values = [int(value) for value in fields[1:6]]
+            values = [None if value < 0 else value for value in values]
+            return {'import_us': values[0], 'free_before': values[1], 'free_after': values[2],
+                    'kept_bytes': values[3], 'peak_bytes': values[4], 'file': fields[6] if len(fields) > 6 else ''}
+    raise RuntimeError(f"Mesure d'import sans résultat : {output.strip()[-200:]}")
+
+
+def measure_host(modules, variant, module=PROBE_MODULE, runs=5):
+    """Import de module par CPython dans un interpréteur neuf : "source" (.py compilés à l'import)
+    ou "mpy" (.pyc seuls, sans source, comme les .mpy sur la carte). Durée médiane de runs
+    imports, mémoire mesurée à part (tracemalloc ralentit l'import)"""
+    with tempfile.TemporaryDirectory() as work:
+        for name in modules:
+            source = os.path.join(ROOT, name + ".py")
+            if variant == "source":
+                shutil.copy(source, work)
+            else:
+                py_compile.compile(source, cfile=os.path.join(work, name + ".pyc"), doraise=True)
+
+        def run(trace):
+            result = subprocess.run([sys.executable, "-B", "-c", probe(modules, module, trace)],
+                                    cwd=work, capture_output=True, text=True)
+            return parse_probe(result.stdout + result.stderr)
+
+        times = sorted(run(False)['import_us'] for _ in range(runs))
+        result = run(True)
+        result['import_us'] = times[runs // 2]
+        return result
+
+
+def mpremote(device, *args):
+    result = subprocess.run(["mpremote", "connect", device, *args], capture_output=True, text=True)
+    return result.stdout + result.stderr
+
+
+def measure_board(device, modules, variant, out_dir=BUILD_DIR, module=PROBE_MODULE):
+    """Import de module sur la carte après un redémarrage logiciel : "source" (.py copiés),
+    "mpy" (.mpy de out_dir copiés) ou "frozen" (aucun fichier : modules gelés du firmware).
+    Les fichiers des autres variantes sont retirés, la racine de la flash passant avant .frozen"""
+    for name in modules:
+        for ext in (".py", ".mpy"):
+            mpremote(device, "fs", "rm", f":{name}{ext}")
+        if variant == "source":
+            mpremote(device, "fs", "cp", os.path.join(ROOT, name + ".py"), ":")
+        elif variant == "mpy":
+            mpremote(device, "fs", "cp", os.path.join(out_dir, name + ".mpy"), ":")
+    return parse_probe(mpremote(device, "soft-reset", "exec", probe(modules, module)))
+
+
+def print_measure(variant, result):
+    memory = (f"tas libre {result['free_after']} o (import {result['free_before'] - result['free_after']} o)"
+              if result['free_after'] is not None else
+              f"memoire gardee {result['kept_bytes'] / 1024:.0f} ko | pic {result['peak_bytes'] / 1024:.0f} ko")
+    print(f"Import {PROBE_MODULE} ({variant:6s}) : {result['import_us'] / 1000:7.1f} ms | {memory} | {result['file']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Modules précompilés (.mpy) et firmware gelé pour les Pico")
+    parser.add_argument("--out", default=BUILD_DIR, help="Dossier des .mpy et du manifeste")
+    parser.add_argument("--opt", type=int, default=OPT, help="Niveau d'optimisation de mpy-cross (0 à 3)")
+    parser.add_argument("--march", default=MARCH, help="Architecture du code native/viper ('' : bytecode seul)")
+    parser.add_argument("--manifest", action="store_true", help="Écrit aussi manifest.py (modules gelés)")
+    parser.add_argument("--measure", action="store_true", help="Mesure l'import : source contre .mpy (et gelé avec --device)")
+    parser.add_argument("--device", help="Port série de la carte pour --measure (mpremote), PC sinon")
+    parser.add_argument("--frozen", action="store_true", help="Avec --device : le firmware contient les modules gelés")
+    args = parser.parse_args(argv)
+
+    modules = deploy_modules()
+    native = [name for name in modules if has_native_code(name)]
+    sizes = compile_modules(modules, args.out, args.opt, args.march)
+    source_total = sum(size[0] for size in sizes.values())
+    mpy_total = sum(size[1] for size in sizes.values())
+    print(f"{len(modules)} modules compilés dans {args.out} (-O{args.opt}, -march={args.march or 'aucun'}) : "
+          f"{source_total} o de source -> {mpy_total} o de .mpy | code machine : {', '.join(native) or 'aucun'}")
+    if args.manifest:
+        path = os.path.join(args.out, "manifest.py")
+        write_manifest(modules, path, args.opt)
+        print(f"Manifeste : {path}")
+    print(f"Carte : mpremote cp {args.out}/*.mpy : + mpremote cp \"Code Pico 1.py\" :main.py (\"Code Pico 2.py\" sur Pico 2)")
+    if args.measure:
+        if args.device:
+            variants = ("source", "mpy", "frozen") if args.frozen else ("source", "mpy")
+            for variant in variants:
+                print_measure(variant, measure_board(args.device, modules, variant, args.out))
+        else:
+            for variant in ("source", "mpy"):
+                print_measure(variant, measure_host(modules, variant))
+
+
+if __name__ == "__main__":
+    main()
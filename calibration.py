@@ -0,0 +1,155 @@
+# Calibration code ADC -> rapport cyclique, propre à chaque carte.
+# La conversion idéale voltage / 3.3 * 100 ignore la tension réelle de la sortie PWM,
+# les chutes dans le filtre RC et le décalage de l'ADC, et coûte plusieurs opérations
+# flottantes par mesure. Ici, un balayage fournit des couples (consigne, code ADC
+# stabilisé) ; on en tire une courbe linéaire par morceaux (ou gain/décalage), puis
+# une table de 2048 entiers indexée par le code ADC, en centièmes de pourcent.
+# À l'exécution : une lecture de table (et une interpolation entière pour les codes
+# fractionnaires des filtres). La calibration est enregistrée en JSON sur la flash.
+
+import json
+from array import array
+
+from ads1015 import FULL_SCALE, PGA_4_096
+
+CALIBRATION_FILE = "calibration.json"
+VDD = 3.3 # Tension haute idéale de la sortie PWM
+MAX_KNOTS = 32 # Points de la courbe linéaire par morceaux
+TABLE_SIZE = 2048 # Codes positifs de l'ADS1015 (12 bits signés)
+FRAC_BITS = 4 # Codes fractionnaires en 1/16 (comme adc_filter.py)
+
+
+class Calibration:
+    """Courbe code ADC (1/16 de code) -> rapport cyclique (centièmes de pourcent) et sa table"""
+
+    def __init__(self, knots, pga=PGA_4_096, mode="pwl"):
+        if len(knots) < 2:
+            raise ValueError("Calibration: au moins deux points")
+        self.knots = knots # [(code en 1/16, centièmes de pourcent)] par code croissant
+        self.pga = pga
+        self.mode = mode
+        self.table = array('H', bytes(2 * (TABLE_SIZE + 1))) # +1 : interpolation du dernier code
+        self._build()
+
+    def _build(self):
+        knots = self.knots
+        table = self.table
+        segment = 0
+        last = len(knots) - 2
+        for code in range(TABLE_SIZE + 1):
+            x = code << FRAC_BITS
+            while segment < last and x > knots[segment + 1][0]:
+                segment += 1
+            x0, y0 = knots[segment]
+            x1, y1 = knots[segment + 1] # Hors des points : prolongement du segment extrême
+            duty = y0 + (y1 - y0) * (x - x0) // (x1 - x0) if x1 != x0 else y0
+            table[code] = 0 if duty < 0 else 10000 if duty > 10000 else duty
+
+    def duty_centi(self, raw):
+        """Rapport cyclique (centièmes de pourcent) d'un code ADC entier"""
+        if raw <= 0:
+            return self.table[0]
+        if raw >= TABLE_SIZE:
+            return self.table[TABLE_SIZE]
+        return self.table[raw]
+
+    def duty_centi_q4(self, value):
+        """Rapport cyclique (centièmes de pourcent) d'un code en 1/16 (filtres de adc_filter.py)"""
+        table = self.table
+        code = value >> FRAC_BITS
+        if code < 0:
+            return table[0]
+        if code >= TABLE_SIZE:
+            return table[TABLE_SIZE]
+        low = table[code]
+        return low + ((table[code + 1] - low) * (value & 15) >> FRAC_BITS)
+
+    def duty(self, raw):
+        """Rapport cyclique en pourcent (affichage) d'un code entier ou fractionnaire"""
+        if isinstance(raw, int):
+            return self.duty_centi(raw) / 100
+        return self.duty_centi_q4(int(raw * 16)) / 100
+
+    def save(self, path=CALIBRATION_FILE):
+        with open(path, "w") as f:
+            json.dump({'pga': self.pga, 'mode': self.mode, 'knots': self.knots}, f)
+
+
+def ideal(pga=PGA_4_096, vdd=VDD):
+    """Calibration théorique : rapport cyclique = tension / vdd"""
+    full = int(vdd * TABLE_SIZE / FULL_SCALE[pga] * 16 + 0.5)
+    return Calibration([(0, 0), (full, 10000)], pga, "ideal")
+
+
+def load(path=CALIBRATION_FILE, pga=PGA_4_096):
+    """Calibration enregistrée, ou théorique si le fichier manque, est illisible (clé 'knots' absente,
+    points mal formés) ou ne correspond pas au gain"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return ideal(pga)
+    if not isinstance(data, dict) or data.get('pga') != pga:
+        return ideal(pga)
+    try:
+        knots = [(int(x), int(y)) for x, y in data['knots']]
+        return Calibration(knots, pga, data.get('mode', "pwl"))
+    except (KeyError, TypeError, ValueError):
+        return ideal(pga)
+
+
+class Calibrator:
+    """Couples (consigne, code ADC stabilisé) recueillis pendant un balayage"""
+
+    def __init__(self, capacity=256):
+        self.duty = array('h', bytes(2 * capacity)) # Centièmes de pourcent
+        self.raw = array('h', bytes(2 * capacity)) # Codes en 1/16
+        self.count = 0
+
+    def add(self, duty_centi, raw):
+        """Ajoute un point (raw : code ADC entier ou fractionnaire) ; ignoré si plein"""
+        self.add_q4(duty_centi, int(raw * 16))
+
+    def add_q4(self, duty_centi, value):
+        """Ajoute un point dont le code ADC est déjà en 1/16 (entier) ; ignoré si plein"""
+        if self.count < len(self.duty):
+            self.duty[self.count] = duty_centi
+            self.raw[self.count] = value
+            self.count += 1
+
+    def _sorted(self):
+        return sorted((self.raw[i], self.duty[i]) for i in range(self.count))
+
+    def fit_linear(self, pga=PGA_4_096):
+        """Gain et décalage par moindres carrés"""
+        points = self._sorted()
+        n = len(points)
+        if n < 2:
+            raise ValueError("Calibration: au moins deux points")
+        mean_x = sum(p[0] for p in points) / n
+        mean_y = sum(p[1] for p in points) / n
+        var = sum((p[0] - mean_x) ** 2 for p in points)
+        if not var:
+            raise ValueError("Calibration: codes ADC tous identiques")
+        gain = sum((p[0] - mean_x) * (p[1] - mean_y) for p in points) / var
+        x0, x1 = 0, TABLE_SIZE << FRAC_BITS
+        knots = [(x0, int(mean_y + gain * (x0 - mean_x))), (x1, int(mean_y + gain * (x1 - mean_x)))]
+        return Calibration(knots, pga, "linear")
+
+    def fit(self, pga=PGA_4_096, max_knots=MAX_KNOTS):
+        """Courbe linéaire par morceaux : points regroupés et moyennés par codes croissants"""
+        points = self._sorted()
+        n = len(points)
+        groups = min(max_knots, n)
+        knots = []
+        for g in range(groups):
+            group = points[g * n // groups:(g + 1) * n // groups]
+            x = sum(p[0] for p in group) // len(group)
+            y = sum(p[1] for p in group) // len(group)
+            if knots and x <= knots[-1][0]: # Codes égaux (bruit) : on fusionne
+                px, py = knots.pop()
+                x, y = px, (py + y) // 2
+            knots.append((x, y))
+        if len(knots) < 2:
+            raise ValueError("Calibration: pas assez de codes ADC distincts")
+        return Calibration(knots, pga, "pwl")
@@ -0,0 +1,166 @@
+# Acquisition d'un bloc d'échantillons à cadence fixe dans un tampon préalloué.
+# Les lectures habituelles rendent un échantillon par appel Python : impossible d'y
+# voir l'ondulation PWM (1 kHz) ou la forme d'un transitoire du filtre RC. Ici :
+#   - AdcDmaCapture : l'ADC interne du RP2040 (GP26 à GP28) convertit en continu,
+#     cadencé par son diviseur d'horloge (jusqu'à 500 000 ech/s), et un canal DMA
+#     recopie chaque résultat de son FIFO dans le tableau, sans le processeur ;
+#   - Ads1015Capture : l'ADS1015 convertit en continu et une boucle serrée lit son
+#     registre de conversion à échéances fixes (ticks_us), au plus à son débit.
+# capture() rend une memoryview sur le tableau : pas de copie, elle s'analyse sur
+# place ou s'envoie telle quelle (uart.write accepte une memoryview).
+
+from compat import const, ticks_us, ticks_diff, ticks_add
+from ads1015 import REG_CONVERSION, RATE_MARGIN_PCT
+
+# Registres de l'ADC interne (RP2040, chapitre 4.9)
+ADC_BASE = const(0x4004C000)
+ADC_CS = const(0x00)
+ADC_FCS = const(0x08)
+ADC_FIFO = const(0x0C)
+ADC_DIV = const(0x10)
+CS_EN = const(0x0001)
+CS_START_MANY = const(0x0008)
+FCS_EN = const(0x0001) # Résultats dans le FIFO
+FCS_DREQ_EN = const(0x0008) # Requête DMA dès qu'un résultat est disponible
+FCS_THRESH_1 = const(0x01000000)
+DREQ_ADC = const(36)
+ADC_CLOCK = const(48_000_000)
+ADC_MIN_CYCLES = const(96) # Une conversion : 96 cycles à 48 MHz (500 000 ech/s)
+ADC_BITS = const(12)
+ADC_VREF_MV = const(3300)
+
+
+def adc_div(rate):
+    """Valeur du registre DIV (entier.fraction sur 8 bits) pour rate conversions/s"""
+    cycles = ADC_CLOCK * 256 // rate
+    if cycles < ADC_MIN_CYCLES * 256:
+        raise ValueError(f"Cadence ADC trop elevee: {rate}")
+    return cycles - 256 # Période = 1 + DIV cycles
+
+
+def adc_to_mv(raw):
+    """Code 12 bits de l'ADC interne -> millivolts (référence 3,3 V)"""
+    return (raw * ADC_VREF_MV + (1 << (ADC_BITS - 1))) >> ADC_BITS
+
+
+class AdcDmaCapture:
+    """Bloc de conversions de l'ADC interne (canal 0 à 2, GP26 à GP28) copié par DMA dans un array('H').
+
+    start() lance l'acquisition et rend la main (le processeur reste libre),
+    done() indique sa fin ; capture() fait les deux. rate est la cadence réelle
+    après arrondi du diviseur (1/256 de cycle).
+    """
+
+    def __init__(self, channel=0, rate=100000):
+        import rp2
+        from machine import ADC, mem32
+        ADC(26 + channel) # Broche en entrée analogique
+        self._mem32 = mem32
+        self.channel = channel
+        self.div = adc_div(rate)
+        self.rate = ADC_CLOCK * 256 // (self.div + 256)
+        self.dma = rp2.DMA()
+        self._ctrl = self.dma.pack_ctrl(size=1, inc_read=False, inc_write=True, treq_sel=DREQ_ADC) # Demi-mots
+        self._count = 0
+
+    def _drain(self):
+        mem32 = self._mem32
+        while (mem32[ADC_BASE + ADC_FCS] >> 16) & 0xF: # LEVEL : résultats restant dans le FIFO
+            mem32[ADC_BASE + ADC_FIFO]
+
+    def start(self, samples, n=None):
+        """Démarre l'acquisition de n conversions dans samples (array('H') préalloué)"""
+        if n is None:
+            n = len(samples)
+        mem32 = self._mem32
+        mem32[ADC_BASE + ADC_CS] = CS_EN | self.channel << 12 # Arrêt de START_MANY, canal
+        self._drain()
+        mem32[ADC_BASE + ADC_FCS] = FCS_EN | FCS_DREQ_EN | FCS_THRESH_1
+        mem32[ADC_BASE + ADC_DIV] = self.div
+        self._count = n
+        self.dma.config(read=ADC_BASE + ADC_FIFO, write=samples, count=n, ctrl=self._ctrl, trigger=True)
+        mem32[ADC_BASE + ADC_CS] = CS_EN | self.channel << 12 | CS_START_MANY
+
+    def done(self):
+        """Vrai quand toutes les conversions sont dans le tableau (l'ADC est alors arrêté)"""
+        if self.dma.active():
+            return False
+        mem32 = self._mem32
+        mem32[ADC_BASE + ADC_CS] = CS_EN | self.channel << 12
+        mem32[ADC_BASE + ADC_FCS] = 0
+        self._drain()
+        return True
+
+    def capture(self, samples, n=None):
+        """Acquisition bloquante ; retourne une memoryview sur les n conversions"""
+        self.start(samples, n)
+        while not self.done():
+            pass
+        return memoryview(samples)[:self._count]
+
+    def close(self):
+        self.dma.close()
+
+
+class Ads1015Capture:
+    """Bloc de conversions ADS1015 à cadence fixe dans un array('h'), boucle serrée sur ticks_us.
+
+    L'ADS1015 convertit en continu à son débit ; chaque échéance lit la dernière
+    conversion (rate doit rester sous ce débit, marge d'horloge comprise, sinon
+    certaines sont lues deux fois). Compteurs de la dernière acquisition : late
+    (échéances manquées de plus d'une demi-période, transfert I2C trop long) et
+    max_late_us.
+    """
+
+    def __init__(self, adc, rate=None):
+        if rate is None:
+            rate = adc.rate * 100 // (100 + RATE_MARGIN_PCT)
+        if rate > adc.rate:
+            raise ValueError(f"Cadence superieure au debit de l'ADS1015: {rate}")
+        self.adc = adc
+        self.rate = rate
+        self.period_us = 1000000 // rate
+        self._buf = bytearray(2)
+        self.late = 0
+        self.max_late_us = 0
+        self.duration_us = 0
+
+    def capture(self, samples, n=None, stamps=None):
+        """Remplit samples (et stamps, array('i') de ticks_us, si fourni) ; retourne une memoryview sur les n codes"""
+        if n is None:
+            n = len(samples)
+        adc = self.adc
+        if not adc.configured:
+            adc.start()
+            adc.wait_ready() # Première conversion terminée
+        i2c = adc.i2c
+        address = adc.address
+        buf = self._buf
+        period = self.period_us
+        late = 0
+        max_late = 0
+        start = ticks_us()
+        due = start
+        for i in range(n):
+            now = ticks_us()
+            while ticks_diff(due, now) > 0:
+                now = ticks_us()
+            lateness = ticks_diff(now, due)
+            if lateness > max_late:
+                max_late = lateness
+            if lateness > period >> 1:
+                late += 1
+            try:
+                i2c.readfrom_mem_into(address, REG_CONVERSION, buf)
+            except OSError:
+                adc.configured = False
+                raise
+            raw = (buf[0] << 8 | buf[1]) >> 4
+            samples[i] = raw - 4096 if raw > 2047 else raw
+            if stamps is not None:
+                stamps[i] = now
+            due = ticks_add(due, period) # Échéances absolues : pas de dérive
+        self.late = late
+        self.max_late_us = max_late
+        self.duration_us = ticks_diff(ticks_us(), start)
+        return memoryview(samples)[:n]
@@ -0,0 +1,122 @@
+# Plusieurs voies de validation sur une même carte : une sortie PWM et une entrée
+# ADS1015 par voie, au lieu de la seule paire GP16 / AIN2 de 0x48.
+# Le RP2040 a 8 tranches PWM (slices) de deux sorties A/B : la tranche d'une broche
+# est (broche >> 1) & 7, sa sortie broche & 1. Deux voies ne peuvent pas partager
+# une sortie, et les deux sorties d'une tranche ont la même fréquence.
+# Jusqu'à quatre ADS1015 partagent le bus I2C (ADDR reliée à GND, VDD, SDA ou SCL :
+# 0x48 à 0x4B). Chaque puce convertit de son côté ; le bus ne sert qu'aux écritures
+# de configuration et aux lectures. poll() sert la puce dont la conversion est
+# terminée depuis le plus longtemps : pendant qu'on lit l'une, les autres
+# convertissent, et le débit total croît avec le nombre de puces jusqu'à saturer le bus.
+# Sur chaque puce, les entrées des voies sont balayées par un MuxScanner (scanner.py).
+
+from ads1015 import ADS1015, PGA_4_096
+from scanner import MuxScanner, parse_channel
+from fixed import duty_u16
+from compat import sleep_us
+
+ADS1015_ADDRESSES = (0x48, 0x49, 0x4A, 0x4B)
+
+
+def pwm_slice(pin):
+    """(tranche, sortie) PWM d'une broche GPIO du RP2040"""
+    return (pin >> 1) & 7, pin & 1
+
+
+class ChannelManager:
+    """Voies (broche PWM, adresse ADS1015, entrée) d'une carte : rapport cyclique de chaque sortie
+    et mesures de chaque entrée, les conversions des différentes puces se recouvrant.
+
+    channels : (broche, adresse, entrée) où entrée est un code MUX, un (mux, pga, débit) ou
+    "ain2:4.096:3300" ; broche None pour une entrée seule. Les échantillons de la voie k sont
+    dans scanners et rendus par latest(k) / samples(k). i2c_freq (fréquence du bus) décide de
+    l'ordre lecture / démarrage de chaque MuxScanner. Compteurs : conversions, et
+    reads[adresse] par puce.
+    """
+
+    def __init__(self, i2c, channels, pwm_freq=1000, rate=3300, i2c_freq=100000):
+        from machine import Pin, PWM
+        outputs = {}
+        devices = {} # Adresse -> entrées de la puce
+        self.where = [] # Voie -> (adresse, index dans le MuxScanner de la puce)
+        self.pwms = []
+        for pin, address, source in channels:
+            if address not in ADS1015_ADDRESSES:
+                raise ValueError(f"Adresse ADS1015 invalide: {address:#x}")
+            if isinstance(source, str):
+                source = parse_channel(source)
+            elif isinstance(source, int):
+                source = (source, PGA_4_096, rate)
+            inputs = devices.setdefault(address, [])
+            self.where.append((address, len(inputs)))
+            inputs.append(source)
+            pwm = None
+            if pin is not None:
+                output = pwm_slice(pin)
+                if output in outputs:
+                    raise ValueError(f"GP{pin} et GP{outputs[output]} partagent la sortie PWM {output[0]}{'AB'[output[1]]}")
+                outputs[output] = pin
+                pwm = PWM(Pin(pin))
+                pwm.freq(pwm_freq) # Même fréquence pour toutes les voies : aucun conflit entre sorties A et B
+            self.pwms.append(pwm)
+        self.scanners = {address: MuxScanner(ADS1015(i2c, address), inputs, i2c_freq=i2c_freq) for address, inputs in devices.items()}
+        self._order = list(self.scanners.values())
+        self.reads = {address: 0 for address in devices}
+        self.conversions = 0
+
+    def set_duty(self, index, centi):
+        """Rapport cyclique (centièmes de pourcent) de la sortie de la voie"""
+        self.pwms[index].duty_u16(duty_u16(centi))
+
+    def poll(self):
+        """Lit la conversion terminée depuis le plus longtemps, toutes puces confondues ; retourne l'adresse lue ou -1"""
+        best = None
+        best_wait = 0
+        for scanner in self._order:
+            wait = scanner.due_us()
+            if wait <= best_wait:
+                best = scanner
+                best_wait = wait
+        if best is None or best.poll() < 0: # Premier appel : la puce démarre sa première conversion
+            return -1
+        address = best.adc.address
+        self.reads[address] += 1
+        self.conversions += 1
+        return address
+
+    def due_us(self):
+        """Attente (µs) avant la prochaine conversion terminée, négative si une est déjà prête"""
+        return min(scanner.due_us() for scanner in self._order)
+
+    def run(self, conversions):
+        """Attend et lit conversions résultats, toutes voies confondues"""
+        done = 0
+        while done < conversions:
+            if self.poll() < 0:
+                wait = self.due_us()
+                if wait > 0:
+                    sleep_us(wait)
+            else:
+                done += 1
+        return done
+
+    def stop(self):
+        """Arrête chaque puce après sa conversion en cours"""
+        for scanner in self._order:
+            scanner.stop()
+
+    def latest(self, index):
+        """(code, ticks_us) du dernier échantillon de la voie, None s'il n'y en a pas"""
+        address, k = self.where[index]
+        return self.scanners[address].latest(k)
+
+    def samples(self, index):
+        """Échantillons gardés de la voie, du plus ancien au plus récent : liste de (ticks_us, code)"""
+        address, k = self.where[index]
+        return self.scanners[address].samples(k)
+
+    def mv(self, index, code):
+        """Code de la voie -> millivolts selon son gain"""
+        address, k = self.where[index]
+        return self.scanners[address].mv(k, code)
+
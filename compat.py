@@ -0,0 +1,67 @@
+# Compatibilité MicroPython / CPython.
+# Sur la Pico, les fonctions ticks_* et sleep_* viennent directement du module time.
+# Sur un PC (tests et bancs de mesure hôte), on les reproduit avec perf_counter_ns,
+# y compris le rebouclage des compteurs, pour que le code se comporte de la même façon.
+
+import time
+
+try:
+    from time import ticks_ms, ticks_us, ticks_diff, ticks_add, sleep_ms, sleep_us
+except ImportError:
+    TICKS_PERIOD = 1 << 30 # Période des compteurs ticks sur RP2040
+    _TICKS_HALF = TICKS_PERIOD // 2
+    _TICKS_MASK = TICKS_PERIOD - 1
+    _clock_ns = time.perf_counter_ns
+    _sleep = time.sleep
+
+    def set_host_clock(clock_ns, sleep):
+        """Remplace l'horloge du PC (utilisé par le simulateur à temps virtuel)"""
+        global _clock_ns, _sleep
+        _clock_ns = clock_ns
+        _sleep = sleep
+
+    def ticks_us():
+        """Compteur de microsecondes (rebouclage à 2**30)"""
+        return (_clock_ns() // 1000) & _TICKS_MASK
+
+    def ticks_ms():
+        """Compteur de millisecondes (rebouclage à 2**30)"""
+        return (_clock_ns() // 1000000) & _TICKS_MASK
+
+    def ticks_diff(a, b):
+        """Différence signée a - b entre deux valeurs de ticks"""
+        return ((a - b + _TICKS_HALF) & _TICKS_MASK) - _TICKS_HALF
+
+    def ticks_add(a, delta):
+        """Ajoute delta à une valeur de ticks"""
+        return (a + delta) & _TICKS_MASK
+
+    def sleep_ms(ms):
+        _sleep(ms / 1000)
+
+    def sleep_us(us):
+        _sleep(us / 1000000)
+
+try:
+    from micropython import const
+except ImportError:
+    def const(x):
+        return x
+
+try:
+    import micropython
+except ImportError:
+    class micropython:
+        # Les émetteurs de code machine sont reconnus par le compilateur de MicroPython
+        # à l'écriture exacte @micropython.native / @micropython.viper : sur PC, la
+        # fonction Python reste telle quelle
+        @staticmethod
+        def native(f):
+            return f
+
+        viper = native
+
+        @staticmethod
+        def schedule(function, arg):
+            # Sur PC, sans simulateur, pas d'interruption à différer : appel immédiat
+            function(arg)
@@ -0,0 +1,210 @@
+# Corrélation requête/réponse par numéro de séquence (trames TH -> ME).
+# Les numéros de séquence tiennent sur un octet et rebouclent à 256 : on ne les
+# compare jamais directement (seq <= dernier reçu), mais par leur différence signée
+# modulo 256 (seq_diff), comme ticks_diff pour les compteurs de temps. Une réponse
+# est donc correctement classée tant que moins de 128 trames séparent les deux.
+#
+# InFlight : côté émetteur (Pico 1), table des requêtes en attente indexée par
+# séquence, avec l'instant d'émission ; chaque réponse donne un aller-retour, et
+# les requêtes sans réponse après timeout_ms sont comptées perdues.
+# SeqTracker : côté récepteur (Pico 2), flux entrant sans réponse attendue ;
+# fenêtre de 30 séquences (comme l'anti-rejeu de DTLS) pour distinguer trous,
+# doublons et trames réordonnées.
+
+from array import array
+
+from compat import ticks_us, ticks_diff
+
+SEQ_MOD = 256
+_SEQ_HALF = SEQ_MOD // 2
+_SEQ_MASK = SEQ_MOD - 1
+WINDOW = 30 # Séquences récentes mémorisées par SeqTracker (masque dans un petit entier MicroPython)
+_WINDOW_MASK = (1 << WINDOW) - 1
+
+# État d'une entrée de InFlight
+_FREE = 0
+_PENDING = 1
+_EXPIRED = 2 # Comptée perdue ; une réponse tardive reste acceptée
+_DONE = 3
+
+
+def seq_diff(a, b):
+    """Différence signée a - b entre deux numéros de séquence (-128..127)"""
+    return ((a - b + _SEQ_HALF) & _SEQ_MASK) - _SEQ_HALF
+
+
+class InFlight:
+    """Requêtes envoyées en attente de réponse, indexées par numéro de séquence.
+
+    Compteurs : sent, replied, lost (sans réponse après timeout_ms, ou écrasées
+    256 requêtes plus tard), late (réponses arrivées après leur timeout, retirées
+    de lost), reordered (réponse plus ancienne qu'une réponse déjà reçue),
+    duplicates (réponse à une requête déjà servie) et unknown (séquence jamais
+    envoyée). Les derniers allers-retours sont gardés dans un tampon circulaire.
+    """
+
+    def __init__(self, timeout_ms=1000, history=256):
+        self.timeout_us = timeout_ms * 1000
+        self._state = bytearray(SEQ_MOD)
+        self._sent_us = array('i', bytes(4 * SEQ_MOD))
+        self._value = array('h', bytes(2 * SEQ_MOD))
+        self._rtt = array('i', bytes(4 * history))
+        self._rtt_index = 0
+        self._rtt_count = 0
+        self._oldest = 0 # Première séquence possiblement en attente (parcours de expire)
+        self._newest = None # Dernière séquence envoyée
+        self._last_reply = None # Séquence de la réponse la plus récente
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.sent = 0
+        self.replied = 0
+        self.lost = 0
+        self.late = 0
+        self.reordered = 0
+        self.duplicates = 0
+        self.unknown = 0
+        self._rtt_index = 0
+        self._rtt_count = 0
+
+    def add(self, seq, value=0, now=None):
+        """Enregistre l'envoi de la requête seq (value : donnée rendue par match, int16)"""
+        seq &= _SEQ_MASK
+        if self._state[seq] == _PENDING: # Toujours sans réponse 256 requêtes plus tard
+            self.lost += 1
+        self._state[seq] = _PENDING
+        self._sent_us[seq] = ticks_us() if now is None else now
+        self._value[seq] = value
+        if self._newest is None:
+            self._oldest = seq
+        self._newest = seq
+        self.sent += 1
+
+    def pending(self, seq):
+        """Vrai si la requête seq attend encore sa réponse"""
+        return self._state[seq & _SEQ_MASK] == _PENDING
+
+    def match(self, seq, now=None):
+        """Associe une réponse à sa requête : retourne la valeur enregistrée, ou None (doublon, inconnue)"""
+        seq &= _SEQ_MASK
+        state = self._state[seq]
+        if state == _DONE:
+            self.duplicates += 1
+            return None
+        if state == _FREE:
+            self.unknown += 1
+            return None
+        if now is None:
+            now = ticks_us()
+        if state == _EXPIRED:
+            self.lost -= 1
+            self.late += 1
+        self._state[seq] = _DONE
+        self.replied += 1
+        rtt = self._rtt
+        rtt[self._rtt_index] = ticks_diff(now, self._sent_us[seq])
+        self._rtt_index = (self._rtt_index + 1) % len(rtt)
+        if self._rtt_count < len(rtt):
+            self._rtt_count += 1
+        if self._last_reply is not None and seq_diff(seq, self._last_reply) < 0:
+            self.reordered += 1
+        else:
+            self._last_reply = seq
+        return self._value[seq]
+
+    def expire(self, now=None):
+        """Compte perdues les requêtes sans réponse depuis timeout_ms ; retourne leur nombre"""
+        if self._newest is None:
+            return 0
+        if now is None:
+            now = ticks_us()
+        state = self._state
+        expired = 0
+        seq = self._oldest
+        end = (self._newest + 1) & _SEQ_MASK
+        while seq != end:
+            if state[seq] == _PENDING:
+                if ticks_diff(now, self._sent_us[seq]) < self.timeout_us:
+                    break # Les suivantes sont plus récentes
+                state[seq] = _EXPIRED
+                expired += 1
+            seq = (seq + 1) & _SEQ_MASK
+        self._oldest = seq
+        self.lost += expired
+        return expired
+
+    def in_flight(self):
+        """Requêtes en attente de réponse"""
+        return sum(1 for state in self._state if state == _PENDING)
+
+    def latencies_us(self):
+        """Derniers allers-retours mesurés (µs), du plus ancien au plus récent"""
+        rtt = self._rtt
+        n = self._rtt_count
+        start = (self._rtt_index - n) % len(rtt)
+        return [rtt[(start + i) % len(rtt)] for i in range(n)]
+
+    def loss_rate(self):
+        """Part des requêtes terminées (réponse ou timeout) restées sans réponse"""
+        done = self.replied + self.lost
+        return self.lost / done if done else 0.0
+
+    def stats(self):
+        return {
+            'sent': self.sent,
+            'replied': self.replied,
+            'lost': self.lost,
+            'late': self.late,
+            'reordered': self.reordered,
+            'duplicates': self.duplicates,
+            'unknown': self.unknown,
+            'loss_rate': self.loss_rate(),
+        }
+
+
+class SeqTracker:
+    """Séquences d'un flux entrant : nouvelles, manquantes, réordonnées ou en double.
+
+    update(seq) est vrai pour une séquence plus récente que toutes les
+    précédentes (à traiter) ; une trame plus ancienne, même jamais vue, est
+    comptée réordonnée et rejetée pour ne pas appliquer une consigne périmée.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.newest = None
+        self._seen = 0 # Bit i : séquence newest - i reçue
+        self.received = 0
+        self.missing = 0 # Séquences sautées (pas encore arrivées)
+        self.reordered = 0
+        self.duplicates = 0
+
+    def update(self, seq):
+        """Enregistre une séquence reçue ; vrai si elle est la plus récente"""
+        seq &= _SEQ_MASK
+        if self.newest is None:
+            self.newest = seq
+            self._seen = 1
+            self.received += 1
+            return True
+        ahead = seq_diff(seq, self.newest)
+        if ahead > 0:
+            self.missing += ahead - 1
+            self._seen = ((self._seen << ahead) | 1) & _WINDOW_MASK if ahead < WINDOW else 1
+            self.newest = seq
+            self.received += 1
+            return True
+        behind = -ahead
+        if behind < WINDOW and self._seen >> behind & 1:
+            self.duplicates += 1
+            return False
+        if behind < WINDOW:
+            self._seen |= 1 << behind
+            self.missing -= 1 # Arrivée en retard : elle n'était pas perdue
+            self.received += 1
+            self.reordered += 1
+        else:
+            self.duplicates += 1 # Trop ancienne pour être distinguée d'un doublon
+        return False
@@ -0,0 +1,198 @@
+# Échantillonnage ADC sur le second coeur du RP2040.
+# Un thread (_thread, lancé sur le coeur 1 de la Pico) lit l'ADS1015 en continu et
+# publie les codes dans un tampon circulaire producteur unique / consommateur unique
+# sans verrou. Le coeur 0 (boucle principale, UART) consomme ce tampon : read_raw()
+# et read_next() retirent les échantillons en attente et rendent le plus récent,
+# read_into() copie un bloc d'échantillons successifs (FilteredADC). Il ne bloque plus
+# sur la conversion, au plus en attendant l'échantillon suivant. Sur PC, le même code
+# tourne avec un thread classique (module _thread de CPython), ce qui permet de tester
+# l'échange entre les deux côtés.
+
+import _thread
+from array import array
+
+from compat import ticks_us, sleep_ms, sleep_us
+from ads1015 import raw_to_voltage
+
+_RUN = 0 # Indices du tableau d'état partagé
+_STOPPED = 1
+
+
+class SampleRing:
+    """Tampon circulaire SPSC : seul le producteur écrit tail, seul le consommateur écrit head.
+
+    Les indices sont des compteurs 16 bits libres stockés dans un array (écritures
+    d'un seul mot, donc atomiques pour l'autre coeur) ; la taille doit être une
+    puissance de 2 inférieure à 32768.
+    """
+
+    def __init__(self, size=1024):
+        if size & (size - 1) or not 0 < size < 32768:
+            raise ValueError(f"Taille de tampon invalide: {size}")
+        self.size = size
+        self._mask = size - 1
+        self.raw = array('h', bytes(2 * size))
+        self.ticks = array('i', bytes(4 * size)) # ticks_us de chaque échantillon
+        self._idx = array('H', (0, 0)) # head (consommateur), tail (producteur)
+        self.overruns = 0 # Échantillons perdus parce que le tampon était plein (côté producteur)
+
+    def __len__(self):
+        idx = self._idx
+        return (idx[1] - idx[0]) & 0xFFFF
+
+    def push(self, raw, ticks):
+        """Producteur : ajoute un échantillon, False si le tampon est plein"""
+        idx = self._idx
+        tail = idx[1]
+        if ((tail - idx[0]) & 0xFFFF) >= self.size:
+            self.overruns += 1
+            return False
+        i = tail & self._mask
+        self.raw[i] = raw
+        self.ticks[i] = ticks
+        idx[1] = (tail + 1) & 0xFFFF # Publication après l'écriture des données
+        return True
+
+    def pop(self):
+        """Consommateur : retire le plus ancien code, None si vide"""
+        idx = self._idx
+        head = idx[0]
+        if head == idx[1]:
+            return None
+        raw = self.raw[head & self._mask]
+        idx[0] = (head + 1) & 0xFFFF
+        return raw
+
+    def pop_into(self, dest, n=None, offset=0):
+        """Consommateur : copie jusqu'à n codes dans dest (array) à partir de offset, sans allocation ;
+        retourne le nombre copié"""
+        if n is None:
+            n = len(dest) - offset
+        idx = self._idx
+        head = idx[0]
+        count = min(n, (idx[1] - head) & 0xFFFF)
+        raw = self.raw
+        mask = self._mask
+        for i in range(count):
+            dest[offset + i] = raw[(head + i) & mask]
+        idx[0] = (head + count) & 0xFFFF
+        return count
+
+    def discard(self, keep=0):
+        """Consommateur : retire les plus anciens codes pour n'en garder que keep ; retourne le nombre retiré"""
+        idx = self._idx
+        head = idx[0]
+        count = ((idx[1] - head) & 0xFFFF) - keep
+        if count <= 0:
+            return 0
+        idx[0] = (head + count) & 0xFFFF
+        return count
+
+    def latest(self):
+        """Dernier code publié (sans le retirer), None si aucun"""
+        idx = self._idx
+        tail = idx[1]
+        if tail == idx[0]:
+            return None
+        return self.raw[(tail - 1) & self._mask]
+
+
+class CoreSampler:
+    """Lit l'ADS1015 sur l'autre coeur ; read_raw() rend le dernier échantillon sans attendre.
+
+    S'utilise à la place de l'objet ADS1015 (mêmes read_raw, read_next, read_into,
+    read_voltage, pga). Le coeur 0 ne doit plus accéder au bus I2C de l'ADC une fois
+    start() appelé. Un tampon plein (consommateur en pause) ne contient que des
+    échantillons anciens : il est vidé avant la lecture suivante. Compteurs : produced,
+    errors (côté coeur 1), skipped (échantillons retirés sans être rendus, plus anciens
+    que ceux demandés) et ring.overruns.
+    """
+
+    def __init__(self, adc, ring=None):
+        self.adc = adc
+        self.pga = adc.pga
+        self.ring = ring if ring is not None else SampleRing()
+        self.produced = 0
+        self.errors = 0
+        self.skipped = 0
+        self._last = 0 # Dernier code rendu (coeur 0)
+        self._fresh = False # _last vient du tampon depuis sa dernière remise à zéro
+        self._state = array('b', (0, 1)) # _RUN, _STOPPED
+
+    def _run(self):
+        adc = self.adc
+        ring = self.ring
+        state = self._state
+        while state[_RUN]:
+            try:
+                raw = adc.read_raw()
+            except OSError:
+                self.errors += 1
+                sleep_ms(10)
+                continue
+            ring.push(raw, ticks_us())
+            self.produced += 1
+        state[_STOPPED] = 1
+
+    def start(self):
+        """Lance la boucle d'échantillonnage sur le second coeur"""
+        self.adc.start()
+        self._state[_RUN] = 1
+        self._state[_STOPPED] = 0
+        _thread.start_new_thread(self._run, ())
+
+    def stop(self):
+        """Arrête la boucle et attend sa fin"""
+        self._state[_RUN] = 0
+        while not self._state[_STOPPED]:
+            sleep_ms(1)
+
+    def _drop_stale(self):
+        # Tampon plein : le coeur 1 n'a rien publié depuis qu'il l'est, ses codes sont périmés
+        ring = self.ring
+        if len(ring) >= ring.size:
+            self.skipped += ring.discard()
+            self._fresh = False
+
+    def _wait(self, n=1):
+        ring = self.ring
+        while len(ring) < n:
+            if self._state[_STOPPED]:
+                raise OSError("Echantillonnage arrete")
+            sleep_us(50)
+
+    def read_raw(self):
+        """Dernier code publié par le second coeur ; sans nouvel échantillon, le précédent (attend le premier)"""
+        self._drop_stale()
+        if self._fresh and not len(self.ring):
+            return self._last
+        return self.read_next()
+
+    def read_next(self):
+        """Attend un échantillon publié depuis le précédent appel ; retourne le plus récent (lectures rapides successives)"""
+        ring = self.ring
+        self._drop_stale()
+        self._wait()
+        self.skipped += ring.discard(1)
+        self._last = ring.pop()
+        self._fresh = True
+        return self._last
+
+    def read_into(self, samples, n=None):
+        """Remplit samples (array('h') préalloué) avec n échantillons successifs : les n plus récents du tampon,
+        complétés par les suivants"""
+        if n is None:
+            n = len(samples)
+        ring = self.ring
+        self._drop_stale()
+        self.skipped += ring.discard(n)
+        got = 0
+        while got < n:
+            self._wait()
+            got += ring.pop_into(samples, n - got, got)
+        self._last = samples[n - 1]
+        self._fresh = True
+        return n
+
+    def read_voltage(self):
+        return raw_to_voltage(self.read_raw(), self.pga)
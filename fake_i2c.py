@@ -0,0 +1,150 @@
+# Bus I2C simulé pour exécuter le pilote ADS1015 sur un PC (sans Pico).
+# Le faux ADS1015 reproduit les registres et le cadencement des conversions
+# (mode continu ou unique, débit configuré) et compte les lectures en double
+# ou les conversions perdues, ce qui permet de vérifier la cadence du pilote.
+
+import time
+
+from ads1015 import (REG_CONVERSION, REG_CONFIG, REG_LO_THRESH, REG_HI_THRESH,
+                     OS_SINGLE, MODE_SINGLE, FULL_SCALE, DATA_RATES)
+
+EIO = 5 # Erreur renvoyée par MicroPython quand l'esclave ne répond pas (NACK)
+
+_RATE_FROM_BITS = {bits: rate for rate, bits in DATA_RATES.items()}
+_RATE_FROM_BITS[0x00E0] = 3300
+
+
+class FakeADS1015:
+    """ADS1015 simulé. source est une tension fixe ou une fonction source(t, mux)
+
+    clock donne le temps en secondes (horloge réelle par défaut, horloge virtuelle
+    dans le simulateur).
+    """
+
+    def __init__(self, source=0.0, clock_error=0.0, clock=time.perf_counter):
+        self.source = source
+        self.clock_error = clock_error # Dérive de l'oscillateur interne (ex: -0.05)
+        self.clock = clock
+        self.regs = {REG_CONVERSION: 0, REG_CONFIG: 0x8583, REG_LO_THRESH: 0x8000, REG_HI_THRESH: 0x7FFF}
+        self._t0 = clock()
+        self._single_done = 0.0
+        self._converting = False # Conversion unique démarrée, pas encore recopiée dans le registre
+        self._last_index = -1
+        self.conversions_read = 0
+        self.stale_reads = 0 # Même conversion lue deux fois
+        self.missed = 0 # Conversions écrasées avant d'être lues
+
+    def _period(self):
+        rate = _RATE_FROM_BITS[self.regs[REG_CONFIG] & 0x00E0]
+        return 1.0 / (rate * (1.0 + self.clock_error))
+
+    def _sample(self, t):
+        config = self.regs[REG_CONFIG]
+        mux = config & 0x7000
+        source = self.source
+        voltage = source(t, mux) if callable(source) else source
+        code = int(voltage * 2048 / FULL_SCALE.get(config & 0x0E00, 0.256)) # Codes PGA 110 et 111 : ±0,256 V
+        code = max(-2048, min(2047, code))
+        return (code & 0xFFF) << 4
+
+    def _latch(self, now):
+        # Nouvelle configuration : le registre de conversion garde la dernière conversion terminée
+        config = self.regs[REG_CONFIG]
+        if config & MODE_SINGLE:
+            if self._converting and now >= self._single_done and self._last_index < 0: # Pas encore lue
+                self.regs[REG_CONVERSION] = self._sample(self._single_done)
+        else:
+            period = self._period()
+            index = int((now - self._t0) / period) - 1
+            if index >= 0 and index != self._last_index:
+                self.regs[REG_CONVERSION] = self._sample(self._t0 + (index + 1) * period)
+        self._converting = False
+
+    def write_reg(self, reg, value):
+        if reg == REG_CONVERSION:
+            raise OSError(EIO)
+        now = self.clock()
+        if reg == REG_CONFIG:
+            self._latch(now)
+        self.regs[reg] = value & 0x7FFF if reg == REG_CONFIG else value
+        if reg == REG_CONFIG:
+            self._t0 = now
+            self._last_index = -1
+            if value & MODE_SINGLE and value & OS_SINGLE:
+                self._single_done = now + self._period()
+                self._converting = True
+
+    def read_reg(self, reg):
+        now = self.clock()
+        config = self.regs[REG_CONFIG]
+        if reg == REG_CONFIG:
+            if config & MODE_SINGLE and now < self._single_done:
+                return config # Conversion en cours : OS = 0
+            return config | OS_SINGLE
+        if reg != REG_CONVERSION:
+            return self.regs[reg]
+        period = self._period()
+        if config & MODE_SINGLE:
+            index = 0 if now >= self._single_done else -1
+            t = self._single_done
+        else:
+            index = int((now - self._t0) / period) - 1
+            t = self._t0 + (index + 1) * period
+        if index < 0:
+            return self.regs[REG_CONVERSION] # Aucune nouvelle conversion
+        if index == self._last_index:
+            self.stale_reads += 1
+        elif self._last_index >= 0 and index > self._last_index + 1:
+            self.missed += index - self._last_index - 1
+        if index != self._last_index:
+            self.regs[REG_CONVERSION] = self._sample(t)
+            self._last_index = index
+        self.conversions_read += 1
+        return self.regs[REG_CONVERSION]
+
+
+class FakeI2C:
+    """Bus I2C simulé avec la même interface que machine.I2C"""
+
+    def __init__(self, devices=None, freq=100000):
+        self.devices = devices if devices is not None else {}
+        self.freq = freq
+        self.transactions = 0
+        self.buffer_allocs = 0 # Tampons créés pour une transaction (readfrom_mem, nouveau tampon écrit)
+        self._seen = []
+
+    def _device(self, addr):
+        device = self.devices.get(addr)
+        if device is None:
+            raise OSError(EIO)
+        self.transactions += 1
+        return device
+
+    def scan(self):
+        return sorted(self.devices)
+
+    def _track(self, buf):
+        # Un tampon jamais vu compte comme une allocation (on garde une référence
+        # pour que son identifiant ne soit pas réutilisé)
+        for seen in self._seen:
+            if seen is buf:
+                return
+        self.buffer_allocs += 1
+        if len(self._seen) < 64:
+            self._seen.append(buf)
+
+    def writeto_mem(self, addr, memaddr, buf):
+        self._track(buf)
+        self._device(addr).write_reg(memaddr, buf[0] << 8 | buf[1])
+
+    def readfrom_mem(self, addr, memaddr, nbytes):
+        value = self._device(addr).read_reg(memaddr)
+        self.buffer_allocs += 1 # Le résultat est un nouvel objet bytes
+        return value.to_bytes(2, 'big')[:nbytes]
+
+    def readfrom_mem_into(self, addr, memaddr, buf):
+        self._track(buf)
+        value = self._device(addr).read_reg(memaddr)
+        buf[0] = value >> 8
+        if len(buf) > 1:
+            buf[1] = value & 0xFF
@@ -0,0 +1,231 @@
+# Machine d'état PIO simulée pour exécuter les programmes rp2.asm_pio sur un PC (sans Pico).
+# assemble() appelle la fonction du programme (pio_duty.duty_program) avec ses propres
+# wait/mov/jmp/in_/push/label, comme rp2.asm_pio sur la carte : le modèle exécute donc
+# la même source que la machine d'état, une instruction par cycle, sur un signal
+# d'entrée modélisé (SquareWave, ou la sortie PWM d'une carte simulée : sim/rp2.py).
+#
+# Seules les instructions utilisées par le projet sont reconnues (une seule broche
+# d'entrée, pour wait et jmp(pin)). Pour suivre un PWM à 125 MHz sans exécuter chaque
+# cycle, une boucle faite uniquement de jmp qui revient au même point avec la même
+# entrée est sautée d'un bloc jusqu'au prochain changement possible du signal :
+# les compteurs sont décrémentés d'autant, le résultat est identique au cycle près.
+
+_MASK = 0xFFFFFFFF
+
+# Opérandes, avec les valeurs de rp2 pour push (block / noblock)
+_PIN = "pin"
+_X = "x"
+_Y = "y"
+_NULL = "null"
+_ISR = "isr"
+_X_DEC = "x_dec"
+_Y_DEC = "y_dec"
+_BLOCK = 0x20
+_NOBLOCK = 0x00
+
+
+def assemble(program):
+    """Instructions (tuples), début et fin de la boucle wrap d'un programme écrit pour rp2.asm_pio"""
+    code = []
+    labels = {}
+    bounds = [0, None]
+
+    def jmp(cond, target=None):
+        if target is None:
+            cond, target = None, cond
+        code.append(('jmp', cond, target))
+
+    def wrap():
+        bounds[1] = len(code) - 1
+
+    def wrap_target():
+        bounds[0] = len(code)
+
+    namespace = {
+        'wait': lambda polarity, source, index: code.append(('wait', polarity, source, index)),
+        'mov': lambda dest, source: code.append(('mov', dest, source)),
+        'jmp': jmp,
+        'in_': lambda source, bits: code.append(('in', source, bits)),
+        'push': lambda block=_BLOCK: code.append(('push', block == _BLOCK)),
+        'label': lambda name: labels.__setitem__(name, len(code)),
+        'wrap_target': wrap_target,
+        'wrap': wrap,
+        'invert': lambda source: ('invert', source),
+        'pin': _PIN, 'x': _X, 'y': _Y, 'null': _NULL, 'isr': _ISR,
+        'x_dec': _X_DEC, 'y_dec': _Y_DEC, 'block': _BLOCK, 'noblock': _NOBLOCK,
+    }
+    # Comme rp2.asm_pio : les noms de l'assembleur remplacent le temps de l'appel ceux du module
+    module = program.__globals__
+    saved = dict(module)
+    module.clear()
+    module.update(namespace)
+    try:
+        program()
+    finally:
+        module.clear()
+        module.update(saved)
+    code = [(op[0], op[1], labels[op[2]]) if op[0] == 'jmp' else op for op in code]
+    if bounds[1] is None:
+        bounds[1] = len(code) - 1
+    return code, bounds[0], bounds[1]
+
+
+class SquareWave:
+    """Signal périodique : niveau haut pendant high cycles sur period (cycle 0 = front montant)"""
+
+    def __init__(self, period, high):
+        self.period = period
+        self.high = high
+
+    def level(self, cycle):
+        return 1 if cycle % self.period < self.high else 0
+
+    def next_change(self, cycle):
+        """Premier cycle après cycle où le niveau peut changer"""
+        start = cycle - cycle % self.period
+        if cycle - start < self.high:
+            return start + self.high
+        return start + self.period
+
+
+class FakeStateMachine:
+    """Machine d'état PIO (interface de rp2.StateMachine : active, rx_fifo, get) sur un signal modélisé.
+
+    signal fournit level(cycle) et next_change(cycle). Compteurs : pushed (mots
+    poussés), dropped (push(noblock) sur FIFO plein) et steps (instructions
+    interprétées, hors boucles sautées).
+    """
+
+    def __init__(self, program, signal, fifo_depth=4, shift_left=True, start_cycle=0):
+        self.code, self.wrap_target, self.wrap = assemble(program)
+        self.signal = signal
+        self.fifo_depth = fifo_depth
+        self.shift_left = shift_left
+        self.cycle = start_cycle
+        self.pc = 0
+        self.x = 0
+        self.y = 0
+        self.isr = 0
+        self._fifo = []
+        self._mark = None # (pc, cycle, x, y, niveau) au dernier passage sur un jmp(pin)
+        self._running = True
+        self.pushed = 0
+        self.dropped = 0
+        self.steps = 0
+
+    def active(self, value=None):
+        if value is None:
+            return self._running
+        self._running = bool(value)
+
+    def rx_fifo(self):
+        return len(self._fifo)
+
+    def get(self):
+        """Mot le plus ancien du FIFO (exécute le programme jusqu'à ce qu'il y en ait un)"""
+        while not self._fifo:
+            self.step()
+        return self._fifo.pop(0)
+
+    def _read(self, source):
+        if isinstance(source, tuple): # invert(source)
+            return ~self._read(source[1]) & _MASK
+        if source == _X:
+            return self.x
+        if source == _Y:
+            return self.y
+        if source == _ISR:
+            return self.isr
+        return 0 # null
+
+    def _skip_loop(self, level, limit):
+        # Revenu sur le même jmp(pin) avec la même entrée, sans autre instruction que des jmp :
+        # les itérations suivantes sont identiques jusqu'au prochain changement du signal
+        pc, cycle, x, y, mark_level = self._mark
+        length = self.cycle - cycle
+        if level != mark_level or length <= 0:
+            return
+        dx = (x - self.x) & _MASK
+        dy = (y - self.y) & _MASK
+        end = min(self.signal.next_change(self.cycle), limit)
+        count = (end - self.cycle) // length - 1
+        if dx:
+            count = min(count, self.x // dx - 1) # Les compteurs ne passent pas par 0
+        if dy:
+            count = min(count, self.y // dy - 1)
+        if count > 0:
+            self.cycle += count * length
+            self.x -= count * dx
+            self.y -= count * dy
+
+    def step(self, limit=None):
+        """Exécute une instruction (ou attend le signal, sans dépasser le cycle limit)"""
+        op = self.code[self.pc]
+        kind = op[0]
+        self.steps += 1
+        next_pc = self.wrap_target if self.pc == self.wrap else self.pc + 1
+        if kind == 'jmp':
+            cond = op[1]
+            if cond is None:
+                taken = True
+            elif cond == _PIN:
+                level = self.signal.level(self.cycle)
+                mark = self._mark
+                if mark is not None and mark[0] == self.pc:
+                    self._skip_loop(level, self.signal.next_change(self.cycle) if limit is None else limit)
+                self._mark = (self.pc, self.cycle, self.x, self.y, level)
+                taken = level == 1
+            elif cond == _X_DEC:
+                taken = self.x != 0
+                self.x = (self.x - 1) & _MASK
+            elif cond == _Y_DEC:
+                taken = self.y != 0
+                self.y = (self.y - 1) & _MASK
+            else:
+                raise ValueError(f"Condition jmp non modelisee: {cond}")
+            self.cycle += 1
+            self.pc = op[2] if taken else next_pc
+            return
+        self._mark = None
+        if kind == 'wait':
+            if self.signal.level(self.cycle) != op[1]:
+                change = self.signal.next_change(self.cycle)
+                self.cycle = change if limit is None else min(change, limit)
+                return # Instruction réévaluée au prochain changement
+        elif kind == 'mov':
+            value = self._read(op[2])
+            if op[1] == _X:
+                self.x = value
+            elif op[1] == _Y:
+                self.y = value
+            else:
+                self.isr = value
+        elif kind == 'in':
+            bits = op[2]
+            value = self._read(op[1]) & ((1 << bits) - 1)
+            if self.shift_left:
+                self.isr = ((self.isr << bits) | value) & _MASK
+            else:
+                self.isr = (self.isr >> bits) | (value << (32 - bits))
+        elif kind == 'push':
+            if len(self._fifo) < self.fifo_depth:
+                self._fifo.append(self.isr)
+                self.pushed += 1
+            elif op[1]:
+                return # push(block) : la machine attend une place
+            else:
+                self.dropped += 1
+            self.isr = 0
+        self.cycle += 1
+        self.pc = next_pc
+
+    def run_until(self, cycle):
+        """Exécute le programme jusqu'au cycle donné"""
+        if not self._running:
+            self.cycle = max(self.cycle, cycle)
+            return
+        while self.cycle < cycle:
+            before = self.cycle
+            self.step(cycle)
+            if self.cycle == before and self.code[self.pc][0] == 'push':
+                break # push(block) sur FIFO plein : bloqué jusqu'à la prochaine lecture
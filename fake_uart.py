@@ -0,0 +1,63 @@
+# UART simulé pour exécuter le protocole sur un PC (sans Pico).
+# Deux FakeUART reliés par link() se transmettent les octets écrits ;
+# un FakeUART seul reçoit ses propres écritures (boucle locale).
+
+
+class FakeUART:
+    """UART simulé avec la même interface que machine.UART (sans délai de transmission)"""
+
+    def __init__(self, rx_size=4096):
+        self.rx_size = rx_size # Taille du FIFO de réception (octets perdus au-delà)
+        self._rx = bytearray()
+        self.peer = self
+        self.bytes_written = 0
+        self.overruns = 0
+
+    def link(self, other):
+        """Relie deux UART simulés (TX de l'un vers RX de l'autre)"""
+        self.peer = other
+        other.peer = self
+
+    def _receive(self, data):
+        room = self.rx_size - len(self._rx)
+        if len(data) > room:
+            self.overruns += len(data) - room
+            data = data[:room]
+        self._rx += data
+
+    def write(self, buf):
+        data = buf.encode() if isinstance(buf, str) else bytes(buf)
+        self.bytes_written += len(data)
+        self.peer._receive(data)
+        return len(data)
+
+    def any(self):
+        return len(self._rx)
+
+    def read(self, nbytes=None):
+        if not self._rx:
+            return None
+        if nbytes is None:
+            nbytes = len(self._rx)
+        data = bytes(self._rx[:nbytes])
+        del self._rx[:nbytes]
+        return data
+
+    def readinto(self, buf, nbytes=None):
+        if not self._rx:
+            return None
+        if nbytes is None:
+            nbytes = len(buf)
+        nbytes = min(nbytes, len(self._rx), len(buf))
+        buf[:nbytes] = self._rx[:nbytes]
+        del self._rx[:nbytes]
+        return nbytes
+
+    def readline(self):
+        if not self._rx:
+            return None
+        end = self._rx.find(b"\n")
+        end = len(self._rx) if end < 0 else end + 1
+        data = bytes(self._rx[:end])
+        del self._rx[:end]
+        return data
@@ -0,0 +1,51 @@
+# Chaîne de mesure en virgule fixe (entiers uniquement).
+# Sur MicroPython, chaque flottant est un objet alloué sur le tas : le calcul
+# int(duty * 65535 / 100), raw * 4.096 / 2048 puis voltage / 3.3 * 100 crée
+# plusieurs objets par mesure et sollicite le ramasse-miettes. Ici, les grandeurs
+# restent entières de bout en bout :
+#   rapport cyclique   centièmes de pourcent (0..10000), comme les trames et la calibration
+#   sortie PWM         compte 16 bits de duty_u16 (0..65535)
+#   tension            millivolts (ads1015.raw_to_mv)
+#   code ADC filtré    1/16 de code (adc_filter.FRAC_BITS)
+# La conversion en flottant ne se fait qu'à l'affichage (from_centi, mV / 1000).
+#
+# Les variantes _native et _viper sont compilées en code machine par MicroPython
+# (@micropython.native / @micropython.viper) ; sur PC elles sont identiques à la
+# version Python. Les entiers viper font 32 bits : les produits restent sous 2**31.
+
+from compat import micropython
+
+DUTY_MAX = 10000 # 100 % en centièmes de pourcent
+# duty_u16 = centi * 65535 / 10000, sans division : centi * 214745 >> 15 (10000 * 214745 < 2**31)
+_U16_SCALE = 214745
+_U16_SHIFT = 15
+_U16_ROUND = 1 << (_U16_SHIFT - 1)
+
+
+def duty_u16(centi):
+    """Rapport cyclique (centièmes de pourcent, saturé) -> compte PWM 16 bits"""
+    if centi <= 0:
+        return 0
+    if centi >= DUTY_MAX:
+        return 65535
+    return (centi * _U16_SCALE + _U16_ROUND) >> _U16_SHIFT
+
+
+@micropython.native
+def duty_u16_native(centi):
+    """duty_u16 compilé en code machine (émetteur native)"""
+    if centi <= 0:
+        return 0
+    if centi >= 10000:
+        return 65535
+    return (centi * 214745 + 16384) >> 15
+
+
+@micropython.viper
+def duty_u16_viper(centi: int) -> int:
+    """duty_u16 en entiers machine (émetteur viper)"""
+    if centi <= 0:
+        return 0
+    if centi >= 10000:
+        return 65535
+    return (centi * 214745 + 16384) >> 15
@@ -0,0 +1,98 @@
+# Fréquence du bus I2C de l'ADS1015, choisie par essai au lieu d'être fixée dans chaque
+# script (100 kHz dans les uns, 400 kHz dans les autres, sans savoir laquelle est fiable).
+# Une lecture du registre de conversion fait 5 octets sur le bus, soit ~480 µs à
+# 100 kHz : plus qu'une période de conversion à 3300 échantillons/s (303 µs). Au-delà
+# de quelques centaines d'échantillons/s, c'est le bus qui limite le débit.
+#
+# probe() essaie les fréquences de I2C_FREQS dans l'ordre croissant : à chacune, le
+# registre de configuration est écrit puis relu `readbacks` fois avec des motifs de
+# bits alternés (0x2AAA/0x5555 : transitions sur chaque bit de donnée) ; une relecture
+# différente ou une absence d'acquittement (OSError) arrête l'essai, et on garde la
+# dernière fréquence sans erreur. La durée d'une lecture du registre de conversion est
+# mesurée à chaque fréquence validée.
+#
+# Le RP2040 ne gère que les modes standard, rapide et rapide+ (1 MHz) : le mode haute
+# vitesse de l'ADS1015 (3,4 MHz) demande un code maître et un contrôleur que la puce
+# n'a pas, il n'est donc pas essayé.
+
+from compat import const, ticks_us, ticks_diff
+from ads1015 import ADS1015_ADDR, REG_CONFIG, REG_CONVERSION, OS_SINGLE
+
+BASE_FREQ = const(100000) # Mode standard, toujours utilisable
+I2C_FREQS = (100000, 400000, 1000000) # Fréquences essayées, croissantes
+READBACK_PATTERNS = (0x2AAA, 0x5555, 0x0583, 0x7E7C) # OS = 0 : aucune conversion unique démarrée
+
+
+class I2CSpeed:
+    """Fréquence du bus I2C la plus rapide validée par relecture du registre de configuration.
+
+    make_bus(freq) crée le bus (machine.I2C) à cette fréquence ; bus et freq sont ceux
+    retenus par probe(). Compteurs : probes (fréquences essayées), errors (relectures
+    fausses ou sans acquittement) et results[freq] : (erreurs, durée d'une lecture du
+    registre de conversion en µs, None si la fréquence a échoué).
+    """
+
+    def __init__(self, make_bus, address=ADS1015_ADDR, freqs=I2C_FREQS, base=BASE_FREQ, readbacks=32, reads=32):
+        self.make_bus = make_bus
+        self.address = address
+        self.freqs = freqs
+        self.base = base
+        self.readbacks = readbacks
+        self.reads = reads
+        self.freq = base
+        self.bus = None
+        self.results = {}
+        self.probes = 0
+        self.errors = 0
+        self._buf = bytearray(2)
+
+    def _check(self, bus):
+        # Nombre de relectures fausses ; une absence d'acquittement arrête l'essai
+        buf = self._buf
+        address = self.address
+        errors = 0
+        for i in range(self.readbacks):
+            pattern = READBACK_PATTERNS[i % len(READBACK_PATTERNS)]
+            buf[0] = pattern >> 8
+            buf[1] = pattern & 0xFF
+            try:
+                bus.writeto_mem(address, REG_CONFIG, buf)
+                bus.readfrom_mem_into(address, REG_CONFIG, buf)
+            except OSError:
+                return errors + self.readbacks - i
+            if (buf[0] << 8 | buf[1]) & ~OS_SINGLE != pattern: # OS relu à 1 au repos
+                errors += 1
+        return errors
+
+    def _read_us(self, bus):
+        buf = self._buf
+        start = ticks_us()
+        for _ in range(self.reads):
+            bus.readfrom_mem_into(self.address, REG_CONVERSION, buf)
+        return ticks_diff(ticks_us(), start) // self.reads
+
+    def probe(self):
+        """Essaie les fréquences croissantes ; retourne la plus rapide sans erreur (base si aucune)"""
+        self.freq = self.base
+        for freq in self.freqs:
+            bus = self.make_bus(freq)
+            self.probes += 1
+            errors = self._check(bus)
+            if errors:
+                self.errors += errors
+                self.results[freq] = (errors, None)
+                break
+            self.results[freq] = (0, self._read_us(bus))
+            self.freq = freq
+        self.bus = self.make_bus(self.freq) # La puce est reconfigurée par le pilote à la première lecture
+        return self.freq
+
+    def report(self):
+        """Résumé des essais : "100000 Hz 480 us | 400000 Hz 120 us | 1000000 Hz 3 erreurs" """
+        parts = []
+        for freq in self.freqs:
+            result = self.results.get(freq)
+            if result is not None:
+                errors, read_us = result
+                parts.append(f"{freq} Hz {errors} erreurs" if errors else f"{freq} Hz {read_us} us")
+        return " | ".join(parts)
@@ -0,0 +1,722 @@
+# Exécution coopérative des deux Pico (uasyncio sur la carte, asyncio sur PC).
+# Au lieu d'une seule boucle while True ralentie par les time.sleep et l'attente
+# de conversion de l'ADC, chaque fonction est une tâche indépendante avec sa
+# propre période : séquence PWM, échantillonnage ADC, réception UART (pilotée par
+# les événements du flux), émission UART et affichage console.
+#
+# Ce mode utilise uniquement le protocole binaire (protocol.py) et la chaîne en
+# virgule fixe (fixed.py) : codes ADC en 1/16, rapports cycliques en centièmes de
+# pourcent, tensions en millivolts ; les flottants n'apparaissent qu'à l'affichage.
+#
+# Avec un transport fiable (link, transport.py), les trames TH et ME passent par
+# sa fenêtre : réémission des trames perdues, et un Pico 2 occupé à stabiliser sa
+# mesure laisse les consignes dans la boîte de réception du transport, ce qui
+# bloque l'émission de Pico 1 (contre-pression) au lieu de les écraser.
+#
+# Avec l'envoi par lots (batch.py), Pico 2 transmet en plus chaque échantillon de
+# adc_task, regroupés en trames TYPE_BATCH (hors transport fiable) que Pico 1
+# range directement dans un tableau d'échantillons.
+#
+# Avec une mesure par PIO (duty_meter, pio_duty.py), le rapport cyclique mesuré vient
+# des durées haute et basse du signal PWM au lieu du code ADC et de la calibration.
+#
+# Avec timer_ticks, l'échantillonnage ADC et les pas à période fixe sont cadencés par
+# machine.Timer (ticker.py) : l'ADC est lu dans le callback du timer, hors des tâches,
+# et les échantillons passent par un tampon préalloué ; la gigue ne dépend plus des
+# autres tâches (stabilisation, négociation de vitesse).
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+import sys
+from array import array
+
+from compat import ticks_ms, ticks_us, ticks_diff, ticks_add
+from ads1015 import raw_to_mv
+from adc_filter import FRAC_BITS
+from fixed import duty_u16
+from settle import SettlingDetector
+from calibration import Calibrator, ideal
+from ticker import Ticker
+from correlation import InFlight, SeqTracker
+from protocol import (Encoder, FrameReader, TYPE_TH, TYPE_ME, TYPE_BATCH, TYPE_HELLO, HELLO_ACK_FRAME,
+                      MAX_PAYLOAD, BATCH_MAX_PAYLOAD, unpack_th, unpack_me, frame_seq, to_centi, from_centi)
+
+MICROPYTHON = sys.implementation.name == "micropython"
+TICK_BUFFER = 16 # Échantillons lus par le timer en attente de adc_task (puissance de 2)
+TICK_POLL_MS = 1 # Scrutation des ticks sans asyncio.ThreadSafeFlag (PC)
+
+
+def sleep_ms(ms):
+    """Attente asynchrone en millisecondes"""
+    if hasattr(asyncio, "sleep_ms"):
+        return asyncio.sleep_ms(ms)
+    return asyncio.sleep(ms / 1000)
+
+
+class _PollingStream:
+    # Flux de lecture pour un UART sans support de poll (UART simulé sur PC)
+    def __init__(self, uart, poll_ms=1):
+        self.uart = uart
+        self.poll_ms = poll_ms
+
+    async def readinto(self, buf):
+        uart = self.uart
+        while not uart.any():
+            await sleep_ms(self.poll_ms)
+        return uart.readinto(buf, min(len(buf), uart.any()))
+
+
+def stream_reader(uart):
+    """StreamReader sur l'UART de la Pico, lecture par scrutation sinon"""
+    if MICROPYTHON:
+        return asyncio.StreamReader(uart)
+    return _PollingStream(uart)
+
+
+async def periodic(period_ms, callback):
+    """Appelle callback() toutes les period_ms, sans dérive (échéances absolues)"""
+    deadline = ticks_ms()
+    while True:
+        deadline = ticks_add(deadline, period_ms)
+        delay = ticks_diff(deadline, ticks_ms())
+        if delay < 0:
+            deadline = ticks_ms() # Trop en retard : on repart de maintenant
+            delay = 0
+        await sleep_ms(delay)
+        callback()
+
+
+async def ticked(ticker, callback):
+    """Appelle callback() à chaque tick d'un Ticker sans handler ; arrête son timer à l'annulation"""
+    flag = ticker.flag
+    try:
+        while True:
+            if flag is not None:
+                await flag.wait() # Levé par l'interruption
+            else:
+                await sleep_ms(TICK_POLL_MS)
+            if ticker.ready():
+                callback()
+    finally:
+        ticker.stop()
+
+
+class PicoRuntime:
+    """Tâches communes : échantillonnage ADC, réception et émission UART"""
+
+    LINK_POLL_MS = 10 # Période de vérification des réémissions du transport fiable
+    BAUD_CHECK_MS = 100 # Période de surveillance de la qualité de la liaison
+    BATCH_POLL_MS = 5 # Période de vérification de l'âge du lot en cours
+
+    def __init__(self, uart, adc, pwm, adc_period_ms=10, report_ms=1000, calibration=None, encoder=None, link=None,
+                 baud=None, batches=None, duty_meter=None, timer_ticks=False):
+        self.uart = uart
+        self.adc = adc
+        self.pwm = pwm
+        self.calibration = calibration if calibration is not None else ideal(adc.pga) # Code ADC -> rapport cyclique
+        self.adc_period_ms = adc_period_ms
+        self.report_ms = report_ms
+        self.encoder = encoder if encoder is not None else Encoder() # Partagé entre runtimes : les séquences continuent
+        self.batches = batches # Lots de mesures reçus (batch.BatchReader) : trames longues acceptées
+        self.reader = FrameReader(uart, max_payload=MAX_PAYLOAD if batches is None else BATCH_MAX_PAYLOAD)
+        self.link = link # Transport fiable (transport.py), partagé entre runtimes comme l'encodeur
+        if link is not None:
+            link.write = self.send
+        self.baud = baud # Vitesse négociée et repli (baud.py)
+        self.duty_meter = duty_meter # Mesure directe du signal PWM (pio_duty.PioDutyMeter), à la place de l'ADC
+        self.timer_ticks = timer_ticks # Échantillonnage et pas fixes cadencés par machine.Timer (ticker.py)
+        self.tickers = {} # Nom -> Ticker, pour timer_report()
+        self._tick_samples = array('h', bytes(2 * TICK_BUFFER)) # Lectures du callback du timer (1/16 de code)
+        self._tick_head = 0
+        self._tick_tail = 0 # Prochain échantillon du tampon à traiter par adc_task
+        self.tick_lost = 0 # Échantillons écrasés avant d'être traités par adc_task
+        self.tick_paused = 0 # Échantillons périodiques sautés pendant settle()
+        self._paused = False # settle() lit l'ADC : l'échantillonnage périodique ne s'intercale pas entre ses lectures
+        self.raw_q4 = 0 # Dernier code ADC, en 1/16 de code
+        self.samples = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.settler = SettlingDetector()
+        self.settle_us = None # Durée de la dernière stabilisation du filtre RC
+        self.settle_times_us = []
+        self._read_next = adc.read_next if hasattr(adc, 'read_next') else adc.read_raw
+        if hasattr(adc, 'read_q4'): # ADC filtré : valeur entière en 1/16 de code
+            self._read_q4 = adc.read_q4
+        else:
+            self._read_q4 = lambda: adc.read_raw() << FRAC_BITS
+        self._tx = [] # Trames en attente d'émission
+        self._tx_event = asyncio.Event()
+
+    def voltage_mv(self):
+        return raw_to_mv(self.raw_q4, self.adc.pga, FRAC_BITS)
+
+    def voltage(self):
+        return self.voltage_mv() / 1000 # Affichage
+
+    def measured_centi(self):
+        if self.duty_meter is not None:
+            return self.duty_meter.read_centi() # Dernière période PWM complète
+        return self.calibration.duty_centi_q4(self.raw_q4)
+
+    def measured_duty(self):
+        return self.measured_centi() / 100 # Affichage
+
+    def set_duty_centi(self, centi):
+        self.pwm.duty_u16(duty_u16(centi))
+
+    def set_duty(self, duty_cycle):
+        self.set_duty_centi(to_centi(duty_cycle))
+
+    def send(self, frame):
+        """Met une trame en file d'émission (copiée : les tampons de l'encodeur sont réutilisés)"""
+        self._tx.append(bytes(frame))
+        self._tx_event.set()
+
+    def send_data(self, frame):
+        """Émet une trame TH ou ME, par le transport fiable s'il y en a un ; False si sa fenêtre est pleine"""
+        if self.link is None:
+            self.send(frame)
+            return True
+        return self.link.send(frame)
+
+    def can_send(self):
+        """Vrai si send_data peut émettre sans attendre (fenêtre et crédit de l'autre carte)"""
+        return self.link is None or self.link.can_send()
+
+    async def wait_window(self):
+        """Attend une place dans la fenêtre du transport fiable"""
+        while not self.can_send():
+            await sleep_ms(1)
+
+    def _dispatch(self, ftype, buf):
+        # Trames du transport : acquittements traités ici, trames reçues livrées par deliver()
+        if ftype == TYPE_BATCH and self.batches is not None:
+            self.batches.on_frame(buf)
+        elif self.link is not None and self.link.on_frame(ftype, buf):
+            self.deliver()
+        else:
+            self.on_frame(ftype, buf)
+
+    def deliver(self):
+        """Passe à on_frame les trames en attente dans la boîte de réception du transport"""
+        link = self.link
+        while link.pending():
+            inner = link.receive()
+            self.on_frame(inner[1], inner)
+
+    def _poll_link(self):
+        self.link.poll()
+        self.deliver()
+
+    def _check_baud(self):
+        baud = self.baud
+        baud.poll()
+        if baud.check(self.reader, self.lost_replies()):
+            self.on_fallback()
+
+    def lost_replies(self):
+        """Requêtes restées sans réponse depuis le démarrage (comptées comme erreurs de liaison)"""
+        return 0
+
+    def on_fallback(self):
+        """La liaison s'est dégradée : la carte vient de revenir à la vitesse de base"""
+        print(f"Liaison degradee ({self.reader.errors} erreurs CRC): retour a {self.baud.baudrate} bauds")
+
+    def _sample(self):
+        if self._paused:
+            self.tick_paused += 1
+            return True
+        try:
+            raw_q4 = self._read_q4()
+        except OSError as e:
+            print(f"Erreur ADC: {e}")
+            return False
+        self.on_sample(raw_q4)
+        return True
+
+    def _tick_sample(self):
+        # Callback du timer (micropython.schedule) : la lecture est seulement rangée dans le tampon
+        if self._paused:
+            self.tick_paused += 1
+            return
+        try:
+            self._tick_samples[self._tick_head & (TICK_BUFFER - 1)] = self._read_q4()
+            self._tick_head += 1
+        except OSError as e:
+            print(f"Erreur ADC: {e}")
+
+    def on_sample(self, raw_q4):
+        """Nouvel échantillon de l'ADC (1/16 de code)"""
+        self.raw_q4 = raw_q4
+        self.samples += 1
+
+    def ticker(self, name, period_ms, handler=None):
+        """Timer matériel (ticker.Ticker) enregistré pour timer_report()"""
+        flag = asyncio.ThreadSafeFlag() if handler is None and hasattr(asyncio, "ThreadSafeFlag") else None
+        ticker = Ticker(period_ms, handler, flag)
+        self.tickers[name] = ticker
+        return ticker
+
+    async def every(self, name, period_ms, callback):
+        """callback() toutes les period_ms : par machine.Timer avec timer_ticks, sinon par la boucle asyncio"""
+        if self.timer_ticks:
+            await ticked(self.ticker(name, period_ms), callback)
+        else:
+            await periodic(period_ms, callback)
+
+    async def _settle_meter(self, periods=2):
+        # Mesure par PIO : pas de filtre, il suffit d'une période PWM commencée après la consigne
+        meter = self.duty_meter
+        start = ticks_us()
+        meter.discard()
+        target = meter.periods + periods
+        while meter.periods < target and ticks_diff(ticks_us(), start) <= periods * meter.period_us + meter.timeout_us:
+            meter.poll()
+            await sleep_ms(0)
+        self.settle_us = ticks_diff(ticks_us(), start)
+        self.settle_times_us.append(self.settle_us)
+        return self.voltage()
+
+    def resume_sampling(self):
+        """Reprend l'échantillonnage périodique suspendu par settle(hold=True)"""
+        self._paused = False
+        self._tick_tail = self._tick_head # Lectures d'avant la reprise : ne remplacent pas la valeur finale
+
+    async def settle(self, hold=False):
+        """Échantillonne l'ADC à pleine vitesse jusqu'à la stabilisation du filtre RC ; retourne la tension.
+        Avec hold, l'échantillonnage périodique reste suspendu (valeur finale gardée) jusqu'à resume_sampling()"""
+        if self.duty_meter is not None:
+            return await self._settle_meter()
+        settler = self.settler
+        settler.reset()
+        self._paused = True # Lectures régulières : une lecture filtrée périodique (~2,7 ms) fausserait l'extrapolation
+        try:
+            while True:
+                try:
+                    raw = self._read_next()
+                except OSError as e:
+                    print(f"Erreur ADC: {e}")
+                    raw = self.raw_q4 >> FRAC_BITS
+                if settler.feed(raw):
+                    break
+                await sleep_ms(0) # Laisse tourner la réception UART entre deux conversions
+        finally:
+            if not hold:
+                self.resume_sampling()
+        self.raw_q4 = settler.value_q4 # Valeur finale (extrapolée) plutôt que la dernière lecture
+        self.settle_us = settler.settle_us
+        self.settle_times_us.append(settler.settle_us)
+        return self.voltage()
+
+    async def adc_task(self):
+        if not self.timer_ticks:
+            await periodic(self.adc_period_ms, self._sample)
+            return
+        ticker = self.ticker("adc", self.adc_period_ms, self._tick_sample)
+        samples = self._tick_samples
+        self._tick_tail = self._tick_head
+        try:
+            while True:
+                await sleep_ms(self.adc_period_ms)
+                head = self._tick_head
+                tail = self._tick_tail
+                if head - tail > TICK_BUFFER:
+                    self.tick_lost += head - tail - TICK_BUFFER
+                    tail = head - TICK_BUFFER
+                while tail != head:
+                    self.on_sample(samples[tail & (TICK_BUFFER - 1)])
+                    tail += 1
+                self._tick_tail = tail
+        finally:
+            ticker.stop()
+
+    async def rx_task(self):
+        stream = stream_reader(self.uart)
+        buf = bytearray(32)
+        while True:
+            n = await stream.readinto(buf)
+            if n:
+                self.bytes_received += n
+                self.reader.feed(buf, n)
+                self.reader.poll(self._dispatch)
+
+    async def tx_task(self):
+        writer = asyncio.StreamWriter(self.uart, {}) if MICROPYTHON else None
+        while True:
+            await self._tx_event.wait()
+            self._tx_event.clear()
+            while self._tx:
+                frame = self._tx.pop(0)
+                if writer is None:
+                    self.uart.write(frame)
+                else:
+                    writer.write(frame)
+                    await writer.drain()
+                self.frames_sent += 1
+                self.bytes_sent += len(frame)
+
+    async def report_task(self):
+        await periodic(self.report_ms, self.report)
+
+    async def link_task(self):
+        await periodic(self.LINK_POLL_MS, self._poll_link)
+
+    async def baud_task(self):
+        await periodic(self.BAUD_CHECK_MS, self._check_baud)
+
+    def on_frame(self, ftype, buf):
+        pass
+
+    def report(self):
+        pass
+
+    def timer_report(self):
+        """Gigue des timers (timer_ticks) : écart des ticks à la période et retard du traitement"""
+        for name, ticker in self.tickers.items():
+            stats = ticker.stats()
+            latency = f" | latence moy {stats['latency_mean_us']} us, max {stats['latency_max_us']} us" if ticker.handler is not None else ""
+            lost = f" | ecrases {self.tick_lost} | suspendus {self.tick_paused}" if name == "adc" else ""
+            print(f"Timer {name} ({ticker.period_ms} ms): {stats['ticks']} ticks | gigue p95 {stats['jitter_p95_us']} us, "
+                  f"max {stats['jitter_max_us']} us{latency} | retards {stats['overruns']}{lost}")
+
+    def tasks(self):
+        tasks = [self.adc_task(), self.rx_task(), self.tx_task(), self.report_task()]
+        if self.link is not None:
+            tasks.append(self.link_task())
+        if self.baud is not None:
+            tasks.append(self.baud_task())
+        return tasks
+
+    async def run(self):
+        await asyncio.gather(*self.tasks())
+
+
+class GeneratorRuntime(PicoRuntime):
+    """Pico 1 : parcourt la séquence de rapports cycliques et reçoit les mesures de Pico 2"""
+
+    def __init__(self, uart, adc, pwm, sequence=(0, 10, 25, 50, 75, 90, 100), step_ms=3000, adaptive=False, **kwargs):
+        super().__init__(uart, adc, pwm, **kwargs)
+        self.sequence = sequence
+        self._sequence_centi = [to_centi(duty) for duty in sequence] # Converties une fois
+        self.step_ms = step_ms # Durée d'un pas (durée maximale en mode adaptatif)
+        self.adaptive = adaptive # Pas suivant dès la stabilisation et la réponse de Pico 2
+        self.index = 0
+        self.duty_centi = None # Consigne en cours
+        self.last_me = None # (consigne, mesure, erreur) en centièmes de pourcent, réponse au pas en cours
+        self.inflight = InFlight(timeout_ms=step_ms) # Consignes TH en attente de leur trame ME
+        self._step_seq = None
+        self._link_sent = 0
+        self.throttled = 0 # Pas reportés : fenêtre du transport pleine (Pico 2 en retard)
+        self._batch_ms = ticks_ms()
+        self._batch_samples = 0
+
+    def _step(self):
+        if not self.can_send():
+            self.throttled += 1 # Même consigne au prochain pas
+            return
+        centi = self._sequence_centi[self.index]
+        self.duty_centi = centi
+        self.set_duty_centi(centi)
+        frame = self.encoder.pack_th_centi(centi)
+        self.inflight.expire()
+        self._step_seq = frame_seq(frame)
+        self.inflight.add(self._step_seq, centi)
+        self.last_me = None
+        self.send_data(frame)
+        self.index = (self.index + 1) % len(self.sequence)
+
+    async def sequence_task(self):
+        if not self.adaptive:
+            await self.every("sequence", self.step_ms, self._step)
+            return
+        while True:
+            await self.wait_window()
+            start = ticks_ms()
+            self._step()
+            await self.settle(hold=True) # Valeur finale (extrapolée) affichée, pas la tension encore en train de monter
+            while self.inflight.pending(self._step_seq) and ticks_diff(ticks_ms(), start) < self.step_ms: # Attente de la mesure de Pico 2
+                await sleep_ms(1)
+            self.report()
+            self.resume_sampling()
+
+    async def report_task(self):
+        if not self.adaptive: # En mode adaptatif, une ligne par pas (sequence_task)
+            await super().report_task()
+
+    def on_frame(self, ftype, buf):
+        if ftype == TYPE_ME:
+            seq = frame_seq(buf)
+            if self.inflight.match(seq) is not None and seq == self._step_seq: # Pas la réponse d'un pas précédent
+                self.last_me = unpack_me(buf)
+
+    def report(self):
+        if self.duty_centi is None:
+            return
+        duty_cycle = from_centi(self.duty_centi)
+        voltage = self.voltage()
+        real_duty = self.measured_duty()
+        settle = f" | {self.settle_us / 1000:.0f} ms" if self.adaptive and self.settle_us is not None else ""
+        if self.last_me is not None:
+            print(f"{duty_cycle:3.0f}% | {voltage:6.2f}V | {real_duty:4.1f}% | Erreur Pico2: {from_centi(self.last_me[2]):+.1f}%{settle}")
+        else:
+            print(f"{duty_cycle:3.0f}% | {voltage:6.2f}V | {real_duty:4.1f}% | En attente Pico2...{settle}")
+        if self.index == 0 and self.inflight.sent != self._link_sent: # Fin d'un cycle de la séquence
+            self._link_sent = self.inflight.sent
+            self.link_report()
+
+    def link_report(self):
+        inflight = self.inflight
+        latencies = sorted(inflight.latencies_us())
+        rtt = f"{latencies[len(latencies) // 2] / 1000:.1f} ms" if latencies else "n/d"
+        print(f"Liaison: {inflight.sent} TH | {inflight.replied} ME | pertes {inflight.loss_rate() * 100:.1f} % | "
+              f"tardives {inflight.late} | réordonnées {inflight.reordered} | aller-retour p50 {rtt}")
+        link = self.link
+        if link is not None:
+            print(f"Transport: {link.sent} trames | réémissions {link.retransmits} | délais dépassés {link.timeouts} | "
+                  f"pas reportés {self.throttled}")
+        baud = self.baud
+        if baud is not None:
+            print(f"Vitesse: {baud.baudrate} bauds | erreurs CRC {baud.errors} ({baud.error_rate() * 100:.2f} %) | "
+                  f"replis {baud.fallbacks}")
+        batches = self.batches
+        if batches is not None:
+            now = ticks_ms()
+            elapsed = ticks_diff(now, self._batch_ms)
+            rate = (batches.samples - self._batch_samples) * 1000 / elapsed if elapsed > 0 else 0
+            self._batch_ms = now
+            self._batch_samples = batches.samples
+            print(f"Lots: {batches.batches} trames | {batches.samples} mesures ({rate:.0f}/s) | pertes {batches.lost} | "
+                  f"attente dans le lot max {batches.age_max_ms} ms")
+        self.timer_report()
+
+    def lost_replies(self):
+        return self.inflight.lost
+
+    def on_fallback(self):
+        super().on_fallback()
+        self.baud.renegotiate(self.reader) # Bloquant (jusqu'à quelques secondes), sous la vitesse qui a échoué
+        print(f"Vitesse renegociee: {self.baud.baudrate} bauds")
+
+    def tasks(self):
+        return super().tasks() + [self.sequence_task()]
+
+
+class ValidatorRuntime(PicoRuntime):
+    """Pico 2 : répond à chaque consigne TH avec la mesure courante et génère sa propre séquence"""
+
+    def __init__(self, uart, adc, pwm, sequence=(100, 80, 60, 40, 20, 0), step_ms=4000, wait_settle=False,
+                 calibrate_path=None, batch=None, **kwargs):
+        super().__init__(uart, adc, pwm, **kwargs)
+        self.batch = batch # Envoi de chaque échantillon par lots (batch.BatchWriter)
+        if batch is not None:
+            batch.write = self.send
+        self.sequence = sequence
+        self.step_ms = step_ms
+        self.wait_settle = wait_settle # Répondre une fois le filtre RC stabilisé plutôt qu'avec le dernier échantillon
+        # Calibration : chaque consigne reçue et sa mesure stabilisée forment un point ;
+        # la courbe est ajustée et enregistrée quand les consignes cessent d'arriver
+        self.calibrate_path = calibrate_path
+        self.calibrator = Calibrator() if calibrate_path else None
+        self._calibrated_count = 0
+        self._last_count = 0
+        self.index = 0
+        self.th_seqs = SeqTracker() # Consignes manquantes, réordonnées ou en double
+        self.last = None # (consigne, mesure, erreur) en centièmes de pourcent
+        self._pending = None # Consigne reçue pendant une stabilisation
+        self._settling = False
+
+    def deliver(self):
+        # Une consigne à la fois : les suivantes attendent dans la boîte de réception,
+        # dont le crédit décroissant freine Pico 1, tant que la mesure se stabilise
+        # ou que la fenêtre ne peut pas accueillir la réponse
+        link = self.link
+        while link.pending() and not self._settling and link.can_send():
+            inner = link.receive()
+            self.on_frame(inner[1], inner)
+
+    def on_frame(self, ftype, buf):
+        if self.baud is not None and self.baud.on_frame(ftype, buf):
+            return # Négociation de vitesse proposée par Pico 1
+        if ftype == TYPE_TH:
+            if not self.th_seqs.update(frame_seq(buf)):
+                return # Doublon ou consigne plus ancienne que la dernière reçue
+            theoretical = unpack_th(buf)
+            if not self.wait_settle:
+                self._reply(theoretical, frame_seq(buf)) # Dernier échantillon : pas d'attente de conversion
+                return
+            self._pending = (theoretical, frame_seq(buf))
+            if not self._settling:
+                self._settling = True
+                asyncio.create_task(self._reply_settled())
+        elif ftype == TYPE_HELLO:
+            self.th_seqs.reset() # Pico 1 a redémarré : ses séquences repartent de 0
+            if self.link is not None:
+                self.link.reset()
+            self.send(HELLO_ACK_FRAME)
+
+    def on_sample(self, raw_q4):
+        super().on_sample(raw_q4)
+        if self.batch is not None:
+            self.batch.add(self.measured_centi())
+
+    async def batch_task(self):
+        await periodic(self.BATCH_POLL_MS, self.batch.poll)
+
+    def _reply(self, theoretical, seq):
+        measured = self.measured_centi()
+        error = measured - theoretical
+        self.send_data(self.encoder.pack_me_centi(theoretical, measured, error, seq))
+        self.last = (theoretical, measured, error)
+
+    async def _reply_settled(self):
+        while self._pending is not None: # Une nouvelle consigne pendant l'attente relance la stabilisation
+            pending = self._pending
+            self._pending = None
+            await self.settle()
+        self._settling = False
+        if self.calibrator is not None:
+            self.calibrator.add_q4(pending[0], self.settler.value_q4)
+        self._reply(*pending)
+        if self.link is not None:
+            self.deliver() # Consigne suivante, déjà en attente
+
+    def _calibrate(self):
+        # Balayage terminé (aucun nouveau point depuis le dernier rapport) : ajustement et enregistrement
+        count = self.calibrator.count
+        quiet = count == self._last_count
+        self._last_count = count
+        if quiet and count >= 2 and count != self._calibrated_count:
+            self.calibration = self.calibrator.fit(self.adc.pga)
+            self.calibration.save(self.calibrate_path)
+            self._calibrated_count = count
+            print(f"Calibration enregistree: {count} points, {len(self.calibration.knots)} segments")
+
+    def _step(self):
+        bidir_duty = self.sequence[self.index]
+        self.set_duty(bidir_duty)
+        print(f"Pico2 Emission - Duty: {bidir_duty}% -> Tension: {self.voltage():.2f}V ({self.measured_duty():.1f}%)")
+        self.index = (self.index + 1) % len(self.sequence)
+        if self.index == 0:
+            self.timer_report() # Une fois par cycle de la séquence
+
+    async def sequence_task(self):
+        await self.every("sequence", self.step_ms, self._step)
+
+    def report(self):
+        if self.calibrator is not None:
+            self._calibrate()
+        if self.last is not None:
+            theoretical_duty, measured_duty, error = (from_centi(centi) for centi in self.last)
+            settle = f" | Stabilisation: {self.settle_us / 1000:.0f} ms" if self.wait_settle and self.settle_us is not None else ""
+            print(f"Theorique: {theoretical_duty:5.1f}% | Mesure: {measured_duty:5.1f}% | Erreur: {error:+.1f}% | Tension: {self.voltage():.2f}V{settle}")
+            self.last = None
+            batch = self.batch
+            if batch is not None:
+                print(f"Lots: {batch.batches} trames | {batch.samples} mesures | {batch.bytes_sent / max(1, batch.samples):.1f} o/mesure")
+
+    def tasks(self):
+        tasks = super().tasks() + [self.sequence_task()]
+        if self.batch is not None:
+            tasks.append(self.batch_task())
+        return tasks
+
+
+def duty_range(start, stop, step):
+    """Rapports cycliques de start à stop inclus par pas de step (ex: 0 à 100 par 0,5)"""
+    count = int(round((stop - start) / step)) + 1
+    return [round(start + i * step, 2) for i in range(count)]
+
+
+class SweepRuntime(PicoRuntime):
+    """Pico 1 : balayage rapide d'une liste de rapports cycliques, une seule fois.
+
+    Chaque pas démarre dès que la tension locale est stabilisée et que Pico 2 a
+    répondu au pas précédent (trame ME associée par son numéro de séquence), ou
+    après timeout_ms. Les deux cartes lisent le même filtre RC : la sortie PWM ne
+    peut donc pas changer pendant que Pico 2 échantillonne. Ce qui est recouvert,
+    c'est le reste : émission de la consigne suivante, stabilisation locale et
+    réception de la mesure de Pico 2, affichage reporté à la fin du balayage.
+    """
+
+    MISSING = -32768 # Pas sans réponse de Pico 2
+
+    def __init__(self, uart, adc, pwm, duties, timeout_ms=1000, calibrate_path=None, **kwargs):
+        super().__init__(uart, adc, pwm, **kwargs)
+        self.duties = duties
+        self._duties_centi = array('h', [to_centi(duty) for duty in duties])
+        self.timeout_ms = timeout_ms
+        self.calibrate_path = calibrate_path # Ajuste et enregistre la calibration de la carte après le balayage
+        n = len(duties)
+        self.calibrator = Calibrator(n)
+        self.local = array('h', bytes(2 * n)) # Rapport cyclique mesuré par Pico 1 (centièmes de pourcent)
+        self.remote = array('h', [self.MISSING] * n) # Mesure de Pico 2
+        self.settle_ms = array('H', bytes(2 * n))
+        self.sweep_us = 0
+        self.late = 0 # Réponses arrivées après le timeout de leur pas
+        self.inflight = InFlight(timeout_ms) # Séquence TH -> indice du pas
+        self._index = -1 # Pas en cours
+
+    def on_frame(self, ftype, buf):
+        if ftype == TYPE_ME:
+            index = self.inflight.match(frame_seq(buf))
+            if index is None:
+                return
+            if self.remote[index] == self.MISSING:
+                self.remote[index] = unpack_me(buf)[1]
+            if index != self._index:
+                self.late += 1
+
+    async def sweep(self):
+        """Parcourt tous les pas ; retourne la durée totale en µs"""
+        start = ticks_us()
+        for index, centi in enumerate(self._duties_centi):
+            self._index = index
+            await self.wait_window()
+            step = ticks_ms()
+            self.set_duty_centi(centi)
+            frame = self.encoder.pack_th_centi(centi)
+            self.inflight.expire()
+            self.inflight.add(frame_seq(frame), index)
+            self.send_data(frame)
+            await self.settle()
+            self.calibrator.add_q4(centi, self.settler.value_q4)
+            self.local[index] = self.measured_centi()
+            self.settle_ms[index] = min(65535, self.settle_us // 1000)
+            while self.remote[index] == self.MISSING and ticks_diff(ticks_ms(), step) < self.timeout_ms:
+                await sleep_ms(1)
+        self._index = -1
+        self.sweep_us = ticks_diff(ticks_us(), start)
+        return self.sweep_us
+
+    def print_curve(self):
+        """Courbe de transfert complète (CSV) puis durée du balayage"""
+        print("consigne;pico1;pico2;erreur;stabilisation_ms")
+        missing = 0
+        for index, duty in enumerate(self.duties):
+            local = from_centi(self.local[index])
+            if self.remote[index] == self.MISSING:
+                missing += 1
+                print(f"{duty:.2f};{local:.2f};;;{self.settle_ms[index]}")
+            else:
+                remote = from_centi(self.remote[index])
+                print(f"{duty:.2f};{local:.2f};{remote:.2f};{remote - duty:+.2f};{self.settle_ms[index]}")
+        print(f"Balayage: {len(self.duties)} pas en {self.sweep_us / 1000000:.2f} s | sans réponse: {missing} | réponses tardives: {self.late}")
+
+    async def run(self):
+        coros = [self.rx_task(), self.tx_task()]
+        if self.link is not None:
+            coros.append(self.link_task())
+        tasks = [asyncio.create_task(coro) for coro in coros]
+        await self.sweep()
+        await sleep_ms(10) # Dernières trames en file
+        for task in tasks:
+            task.cancel()
+        self.print_curve()
+        if self.calibrate_path:
+            self.calibration = self.calibrator.fit(self.adc.pga)
+            self.calibration.save(self.calibrate_path)
+            print(f"Calibration enregistree: {len(self.calibration.knots)} segments ({self.calibrate_path})")
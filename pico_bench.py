@@ -0,0 +1,371 @@
+# Bancs de mesure exécutés sur une Pico, réelle ou simulée (sim/).
+# Chaque carte charge son script ("Code Pico 1.py" ou "Code Pico 2.py") sans lancer
+# main(), puis mesure avec les objets de sa carte (station.py) :
+#   - l'échange TH/ME entre les deux Pico (messages/s, octets/s, aller-retour),
+#   - la régularité de la tâche ADC périodique, d'une boucle time.sleep et d'un
+#     traitement cadencé par machine.Timer (ticker.py) pendant une boucle chargée,
+#   - le temps de stabilisation du filtre RC à chaque pas de la séquence (Pico 1),
+#   - la précision et la durée de lecture de chaque filtre de adc_filter.py (Pico 1),
+#   - la chaîne de mesure en flottants contre la virgule fixe (fixed.py) et ses
+#     variantes native/viper : opérations/s et octets alloués (carte réelle uniquement),
+#   - le débit de Station.read_voltage() et l'occupation du tas.
+# Sur la carte : copier ce fichier avec les modules, régler ROLE, lancer Pico 2 puis
+# Pico 1 ; les résultats sont écrits dans bench_results.json.
+# Sur PC : python3 bench.py (les deux cartes tournent dans le simulateur).
+
+import gc
+import json
+import sys
+from array import array
+
+from compat import micropython, ticks_us, ticks_diff, sleep_ms
+from ads1015 import raw_to_voltage, raw_to_mv, FULL_SCALE_MV
+from adc_filter import FilteredADC, make_filter
+from fixed import duty_u16, duty_u16_native, duty_u16_viper
+from protocol import Encoder
+from pico_async import asyncio, GeneratorRuntime, ValidatorRuntime
+from ticker import Ticker
+
+try:
+    import tracemalloc # CPython : allocations de la chaîne de mesure hors de la carte
+except ImportError:
+    tracemalloc = None
+
+ROLE = 1 # 1 : générateur (Pico 1), 2 : validateur (Pico 2)
+SCRIPTS = {1: "Code Pico 1.py", 2: "Code Pico 2.py"}
+RESULTS_FILE = "bench_results.json"
+SYNC_MARGIN_MS = 1000 # Pico 2 écoute plus longtemps que Pico 1 n'émet
+FILTER_SPECS = ("none", "decim:4", "decim:16", "avg:8", "avg:33", "median:5", "iir:3")
+MICROPYTHON = sys.implementation.name == "micropython"
+
+
+def heap():
+    """Octets alloués et libres sur le tas (MicroPython uniquement, None sur PC)"""
+    gc.collect()
+    if hasattr(gc, 'mem_alloc'):
+        return {'alloc': gc.mem_alloc(), 'free': gc.mem_free()}
+    return None
+
+
+def percentiles(values):
+    """Médiane, 95e centile et maximum d'une liste de mesures"""
+    values = sorted(values)
+    if not values:
+        return {'p50': None, 'p95': None, 'max': None}
+    return {
+        'p50': values[len(values) // 2],
+        'p95': values[min(len(values) - 1, len(values) * 95 // 100)],
+        'max': values[-1],
+    }
+
+
+def intervals(stamps, n, nominal_us):
+    """Écarts (µs) entre les intervalles successifs de stamps[:n] et la période nominale"""
+    return [abs(ticks_diff(stamps[i], stamps[i - 1]) - nominal_us) for i in range(1, n)]
+
+
+def load_script(path):
+    """Exécute le script d'une Pico sans lancer main() ; retourne ses variables globales"""
+    namespace = {'__name__': 'pico_bench'}
+    with open(path) as f:
+        exec(f.read(), namespace)
+    return namespace
+
+
+def bench_adc(read, duration_ms=1000):
+    """Appels de read() par seconde pendant duration_ms"""
+    count = 0
+    start = ticks_us()
+    while ticks_diff(ticks_us(), start) < duration_ms * 1000:
+        read()
+        count += 1
+    return {'samples_per_s': count * 1000000 / ticks_diff(ticks_us(), start)}
+
+
+def bench_loop(work, period_ms=10, count=200):
+    """Régularité d'une boucle work() + sleep_ms(period_ms), comme la boucle principale des scripts"""
+    stamps = array('i', bytes(4 * count))
+    for i in range(count):
+        stamps[i] = ticks_us()
+        work()
+        sleep_ms(period_ms)
+    periods = [ticks_diff(stamps[i], stamps[i - 1]) for i in range(1, count)]
+    period = percentiles(periods)
+    # Période = travail + pause : la gigue est l'écart à la période médiane, pas à period_ms
+    return {'period_us': period, 'jitter_us': percentiles(intervals(stamps, count, period['p50']))}
+
+
+def bench_ticker(work, period_ms=10, count=200):
+    """Régularité d'un callback de machine.Timer (ticker.py) pendant que la boucle principale enchaîne work() sans pause :
+    gigue des interruptions et du callback (micropython.schedule), retard maximal"""
+    stamps = array('i', bytes(4 * count))
+    done = [0]
+
+    def handler():
+        if done[0] < count:
+            stamps[done[0]] = ticks_us()
+            done[0] += 1
+
+    ticker = Ticker(period_ms, handler, history=count)
+    try:
+        while done[0] < count:
+            work()
+    finally:
+        ticker.stop()
+    stats = ticker.stats()
+    return {
+        'tick_jitter_us': percentiles(ticker.jitter_us()),
+        'handler_jitter_us': percentiles(intervals(stamps, count, period_ms * 1000)),
+        'latency_max_us': stats['latency_max_us'],
+        'overruns': stats['overruns'],
+    }
+
+
+def bench_settle(pwm, settler, read_next, pga, sequence=(0, 10, 25, 50, 75, 90, 100, 0), vdd=3.3):
+    """Temps de stabilisation du filtre RC à chaque pas de la séquence et écart à la tension attendue"""
+    settle_ms = []
+    errors = []
+    timeouts = 0
+    start = ticks_us()
+    for duty in sequence:
+        pwm.duty_u16(duty * 65535 // 100)
+        voltage = raw_to_voltage(settler.wait(read_next), pga)
+        settle_ms.append(settler.settle_us / 1000)
+        errors.append(abs(voltage / vdd * 100 - duty))
+        timeouts += settler.timed_out
+    return {
+        'sweep_ms': ticks_diff(ticks_us(), start) / 1000,
+        'steps': len(sequence),
+        'settle_ms': percentiles(settle_ms),
+        'error_pct': percentiles(errors),
+        'timeouts': timeouts,
+    }
+
+
+def bench_filters(adc, pwm, specs=FILTER_SPECS, duty=50, reads=40, vdd=3.3, settle_ms=300):
+    """Précision et durée de lecture de chaque réglage de adc_filter, rapport cyclique fixe (ondulation maximale à 50 %)"""
+    pwm.duty_u16(duty * 65535 // 100)
+    sleep_ms(settle_ms) # Tension réellement établie (pas seulement extrapolée) avant les mesures
+    expected = duty * vdd / 100
+    results = {}
+    for spec in specs:
+        filtered = FilteredADC(adc, make_filter(spec))
+        errors = []
+        start = ticks_us()
+        for _ in range(reads):
+            errors.append(filtered.read_voltage() - expected)
+        elapsed_us = ticks_diff(ticks_us(), start)
+        mean = sum(errors) / reads
+        results[spec] = {
+            'read_ms': elapsed_us / reads / 1000,
+            'mean_error_mv': mean * 1000,
+            'std_mv': (sum((e - mean) ** 2 for e in errors) / reads) ** 0.5 * 1000,
+            'max_error_mv': max(abs(e) for e in errors) * 1000,
+            'bits': filtered.filter.info()['bits'],
+        }
+    return results
+
+
+def _count(work, iterations):
+    # Appels de work(i) par seconde et octets alloués par appel : gc.mem_alloc() sur MicroPython,
+    # tracemalloc sur PC (passe séparée, le traçage ralentit les appels)
+    gc.collect()
+    gc.disable() # Sans ramasse-miettes, gc.mem_alloc() ne fait qu'augmenter
+    before = gc.mem_alloc() if hasattr(gc, 'mem_alloc') else None
+    start = ticks_us()
+    try:
+        for i in range(iterations):
+            work(i)
+        elapsed_us = ticks_diff(ticks_us(), start)
+        after = gc.mem_alloc() if before is not None else None
+    finally:
+        gc.enable()
+    result = {
+        'ops_per_s': iterations * 1000000 / max(1, elapsed_us),
+        'heap_bytes_per_op': None if before is None else (after - before) / iterations,
+    }
+    if before is None and tracemalloc is not None:
+        result.update(_trace(work, min(iterations, 1000)))
+    return result
+
+
+def _trace(work, iterations):
+    # Pic d'octets alloués pendant un appel (CPython) : les objets temporaires sont libérés à la fin
+    # de l'appel. Sur PC les entiers au-delà de 256 sont aussi des objets : seule la carte
+    # (gc.mem_alloc) montre ce que la virgule fixe économise
+    tracemalloc.start()
+    try:
+        peak = 0
+        for i in range(iterations):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            work(i)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    return {'peak_bytes_per_op': peak}
+
+
+# Conversion par bloc des codes ADC en millivolts, mesurée seulement par bench_fixed : sur PC
+# la boucle entière est plus lente que la même boucle en flottants (~31k contre ~50k
+# blocs/s), sans mesure sur la carte pour l'instant. La chaîne de mesure convertit une
+# valeur filtrée à la fois (ads1015.raw_to_mv).
+def mv_block(samples, out, n, full_scale_mv):
+    """Codes ADC samples[:n] -> millivolts dans out[:n] (tableaux 'h' préalloués)"""
+    for i in range(n):
+        out[i] = (samples[i] * full_scale_mv + 1024) >> 11
+
+
+@micropython.native
+def mv_block_native(samples, out, n, full_scale_mv):
+    """mv_block compilé en code machine (émetteur native)"""
+    for i in range(n):
+        out[i] = (samples[i] * full_scale_mv + 1024) >> 11
+
+
+if MICROPYTHON:
+    @micropython.viper
+    def mv_block_viper(samples, out, n: int, full_scale_mv: int):
+        """mv_block par pointeurs 16 bits (émetteur viper)"""
+        src = ptr16(samples) # ptr16 : type natif de viper
+        dst = ptr16(out)
+        for i in range(n):
+            raw = src[i]
+            if raw > 32767: # ptr16 lit des entiers non signés
+                raw -= 65536
+            dst[i] = (raw * full_scale_mv + 1024) >> 11
+else:
+    mv_block_viper = mv_block
+
+
+def bench_fixed(calibration, pga, iterations=2000, block=64):
+    """Une mesure complète (consigne -> PWM, code ADC -> tension, rapport cyclique, erreur, trame ME) :
+    flottants comme les scripts d'origine, contre virgule fixe en Python, native et viper"""
+    encoder = Encoder()
+    full_scale = FULL_SCALE_MV[pga] / 1000
+    codes = array('h', [(i * 37) % 1650 for i in range(256)]) # Codes ADC plausibles (0 à 3,3 V)
+    duties = [i % 101 for i in range(256)]
+    centis = array('h', [duty * 100 for duty in duties])
+
+    def float_path(i):
+        duty_cycle = duties[i & 255]
+        int(max(0, min(100, duty_cycle)) * 65535 / 100) # set_pwm_duty
+        voltage = codes[i & 255] * full_scale / 2048 # Station.read_voltage
+        measured = max(0, min(100, voltage / 3.3 * 100)) # calculate_real_duty
+        encoder.pack_me(duty_cycle, measured, measured - duty_cycle)
+
+    def fixed_path(convert):
+        def work(i):
+            centi = centis[i & 255]
+            convert(centi)
+            raw = codes[i & 255]
+            raw_to_mv(raw, pga)
+            measured = calibration.duty_centi(raw)
+            encoder.pack_me_centi(centi, measured, measured - centi)
+        return work
+
+    results = {
+        'float': _count(float_path, iterations),
+        'fixed': _count(fixed_path(duty_u16), iterations),
+        'fixed_native': _count(fixed_path(duty_u16_native), iterations),
+        'fixed_viper': _count(fixed_path(duty_u16_viper), iterations),
+    }
+    # Conversion d'un bloc de codes en tension (ops_per_s : blocs/s) : flottants, puis entiers par variante
+    samples = array('h', codes[:block])
+    volts = [0.0] * block
+    millivolts = array('h', bytes(2 * block))
+
+    def float_block(_):
+        for i in range(block):
+            volts[i] = samples[i] * full_scale / 2048
+
+    results['block_float'] = _count(float_block, iterations // 10)
+    for name, convert in (('block_fixed', mv_block), ('block_native', mv_block_native), ('block_viper', mv_block_viper)):
+        results[name] = _count(lambda _, convert=convert: convert(samples, millivolts, block, FULL_SCALE_MV[pga]),
+                               iterations // 10)
+    return results
+
+
+def bench_exchange(role, uart, adc, pwm, duration_ms=5000, step_ms=20, adc_period_ms=10):
+    """Échange TH/ME avec les tâches de pico_async : Pico 1 envoie une consigne toutes les step_ms"""
+    quiet = 3600000 # Pas d'affichage ni de séquence propre pendant la mesure
+    if role == 1:
+        runtime = GeneratorRuntime(uart, adc, pwm, step_ms=step_ms, adc_period_ms=adc_period_ms, report_ms=quiet)
+    else:
+        runtime = ValidatorRuntime(uart, adc, pwm, step_ms=quiet, adc_period_ms=adc_period_ms, report_ms=quiet)
+        duration_ms += SYNC_MARGIN_MS
+    size = duration_ms // adc_period_ms + 16
+    stamps = array('i', bytes(4 * size))
+    sample = runtime._sample
+    count = [0]
+
+    def timed_sample():
+        if count[0] < size:
+            stamps[count[0]] = ticks_us()
+            count[0] += 1
+        sample()
+
+    runtime._sample = timed_sample
+    heap_before = heap()
+
+    async def run():
+        tasks = [asyncio.create_task(coro) for coro in runtime.tasks()]
+        await asyncio.sleep(duration_ms / 1000)
+        for task in tasks:
+            task.cancel()
+
+    start = ticks_us()
+    asyncio.run(run())
+    elapsed_s = ticks_diff(ticks_us(), start) / 1000000
+    heap_after = heap()
+    received = runtime.reader.frames
+    result = {
+        'duration_s': elapsed_s,
+        'frames_sent': runtime.frames_sent,
+        'frames_received': received,
+        'msgs_per_s': (runtime.frames_sent + received) / elapsed_s,
+        'tx_bytes_per_s': runtime.bytes_sent / elapsed_s,
+        'rx_bytes_per_s': runtime.bytes_received / elapsed_s,
+        'crc_errors': runtime.reader.errors,
+        'adc_samples': runtime.samples,
+        'adc_jitter_us': percentiles(intervals(stamps, count[0], adc_period_ms * 1000)),
+        'heap_growth': None if heap_before is None else heap_after['alloc'] - heap_before['alloc'],
+    }
+    if role == 1:
+        runtime.inflight.expire()
+        result['rtt_ms'] = percentiles([us / 1000 for us in runtime.inflight.latencies_us()])
+        result['replies'] = runtime.inflight.replied
+        result['link'] = runtime.inflight.stats()
+    else:
+        seqs = runtime.th_seqs
+        result['link'] = {'received': seqs.received, 'missing': seqs.missing,
+                          'reordered': seqs.reordered, 'duplicates': seqs.duplicates}
+    return result
+
+
+def run(role=ROLE, script=None, duration_ms=5000, step_ms=20):
+    """Tous les bancs de la carte ; l'échange TH/ME d'abord pour que les deux cartes démarrent ensemble"""
+    station = load_script(script or SCRIPTS[role])['station'] # Carte créée par le script (station.py)
+    results = {'role': role, 'platform': sys.implementation.name}
+    results['exchange'] = bench_exchange(role, station.uart, station.adc, station.pwm, duration_ms, step_ms)
+    if role == 1: # Seule la sortie PWM de Pico 1 pilote le filtre lu sur AIN2
+        results['settle'] = bench_settle(station.pwm, station.settler, station.read_next, station.adc.pga)
+        results['filters'] = bench_filters(station.adc, station.pwm)
+    if sys.implementation.name == "micropython": # En temps virtuel (simulateur), le calcul ne coûte rien
+        results['fixed'] = bench_fixed(station.calibration, station.adc.pga)
+    results['adc'] = bench_adc(station.read_voltage)
+    results['loop'] = bench_loop(station.read_voltage)
+    results['ticker'] = bench_ticker(station.read_voltage)
+    results['heap'] = heap()
+    return results
+
+
+def save(results, path=RESULTS_FILE):
+    with open(path, "w") as f:
+        json.dump(results, f)
+
+
+if __name__ == "__main__":
+    results = run()
+    save(results)
+    print(results)
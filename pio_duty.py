@@ -0,0 +1,160 @@
+# Mesure directe du rapport cyclique PWM par une machine d'état PIO du RP2040.
+# La mesure habituelle passe par le filtre RC et l'ADS1015 (AIN2) : il faut attendre
+# la stabilisation du filtre (settle.py), et l'ondulation PWM comme la cadence de
+# l'ADC limitent la précision. Ici, la sortie PWM de Pico 1 est aussi reliée à une
+# broche de Pico 2 (PIO_PIN) : la machine d'état compte les durées haute et basse de
+# chaque période, 2 cycles par unité, et pousse les deux compteurs dans son FIFO.
+# On obtient une mesure par période PWM (1 ms à 1 kHz), au cycle près, sans filtre.
+#
+# Mot du FIFO : (0xFFFF - haut) << 16 | (0xFFFF - bas). Les compteurs 16 bits imposent
+# une période PWM inférieure à 2 x 65535 cycles : sm_freq() abaisse la fréquence de la
+# machine pour les PWM lents. Sans front (0 % ou 100 %), aucune mesure n'arrive :
+# PioDutyMeter rend alors le niveau de la broche. Après un changement de consigne,
+# read_next_centi() attend une période commencée après l'appel (2 périodes au plus,
+# le nouveau rapport cyclique ne prenant effet qu'à la fin de la période en cours).
+#
+# Le même programme tourne sur PC dans le modèle de fake_pio.py (simulateur, bench.py).
+
+from compat import const, ticks_us, ticks_diff
+
+CYCLES_PER_COUNT = const(2) # Une boucle de comptage : jmp(pin) + jmp(x_dec)
+HIGH_OFFSET_CYCLES = const(6) # Cycles du niveau haut non comptés : jmp(pin) du front, in_, in_, push, mov, mov
+LOW_OFFSET_CYCLES = const(2) # Cycles du niveau bas non comptés : jmp(pin) du front, jmp("low")
+MAX_COUNT = const(65000) # Marge sous 0xFFFF pour la durée d'une phase
+MAX_FREQ = const(125_000_000)
+FIFO_DEPTH = const(8) # FIFO de réception joint (JOIN_RX)
+
+
+def duty_program():
+    # Programme PIO (rp2.asm_pio) : in_base et jmp_pin sur la broche mesurée
+    wait(0, pin, 0)
+    wait(1, pin, 0) # Premier front montant
+    wrap_target()
+    mov(x, invert(null)) # Compteurs à 0xFFFFFFFF, décrémentés
+    mov(y, invert(null))
+    label("high")
+    jmp(pin, "high_count")
+    jmp("low") # Front descendant
+    label("high_count")
+    jmp(x_dec, "high")
+    label("low")
+    jmp(pin, "done") # Front montant : fin de la période
+    jmp(y_dec, "low")
+    label("done")
+    in_(x, 16)
+    in_(y, 16)
+    push(noblock) # FIFO plein : mesure perdue, la machine ne s'arrête pas
+    wrap()
+
+
+def sm_freq(pwm_freq, max_freq=MAX_FREQ):
+    """Fréquence de la machine d'état : la plus haute qui garde une période PWM dans les compteurs 16 bits"""
+    return min(max_freq, pwm_freq * CYCLES_PER_COUNT * MAX_COUNT)
+
+
+def decode(word):
+    """Durées haute et basse (cycles de la machine d'état) d'un mot du FIFO"""
+    high = ((0xFFFF - (word >> 16)) & 0xFFFF) * CYCLES_PER_COUNT + HIGH_OFFSET_CYCLES
+    low = ((0xFFFF - word) & 0xFFFF) * CYCLES_PER_COUNT + LOW_OFFSET_CYCLES
+    return high, low
+
+
+def duty_centi(high, low):
+    """Rapport cyclique en centièmes de pourcent, arrondi, à partir des durées haute et basse"""
+    total = high + low
+    return (high * 10000 + total // 2) // total
+
+
+class PioDutyMeter:
+    """Rapport cyclique (centièmes de pourcent) du signal PWM d'une broche, mesuré par PIO à chaque période.
+
+    Compteurs : periods (mesures valides), rejected (période incohérente avec
+    pwm_freq : premier front, compteur saturé, parasite) et stale (FIFO plein :
+    les périodes les plus récentes ont été perdues, on attend la suivante).
+    """
+
+    def __init__(self, pin, pwm_freq=1000, sm_id=0, tolerance=8):
+        import rp2 # Module de la carte (sim/rp2.py dans le simulateur)
+        self.pin = pin
+        self.freq = sm_freq(pwm_freq)
+        self.period_cycles = self.freq // pwm_freq
+        self.tolerance = tolerance # Écart admis sur la période : 1/tolerance
+        self.period_us = 1000000 // pwm_freq
+        self.timeout_us = 3 * self.period_us # Sans mesure : signal constant
+        program = rp2.asm_pio(in_shiftdir=rp2.PIO.SHIFT_LEFT, fifo_join=rp2.PIO.JOIN_RX)(duty_program)
+        self.sm = rp2.StateMachine(sm_id, program, freq=self.freq, in_base=pin, jmp_pin=pin)
+        self.sm.active(1)
+        self.duty = None # Dernière mesure, centièmes de pourcent
+        self.high_cycles = 0
+        self.low_cycles = 0
+        self.periods = 0
+        self.rejected = 0
+        self.stale = 0
+        self._last_us = ticks_us()
+
+    def _accept(self, word):
+        high, low = decode(word)
+        error = high + low - self.period_cycles
+        if abs(error) * self.tolerance > self.period_cycles:
+            self.rejected += 1
+            return False
+        self.high_cycles = high
+        self.low_cycles = low
+        self.duty = duty_centi(high, low)
+        self.periods += 1
+        return True
+
+    def _wait_word(self):
+        # Prochaine mesure (au plus une période), ou False si le signal est constant
+        sm = self.sm
+        start = ticks_us()
+        while not sm.rx_fifo():
+            if ticks_diff(ticks_us(), start) > self.timeout_us:
+                return False
+        return True
+
+    def poll(self):
+        """Lit les mesures arrivées dans le FIFO ; True si au moins une est valide"""
+        sm = self.sm
+        count = sm.rx_fifo()
+        if count >= FIFO_DEPTH: # Mesures les plus anciennes seulement : on attend une période neuve
+            self.stale += 1
+            for _ in range(count):
+                sm.get()
+            count = 1 if self._wait_word() else 0
+        got = False
+        for _ in range(count):
+            got = self._accept(sm.get()) or got
+        now = ticks_us()
+        if got:
+            self._last_us = now
+        elif ticks_diff(now, self._last_us) > self.timeout_us:
+            self.duty = 10000 if self.pin.value() else 0 # Aucun front : 0 % ou 100 %
+        return got
+
+    def discard(self):
+        """Vide le FIFO : les mesures suivantes portent sur la période en cours ou les suivantes"""
+        sm = self.sm
+        for _ in range(sm.rx_fifo()):
+            sm.get()
+
+    def read_next_centi(self, periods=2):
+        """Rapport cyclique d'une période commencée après l'appel (attente de periods périodes au plus)"""
+        self.discard()
+        target = self.periods + periods
+        start = ticks_us()
+        while self.periods < target and ticks_diff(ticks_us(), start) <= periods * self.period_us + self.timeout_us:
+            self.poll()
+        return self.read_centi()
+
+    def read_centi(self):
+        """Rapport cyclique de la dernière période complète (centièmes de pourcent)"""
+        if not self.poll() and self.duty is None:
+            if self._wait_word():
+                self.poll()
+            else:
+                self.duty = 10000 if self.pin.value() else 0
+        return self.duty
+
+    def stop(self):
+        self.sm.active(0)
@@ -0,0 +1,282 @@
+# Protocole binaire entre Pico 1 et Pico 2 (remplace les lignes ASCII "TH:" / "ME:").
+#
+# Format d'une trame (octets) :
+#   SYNC (0xA5) | TYPE | SEQ | LEN | CHARGE UTILE (LEN octets) | CRC-8
+# Le CRC-8 (polynôme 0x07) couvre TYPE..fin de la charge utile. Une trame ME
+# reprend le SEQ de la trame TH à laquelle elle répond.
+# Les rapports cycliques sont transmis en virgule fixe : centièmes de pourcent (int16).
+#
+# Une trame TH fait 7 octets et une trame ME 11 octets, contre 8 et ~18 en ASCII,
+# et leur décodage ne crée aucune chaîne de caractères.
+#
+# Négociation : au démarrage Pico 1 envoie la trame HELLO suivie de "\n". Un Pico 2
+# en mode ASCII la lit comme une ligne, répond HELLO_ACK et passe en binaire.
+# Sans réponse, Pico 1 reste en ASCII (compatible avec l'ancien code de Pico 2).
+
+import struct
+
+from compat import const, ticks_ms, ticks_diff, sleep_ms
+
+SYNC = const(0xA5)
+PROTOCOL_VERSION = const(1)
+
+TYPE_HELLO = const(0x01)
+TYPE_HELLO_ACK = const(0x02)
+TYPE_BAUD = const(0x03) # Proposition de vitesse UART (baud.py)
+TYPE_BAUD_ACK = const(0x04) # Vitesse acceptée, Pico 2 passe à cette vitesse
+TYPE_BAUD_OK = const(0x05) # Vitesse validée par les motifs de test, conservée
+TYPE_PATTERN = const(0x06) # Motif de test, renvoyé tel quel par Pico 2
+TYPE_TH = const(0x10) # Consigne théorique (Pico 1 -> Pico 2)
+TYPE_ME = const(0x11) # Mesure, consigne reçue et erreur (Pico 2 -> Pico 1)
+TYPE_BATCH = const(0x12) # Lot de mesures (batch.py), trame longue
+TYPE_DATA = const(0x20) # Trame encapsulée par le transport fiable (transport.py)
+TYPE_ACK = const(0x21) # Acquittement cumulatif et crédit du récepteur (transport.py)
+
+HEADER_SIZE = const(4) # SYNC, TYPE, SEQ, LEN
+MAX_PAYLOAD = const(32)
+MAX_FRAME = const(37) # HEADER_SIZE + MAX_PAYLOAD + CRC
+BATCH_MAX_PAYLOAD = const(124) # Trames TYPE_BATCH : lues par un FrameReader(max_payload=BATCH_MAX_PAYLOAD)
+
+TH_FORMAT = "<h"
+ME_FORMAT = "<hhh"
+TH_FRAME_SIZE = const(7)
+ME_FRAME_SIZE = const(11)
+
+
+def _crc8_table():
+    table = bytearray(256)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[i] = crc
+    return bytes(table)
+
+_CRC8_TABLE = _crc8_table()
+
+
+def crc8(buf, start, end):
+    """CRC-8 (polynôme 0x07) de buf[start:end]"""
+    table = _CRC8_TABLE
+    crc = 0
+    for i in range(start, end):
+        crc = table[crc ^ buf[i]]
+    return crc
+
+
+def to_centi(value):
+    """Pourcent flottant -> centièmes de pourcent (int16, saturé)"""
+    centi = int(value * 100 + (0.5 if value >= 0 else -0.5))
+    return max(-32768, min(32767, centi))
+
+
+def from_centi(centi):
+    """Centièmes de pourcent -> pourcent flottant (affichage uniquement)"""
+    return centi / 100
+
+
+def finish_frame(buf, ftype, seq, length):
+    """Complète l'en-tête et le CRC d'une trame dont la charge utile est déjà écrite"""
+    buf[0] = SYNC
+    buf[1] = ftype
+    buf[2] = seq & 0xFF
+    buf[3] = length
+    end = HEADER_SIZE + length
+    buf[end] = crc8(buf, 1, end)
+    return end + 1
+
+
+def check_frame(buf, size):
+    """Type de la trame contenue dans buf[:size], ou -1 si elle est invalide"""
+    if size < HEADER_SIZE + 1 or buf[0] != SYNC:
+        return -1
+    length = buf[3]
+    end = HEADER_SIZE + length
+    if end + 1 != size or buf[end] != crc8(buf, 1, end):
+        return -1
+    return buf[1]
+
+
+def _static_frame(ftype):
+    buf = bytearray(HEADER_SIZE + 2)
+    buf[HEADER_SIZE] = PROTOCOL_VERSION
+    finish_frame(buf, ftype, 0, 1)
+    frame = bytes(buf) + b"\n" # Terminée par "\n" pour être lue comme une ligne en ASCII
+    if b"\n" in frame[:-1]: # Lue en deux lignes par un Pico 2 en ASCII : négociation impossible
+        raise ValueError(f"Trame {ftype:#04x} contenant un saut de ligne")
+    return frame
+
+HELLO_FRAME = _static_frame(TYPE_HELLO)
+HELLO_ACK_FRAME = _static_frame(TYPE_HELLO_ACK)
+
+
+class Encoder:
+    """Construit les trames dans des tampons préalloués (un par type)"""
+
+    def __init__(self):
+        self.seq = 0
+        self._th = bytearray(TH_FRAME_SIZE)
+        self._me = bytearray(ME_FRAME_SIZE)
+
+    def _next_seq(self):
+        seq = self.seq
+        self.seq = (seq + 1) & 0xFF
+        return seq
+
+    def pack_th(self, duty_cycle):
+        """Trame TH : consigne en pourcent"""
+        return self.pack_th_centi(to_centi(duty_cycle))
+
+    def pack_th_centi(self, centi):
+        """Trame TH : consigne en centièmes de pourcent (aucun flottant)"""
+        buf = self._th
+        struct.pack_into(TH_FORMAT, buf, HEADER_SIZE, centi)
+        finish_frame(buf, TYPE_TH, self._next_seq(), 2)
+        return buf
+
+    def pack_me(self, theoretical_duty, measured_duty, error, seq=None):
+        """Trame ME : consigne reçue, mesure et erreur en pourcent (seq : celui de la trame TH)"""
+        return self.pack_me_centi(to_centi(theoretical_duty), to_centi(measured_duty), to_centi(error), seq)
+
+    def pack_me_centi(self, theoretical, measured, error, seq=None):
+        """Trame ME en centièmes de pourcent (aucun flottant)"""
+        buf = self._me
+        struct.pack_into(ME_FORMAT, buf, HEADER_SIZE, theoretical, measured, error)
+        finish_frame(buf, TYPE_ME, self._next_seq() if seq is None else seq, 6)
+        return buf
+
+
+def unpack_th(buf):
+    """Consigne (centièmes de pourcent) d'une trame TH"""
+    return struct.unpack_from(TH_FORMAT, buf, HEADER_SIZE)[0]
+
+
+def frame_seq(buf):
+    """Numéro de séquence d'une trame"""
+    return buf[2]
+
+
+def unpack_me(buf):
+    """(consigne, mesure, erreur) en centièmes de pourcent d'une trame ME"""
+    return struct.unpack_from(ME_FORMAT, buf, HEADER_SIZE)
+
+
+class FrameReader:
+    """Analyseur de trames incrémental sur tampon circulaire.
+
+    Chaque appel transfère tous les octets disponibles de l'UART dans le tampon
+    circulaire (taille puissance de 2) puis en extrait les trames complètes. Après
+    un octet parasite ou un CRC faux, on abandonne un seul octet et on recherche
+    le SYNC suivant (resynchronisation). Compteurs : frames (trames valides),
+    discarded (octets abandonnés), errors (CRC faux), overflows (octets écrasés
+    parce que le tampon était plein). max_payload borne la longueur acceptée :
+    au-delà, l'octet LEN est tenu pour corrompu.
+    """
+
+    def __init__(self, uart, size=256, max_payload=MAX_PAYLOAD):
+        frame_size = HEADER_SIZE + max_payload + 1
+        if size & (size - 1) or size < frame_size:
+            raise ValueError(f"Taille de tampon invalide: {size}")
+        self.uart = uart
+        self.max_payload = max_payload
+        self.buf = bytearray(frame_size) # Dernière trame extraite
+        self._ring = bytearray(size)
+        self._mask = size - 1
+        self._head = 0 # Prochain octet à analyser
+        self._count = 0 # Octets en attente dans le tampon
+        self._chunk = bytearray(32)
+        self.frames = 0
+        self.discarded = 0
+        self.errors = 0
+        self.overflows = 0
+
+    def feed(self, data, n):
+        """Ajoute les n premiers octets de data au tampon circulaire"""
+        ring = self._ring
+        mask = self._mask
+        tail = (self._head + self._count) & mask
+        for i in range(n):
+            ring[tail] = data[i]
+            tail = (tail + 1) & mask
+        self._count += n
+        if self._count > mask + 1:
+            # Tampon plein : les octets les plus anciens sont écrasés
+            lost = self._count - mask - 1
+            self.overflows += lost
+            self._head = (self._head + lost) & mask
+            self._count = mask + 1
+
+    def _fill(self):
+        # Vide le FIFO de l'UART dans le tampon circulaire
+        uart = self.uart
+        chunk = self._chunk
+        while uart.any():
+            got = uart.readinto(chunk, len(chunk))
+            if not got:
+                break
+            self.feed(chunk, got)
+
+    def _skip(self, n):
+        self._head = (self._head + n) & self._mask
+        self._count -= n
+
+    def _extract(self):
+        # Type de la prochaine trame complète (copiée dans self.buf) ou 0
+        ring = self._ring
+        mask = self._mask
+        buf = self.buf
+        while self._count:
+            head = self._head
+            if ring[head] != SYNC:
+                self._skip(1)
+                self.discarded += 1
+                continue
+            if self._count < HEADER_SIZE + 1:
+                return 0
+            length = ring[(head + 3) & mask]
+            if length > self.max_payload:
+                self._skip(1)
+                self.discarded += 1
+                continue
+            size = HEADER_SIZE + length + 1
+            if self._count < size:
+                return 0 # Trame incomplète, on attend la suite
+            for i in range(size):
+                buf[i] = ring[(head + i) & mask]
+            ftype = check_frame(buf, size)
+            if ftype < 0:
+                self.errors += 1
+                self.discarded += 1
+                self._skip(1)
+                continue
+            self._skip(size)
+            self.frames += 1
+            return ftype
+        return 0
+
+    def read(self):
+        """Type de la prochaine trame reçue (contenu dans self.buf) ou 0 si aucune trame complète"""
+        self._fill()
+        return self._extract()
+
+    def poll(self, handler):
+        """Appelle handler(type, buf) pour chaque trame complète disponible. Retourne leur nombre"""
+        self._fill()
+        n = 0
+        ftype = self._extract()
+        while ftype:
+            handler(ftype, self.buf)
+            n += 1
+            ftype = self._extract()
+        return n
+
+
+def negotiate(uart, reader, timeout_ms=500):
+    """Propose le protocole binaire au Pico distant. True s'il l'accepte"""
+    uart.write(HELLO_FRAME)
+    start = ticks_ms()
+    while ticks_diff(ticks_ms(), start) < timeout_ms:
+        if reader.read() == TYPE_HELLO_ACK and reader.buf[HEADER_SIZE] == PROTOCOL_VERSION:
+            return True
+        sleep_ms(5)
+    return False
@@ -0,0 +1,208 @@
+# Lecture de plusieurs entrées de l'ADS1015 à tour de rôle (multiplexeur).
+# Le pilote ne lit qu'un canal (AIN2) en conversion continue. Pour en surveiller
+# plusieurs, chaque canal a sa propre configuration (entrée simple ou différentielle,
+# gain, débit) et la puce fait des conversions uniques : chacune part d'un filtre
+# neuf, sans conversion à jeter après un changement d'entrée.
+#
+# Le registre de conversion garde le résultat précédent jusqu'à la fin de la
+# conversion suivante : à la fin de la conversion du canal k, on écrit d'abord la
+# configuration du canal k+1 (ce qui démarre sa conversion), puis on lit le résultat
+# du canal k pendant qu'elle tourne. La lecture ne s'ajoute donc pas au cycle : une
+# conversion par période de conversion + une écriture de configuration.
+# La lecture doit alors se terminer avant la fin de la conversion du canal k+1, sinon
+# le registre contient déjà le résultat de k+1, rangé sous le canal k : à 100 kHz, une
+# lecture (48 bits, 480 µs) dure plus qu'une conversion à 3300 échantillons/s (303 µs).
+# La durée de lecture est donc calculée à partir de la fréquence du bus : quand elle
+# ne tient pas dans la conversion suivante (marge PIPELINE_MARGIN_PCT pour le code
+# Python), le canal k est lu avant de démarrer k+1. Une lecture terminée après la fin
+# de la conversion suivante (bus occupé, tâche retardée) est jetée et le canal passe
+# à la lecture avant démarrage.
+#
+# Chaque canal a son flux d'échantillons horodatés (milieu de la conversion, ticks_us)
+# dans des tableaux circulaires préalloués.
+
+from array import array
+
+from compat import const, ticks_us, ticks_diff, ticks_add, sleep_us
+from ads1015 import (REG_CONFIG, REG_CONVERSION, OS_SINGLE, MODE_SINGLE, COMP_QUE_DISABLE, DATA_RATES, RATE_MARGIN_PCT,
+                     PGA_4_096, FULL_SCALE, MUX_AIN0_AIN1, MUX_AIN0_AIN3, MUX_AIN1_AIN3, MUX_AIN2_AIN3,
+                     MUX_AIN0, MUX_AIN1, MUX_AIN2, MUX_AIN3, raw_to_mv)
+
+SCAN_DEPTH = const(64) # Échantillons gardés par canal
+READ_BITS = const(48) # Lecture du registre de conversion : 5 octets de 9 bits + start, redémarrage, stop
+PIPELINE_MARGIN_PCT = const(50) # Marge de la lecture pendant la conversion suivante (code Python, bus partagé)
+
+# Noms des entrées (parse_channel)
+MUX_NAMES = {
+    "ain0-ain1": MUX_AIN0_AIN1,
+    "ain0-ain3": MUX_AIN0_AIN3,
+    "ain1-ain3": MUX_AIN1_AIN3,
+    "ain2-ain3": MUX_AIN2_AIN3,
+    "ain0": MUX_AIN0,
+    "ain1": MUX_AIN1,
+    "ain2": MUX_AIN2,
+    "ain3": MUX_AIN3,
+}
+
+
+def read_us(i2c_freq):
+    """Durée (µs) d'une lecture du registre de conversion sur le bus"""
+    return READ_BITS * 1000000 // i2c_freq
+
+
+def parse_channel(spec):
+    """"ain3", "ain0-ain1:2.048" ou "ain2:4.096:1600" -> (mux, pga, débit)"""
+    parts = spec.lower().split(":")
+    mux = MUX_NAMES.get(parts[0])
+    if mux is None:
+        raise ValueError(f"Entree ADS1015 inconnue: {parts[0]}")
+    pga = PGA_4_096
+    if len(parts) > 1:
+        for code, volts in FULL_SCALE.items():
+            if volts == float(parts[1]):
+                pga = code
+                break
+        else:
+            raise ValueError(f"Gain ADS1015 invalide: {parts[1]}")
+    rate = int(parts[2]) if len(parts) > 2 else 3300
+    if rate not in DATA_RATES:
+        raise ValueError(f"Debit ADS1015 invalide: {rate}")
+    return mux, pga, rate
+
+
+class MuxScanner:
+    """Conversions uniques de l'ADS1015 sur chaque canal de channels ((mux, pga, débit) ou "ain3:4.096:3300"),
+    à tour de rôle, écriture de la configuration suivante avant la lecture du résultat.
+
+    poll() fait avancer le balayage sans attendre (tâche asyncio, boucle principale),
+    scan(n) attend et fait n conversions. La puce quitte le mode continu : le pilote
+    la reconfigure à sa prochaine lecture. i2c_freq est la fréquence du bus : pipelined[k]
+    indique si le canal k+1 démarre avant la lecture du canal k. Compteurs : conversions,
+    late (conversions lues plus d'une demi-période après leur fin), collisions (lectures
+    jetées, terminées après la conversion suivante) et count[k] par canal.
+    """
+
+    def __init__(self, adc, channels, depth=SCAN_DEPTH, i2c_freq=100000):
+        self.adc = adc
+        self.channels = [parse_channel(channel) if isinstance(channel, str) else channel for channel in channels]
+        n = len(self.channels)
+        self.configs = [OS_SINGLE | mux | pga | MODE_SINGLE | DATA_RATES[rate] | COMP_QUE_DISABLE
+                        for mux, pga, rate in self.channels]
+        self.periods_us = [1000000 * (100 + RATE_MARGIN_PCT) // (100 * rate) for _, _, rate in self.channels]
+        self.read_us = read_us(i2c_freq)
+        budget = self.read_us * (100 + PIPELINE_MARGIN_PCT) // 100
+        self.pipelined = [budget < self.periods_us[(k + 1) % n] for k in range(n)]
+        self.depth = depth
+        self.codes = [array('h', bytes(2 * depth)) for _ in range(n)]
+        self.stamps = [array('i', bytes(4 * depth)) for _ in range(n)]
+        self.count = [0] * n
+        self.conversions = 0
+        self.late = 0
+        self.collisions = 0
+        self.running = False
+        self._index = 0
+        self._started = 0 # Début de la conversion en cours
+        self._due = 0
+        self._cfg = bytearray(2)
+        self._buf = bytearray(2)
+
+    def _start(self, index):
+        # Écrit la configuration du canal : sa conversion démarre
+        config = self.configs[index]
+        cfg = self._cfg
+        cfg[0] = config >> 8
+        cfg[1] = config & 0xFF
+        self.adc.i2c.writeto_mem(self.adc.address, REG_CONFIG, cfg)
+        now = ticks_us()
+        self._index = index
+        self._started = now
+        self._due = ticks_add(now, self.periods_us[index])
+
+    def start(self):
+        """Démarre la conversion du premier canal"""
+        self.adc.configured = False # Mode continu abandonné
+        self.running = True
+        self._start(0)
+
+    def poll(self):
+        """Lit la conversion en cours si elle est terminée (et démarre la suivante) ; retourne le canal lu ou -1"""
+        if not self.running:
+            self.start()
+        now = ticks_us()
+        if ticks_diff(now, self._due) < 0:
+            return -1
+        index = self._index
+        started = self._started
+        if ticks_diff(now, self._due) > self.periods_us[index] >> 1:
+            self.late += 1
+        following = index + 1 if index + 1 < len(self.configs) else 0
+        pipelined = self.pipelined[index]
+        if pipelined:
+            self._start(following) # Conversion suivante, pendant la lecture
+        buf = self._buf
+        try:
+            self.adc.i2c.readfrom_mem_into(self.adc.address, REG_CONVERSION, buf)
+        except OSError:
+            self.running = False # Configuration réécrite au prochain appel
+            raise
+        if not pipelined:
+            self._start(following)
+        elif ticks_diff(ticks_us(), self._due) >= 0: # Résultat peut-être déjà celui du canal suivant
+            self.collisions += 1
+            self.pipelined[index] = False
+            return -1
+        raw = (buf[0] << 8 | buf[1]) >> 4
+        i = self.count[index] % self.depth
+        self.codes[index][i] = raw - 4096 if raw > 2047 else raw
+        self.stamps[index][i] = ticks_add(started, self.periods_us[index] >> 1) # Milieu de la conversion
+        self.count[index] += 1
+        self.conversions += 1
+        return index
+
+    def due_us(self):
+        """Attente (µs) avant la fin de la conversion en cours, négative si elle est terminée (0 avant start())"""
+        if not self.running:
+            return 0
+        return ticks_diff(self._due, ticks_us())
+
+    def scan(self, conversions):
+        """Attend et lit conversions résultats (tous canaux confondus)"""
+        done = 0
+        while done < conversions:
+            if self.poll() < 0:
+                remaining = self.due_us()
+                if remaining > 0:
+                    sleep_us(remaining)
+            else:
+                done += 1
+        return done
+
+    def stop(self):
+        """Arrête après la conversion en cours (la puce s'éteint à sa fin, mode conversion unique)"""
+        self.running = False
+
+    def latest(self, index):
+        """(code, ticks_us) du dernier échantillon du canal, None s'il n'y en a pas"""
+        count = self.count[index]
+        if not count:
+            return None
+        i = (count - 1) % self.depth
+        return self.codes[index][i], self.stamps[index][i]
+
+    def samples(self, index):
+        """Échantillons gardés du canal, du plus ancien au plus récent : liste de (ticks_us, code)"""
+        count = self.count[index]
+        n = min(count, self.depth)
+        codes = self.codes[index]
+        stamps = self.stamps[index]
+        return [(stamps[i % self.depth], codes[i % self.depth]) for i in range(count - n, count)]
+
+    def mv(self, index, code):
+        """Code du canal -> millivolts selon son gain"""
+        return raw_to_mv(code, self.channels[index][1])
+
+    def rate(self):
+        """Débit total (conversions/s) attendu : une période de conversion par canal, plus la lecture des canaux
+        lus avant démarrage, écriture de configuration non comprise"""
+        cycle = sum(self.periods_us) + sum(self.read_us for pipelined in self.pipelined if not pipelined)
+        return len(self.periods_us) * 1000000 // cycle
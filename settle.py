@@ -0,0 +1,122 @@
+# Détection de la stabilisation du filtre RC après un changement de rapport cyclique.
+# Au lieu d'attendre un délai fixe (time.sleep(0.1), sleep_ms(50)), on échantillonne
+# l'ADC rapidement et on regroupe les lectures par blocs. Trois moyennes de blocs
+# successives m0, m1, m2 d'une exponentielle vérifient (m2 - m1) = r·(m1 - m0) avec
+# r = exp(-durée d'un bloc / tau) : on en déduit la valeur finale sans attendre
+# qu'elle soit atteinte. La mesure est prête quand deux extrapolations successives
+# concordent, ou quand deux blocs consécutifs ne diffèrent plus que de la tolérance.
+# L'extrapolation suppose des blocs de même durée, enchaînés sans trou : le début de
+# chaque bloc est horodaté, et si les durées des trois blocs diffèrent de plus de
+# BLOCK_SPREAD_PCT (lectures retardées par une interruption, l'UART...), seul le test
+# de plateau s'applique à ces blocs.
+
+from compat import ticks_us, ticks_diff
+
+FRAC_BITS = 4 # value_q4 : code final en 1/16 (comme adc_filter.py)
+TOLERANCE = 4 # Tolérance par défaut en codes ADC (2 mV/code avec PGA ±4,096 V)
+BLOCK = 16 # Lectures moyennées par bloc (lisse le bruit et l'ondulation PWM)
+BLOCK_SPREAD_PCT = 10 # Écart de durée toléré entre les blocs extrapolés
+
+
+class SettlingDetector:
+    """Alimenté lecture par lecture (feed) ou en boucle bloquante (wait).
+
+    Une fois stabilisé : value est le code ADC final (extrapolé ou moyenné),
+    value_q4 le même code en entier (1/16 de code), settle_us le temps écoulé depuis reset() et timed_out indique si la limite
+    timeout_ms a été atteinte avant la stabilisation. Compteurs : uneven (extrapolations écartées, blocs de
+    durées inégales).
+    """
+
+    def __init__(self, tolerance=TOLERANCE, block=BLOCK, timeout_ms=1000, extrapolate=True):
+        self.tolerance = tolerance
+        self.block = block
+        self.timeout_ms = timeout_ms
+        self.extrapolate = extrapolate
+        self.uneven = 0
+        self.reset()
+
+    def reset(self):
+        """Nouveau changement de consigne : la mesure du temps de stabilisation part d'ici"""
+        self.start = ticks_us()
+        self.settled = False
+        self.timed_out = False
+        self.value = None
+        self.value_q4 = None
+        self.settle_us = None
+        self.samples = 0
+        self._sum = 0 # Somme du bloc en cours
+        self._count = 0
+        self._s0 = None # Sommes des deux derniers blocs complets
+        self._s1 = None
+        self._estimate = None # Dernière valeur finale extrapolée (en somme de bloc)
+        self._t0 = None # Débuts (ticks_us) des blocs s0, s1 et du bloc en cours
+        self._t1 = None
+        self._t2 = None
+
+    def _done(self, total, now):
+        self.value_q4 = (total << FRAC_BITS) // self.block
+        self.value = total / self.block
+        self.settle_us = ticks_diff(now, self.start)
+        self.settled = True
+        return True
+
+    def feed(self, raw, now=None):
+        """Ajoute une lecture ; vrai quand la tension est stabilisée"""
+        if self.settled:
+            return True
+        if now is None:
+            now = ticks_us()
+        self.samples += 1
+        if not self._count:
+            self._t2 = now
+        self._sum += raw
+        self._count += 1
+        if self._count < self.block:
+            return False
+        s2 = self._sum
+        self._sum = 0
+        self._count = 0
+        s0, s1 = self._s0, self._s1
+        self._s0, self._s1 = s1, s2
+        t0, t1, t2 = self._t0, self._t1, self._t2
+        self._t0, self._t1 = t1, t2
+        if ticks_diff(now, self.start) >= self.timeout_ms * 1000:
+            self.timed_out = True
+            return self._done(s2, now)
+        if s1 is None:
+            return False
+        tolerance = self.tolerance * self.block # Comparaisons sur les sommes : pas de division
+        d2 = s2 - s1
+        if -tolerance <= d2 <= tolerance and (s0 is None or -tolerance <= s1 - s0 <= tolerance):
+            return self._done(s2, now) # Plateau
+        if not self.extrapolate or s0 is None:
+            return False
+        if not self._even(t0, t1, t2, now):
+            self.uneven += 1
+            self._estimate = None
+            return False
+        d1 = s1 - s0
+        if abs(d1) <= tolerance or (d1 > 0) != (d2 > 0) or abs(d2) >= abs(d1):
+            self._estimate = None # Pas une exponentielle décroissante exploitable (bruit)
+            return False
+        estimate = s2 + d2 * d2 // (d1 - d2) # s2 + d2·r/(1-r) avec r = d2/d1 (division entière)
+        previous = self._estimate
+        self._estimate = estimate
+        if previous is not None and abs(estimate - previous) <= tolerance:
+            return self._done(estimate, now)
+        return False
+
+    def _even(self, t0, t1, t2, now):
+        # Blocs s0, s1, s2 de même durée (s2 : dernière lecture comprise, un intervalle de moins)
+        d0 = ticks_diff(t1, t0)
+        d1 = ticks_diff(t2, t1)
+        d2 = ticks_diff(now, t2) * self.block // max(1, self.block - 1)
+        longest = max(d0, d1, d2)
+        return (longest - min(d0, d1, d2)) * 100 <= longest * BLOCK_SPREAD_PCT
+
+    def wait(self, read_raw):
+        """Lit l'ADC jusqu'à la stabilisation ; retourne le code ADC final"""
+        self.reset()
+        while not self.feed(read_raw()):
+            pass
+        return self.value
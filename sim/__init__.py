@@ -0,0 +1,170 @@
+# Simulateur "machine" pour exécuter les scripts des Pico sur PC.
+#
+# sim.install() remplace les modules propres à MicroPython (machine, ustruct, les
+# fonctions time.sleep_ms, micropython.schedule, ...) par des versions simulées à
+# temps virtuel. Deux cartes reliées par UART, avec la chaîne PWM -> filtre RC ->
+# ADS1015 modélisée, peuvent alors exécuter "Code Pico 1.py" et "Code Pico 2.py"
+# dans le même processus (voir sim/run.py).
+#
+# La vitesse dépend de l'activité simulée : chaque attente ou transaction I2C qui
+# croise une échéance de l'autre carte passe le jeton à un autre thread (quelques
+# dizaines de µs sur PC). Avec les scripts par défaut, les deux cartes lisent
+# l'ADS1015 en continu à 3300 éch/s pendant la stabilisation du filtre RC (~7000
+# passages par seconde simulée) : la simulation ne va alors qu'environ deux fois
+# plus vite que le temps réel. Les essais cadencés en millisecondes (Test_5/Test_6)
+# vont ~15 fois plus vite. bench.py mesure les deux (bench_sim_speed).
+
+import _thread
+import asyncio
+import builtins
+import struct
+import sys
+import time
+import types
+
+import compat
+from sim import machine, rp2
+from sim.aio import VirtualEventLoopPolicy
+from sim.analog import RCFilter, AnalogInput
+from sim.board import Board
+from sim.clock import Scheduler
+
+__all__ = ["install", "Scheduler", "Board", "RCFilter", "AnalogInput", "Simulation"]
+
+_active = None
+_real_sleep = time.sleep
+_real_time = time.time
+_real_clock_ns = time.perf_counter_ns
+_real_start_new_thread = _thread.start_new_thread
+_real_print = builtins.print
+
+
+def _on_board():
+    return _active is not None and _active.board() is not None
+
+
+def _sleep(seconds):
+    if _on_board():
+        _active.board().wait_us(seconds * 1000000)
+    else:
+        _real_sleep(seconds)
+
+
+def _sleep_ms(ms):
+    _sleep(ms / 1000)
+
+
+def _sleep_us(us):
+    _sleep(us / 1000000)
+
+
+def _time():
+    if _on_board():
+        return _active.now_us // 1000000 # MicroPython : secondes entières
+    return _real_time()
+
+
+def _clock_ns():
+    if _on_board():
+        _active.checkpoint()
+        return _active.read_clock() * 1000
+    return _real_clock_ns()
+
+
+def _print(*args, **kwargs):
+    # Les print() des scripts sont horodatés en temps virtuel et conservés par la carte
+    if _on_board():
+        _active.board().print(*args, **kwargs)
+    else:
+        _real_print(*args, **kwargs)
+
+
+def _schedule(function, arg):
+    # micropython.schedule : le callback attend la fin de l'interruption et une frontière d'instruction
+    if _on_board():
+        _active.board().schedule(function, arg)
+    else:
+        function(arg)
+
+
+def _start_new_thread(function, args, kwargs=None):
+    # Un thread lancé par une carte (ex: second coeur) devient un thread simulé
+    if _on_board():
+        board = _active.board()
+        board.spawn("thread", lambda: function(*args, **(kwargs or {})))
+        return 0
+    return _real_start_new_thread(function, args, kwargs or {})
+
+
+def install(scheduler):
+    """Active le simulateur avec cet ordonnanceur (peut être rappelé pour une nouvelle simulation)"""
+    global _active
+    _active = scheduler
+    machine._scheduler = scheduler
+    rp2._scheduler = scheduler
+    sys.modules['machine'] = machine
+    sys.modules['rp2'] = rp2
+    sys.modules.setdefault('ustruct', struct)
+    if not isinstance(sys.modules.get('_thread'), types.ModuleType) or sys.modules['_thread'] is _thread:
+        shim = types.ModuleType('_thread')
+        shim.__dict__.update(_thread.__dict__)
+        shim.start_new_thread = _start_new_thread
+        sys.modules['_thread'] = shim
+        dual_core = sys.modules.get('dual_core')
+        if dual_core is not None:
+            dual_core._thread = shim
+    time.sleep = _sleep
+    time.sleep_ms = _sleep_ms
+    time.sleep_us = _sleep_us
+    time.time = _time
+    builtins.print = _print
+    compat.set_host_clock(_clock_ns, _sleep)
+    compat.micropython.schedule = staticmethod(_schedule)
+    asyncio.set_event_loop_policy(VirtualEventLoopPolicy(scheduler))
+
+
+class Simulation:
+    """Deux Pico reliées par UART (premier port ouvert par chaque script, UART 1 par
+    défaut), la sortie PWM (GP16) de Pico 1 filtrée par RC et lue sur AIN2 de
+    l'ADS1015 (0x48) des deux cartes, comme sur le banc réel.
+    La sortie PWM de Pico 2 passe par un second filtre RC relié à AIN3. La sortie
+    PWM de Pico 1 arrive aussi, sans filtre, sur GP18 de Pico 2 (mesure par PIO), et
+    son filtre RC sur GP26 (ADC interne) des deux cartes. Au-delà de i2c_max_freq,
+    des transactions I2C échouent (câblage trop lent pour la fréquence du bus).
+    """
+
+    def __init__(self, tau=0.02, noise=0.002, baudrate=115200, bit_error_rate=0.0, max_baudrate=None, echo=True, seed=0,
+                 i2c_max_freq=None):
+        from ads1015 import MUX_AIN2, MUX_AIN3
+        self.scheduler = Scheduler()
+        install(self.scheduler)
+        self.pico1 = Board(self.scheduler, "Pico1", echo=echo)
+        self.pico2 = Board(self.scheduler, "Pico2", echo=echo)
+        uart1 = self.pico1.uart(1)
+        uart2 = self.pico2.uart(1)
+        uart1.link(uart2)
+        self.pico1.cable = uart1 # Reste sur l'UART 1 ou suit l'UART ouvert par le script
+        self.pico2.cable = uart2
+        for port in (uart1, uart2):
+            port.baudrate = baudrate
+            port.bit_error_rate = bit_error_rate
+            port.max_baudrate = max_baudrate
+        self.rc1 = RCFilter(self.pico1.pwm(16), tau)
+        self.rc2 = RCFilter(self.pico2.pwm(16), tau)
+        self.pico2.wire(18, self.pico1.pwm(16))
+        for i, board in enumerate((self.pico1, self.pico2)):
+            board.analog[26] = AnalogInput(self.rc1.voltage, noise, seed=seed + 10 + i)
+        for i, board in enumerate((self.pico1, self.pico2)):
+            board.i2c(1).max_freq = i2c_max_freq
+            board.attach_ads1015(1, 0x48, {
+                MUX_AIN2: AnalogInput(self.rc1.voltage, noise, seed=seed + 2 * i),
+                MUX_AIN3: AnalogInput(self.rc2.voltage, noise, seed=seed + 2 * i + 1),
+            })
+
+    def run_scripts(self, script1="Code Pico 1.py", script2="Code Pico 2.py", duration_s=30.0):
+        """Exécute les deux scripts pendant duration_s secondes virtuelles ; retourne la durée réelle"""
+        self.pico2.run_script(script2)
+        self.pico1.run_script(script1)
+        start = _real_clock_ns()
+        self.scheduler.run(duration_s)
+        return (_real_clock_ns() - start) / 1e9
@@ -0,0 +1,42 @@
+# Boucle asyncio à temps virtuel pour le mode coopératif (pico_async.py) simulé :
+# l'attente dans select() devient une attente virtuelle de l'ordonnanceur.
+
+import asyncio
+import selectors
+
+IDLE_US = 1000 # Attente quand la boucle n'a aucune échéance
+
+
+class _VirtualSelector(selectors.SelectSelector):
+    def __init__(self, scheduler):
+        super().__init__()
+        self.scheduler = scheduler
+
+    def select(self, timeout=None):
+        board = self.scheduler.board()
+        wait = board.wait_us if board is not None else self.scheduler.sleep_us
+        if timeout is None:
+            wait(IDLE_US)
+        elif timeout > 0:
+            wait(timeout * 1000000)
+        return []
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self, scheduler):
+        super().__init__(_VirtualSelector(scheduler))
+        self.scheduler = scheduler
+
+    def time(self):
+        return self.scheduler.read_clock() / 1000000
+
+
+class VirtualEventLoopPolicy(asyncio.DefaultEventLoopPolicy):
+    def __init__(self, scheduler):
+        super().__init__()
+        self.scheduler = scheduler
+
+    def new_event_loop(self):
+        if self.scheduler.board() is not None: # Thread d'une carte simulée
+            return VirtualEventLoop(self.scheduler)
+        return super().new_event_loop()
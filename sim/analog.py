@@ -0,0 +1,64 @@
+# Modèle de la chaîne analogique : sortie PWM -> filtre RC -> entrée de l'ADS1015.
+
+import math
+import random
+
+VDD = 3.3 # Tension haute de la sortie PWM
+
+
+class RCFilter:
+    """Filtre RC du premier ordre piloté par une sortie PWM simulée.
+
+    La tension moyenne suit une exponentielle de constante de temps tau après
+    chaque changement de rapport cyclique ; on y ajoute l'ondulation triangulaire
+    à la fréquence PWM (crête à crête ≈ VDD·d·(1-d)/(f·tau)).
+    """
+
+    def __init__(self, pwm, tau=0.02, vdd=VDD, ripple=True):
+        self.pwm = pwm
+        self.tau = tau
+        self.vdd = vdd
+        self.ripple = ripple
+        self._v0 = 0.0
+        self._t0 = 0.0
+        self._target = 0.0
+        pwm.listeners.append(self._on_change)
+
+    def _mean(self, t):
+        if self.tau <= 0:
+            return self._target
+        return self._target + (self._v0 - self._target) * math.exp(-(t - self._t0) / self.tau)
+
+    def _on_change(self, t, duty):
+        self._v0 = self._mean(t)
+        self._t0 = t
+        self._target = duty * self.vdd
+
+    def voltage(self, t):
+        """Tension filtrée à l'instant t (secondes virtuelles)"""
+        v = self._mean(t)
+        duty = self.pwm.duty()
+        if self.ripple and self.tau > 0 and 0 < duty < 1:
+            freq = self.pwm.freq()
+            pp = self.vdd * duty * (1 - duty) / (freq * self.tau)
+            phase = (t * freq) % 1.0
+            if phase < duty:
+                v += -pp / 2 + pp * phase / duty
+            else:
+                v += pp / 2 - pp * (phase - duty) / (1 - duty)
+        return v
+
+
+class AnalogInput:
+    """Entrée analogique de l'ADS1015 : source + bruit gaussien (écart type en volts)"""
+
+    def __init__(self, source, noise=0.002, seed=0):
+        self.source = source
+        self.noise = noise
+        self._random = random.Random(seed)
+
+    def __call__(self, t):
+        v = self.source(t) if callable(self.source) else self.source
+        if self.noise:
+            v += self._random.gauss(0.0, self.noise)
+        return v
@@ -0,0 +1,345 @@
+# Carte Pico simulée : broches, sorties PWM, bus I2C et ports UART.
+
+import random
+import runpy
+import sys
+import traceback
+
+from ads1015 import MUX_AIN0_AIN1, MUX_AIN0_AIN3, MUX_AIN1_AIN3, MUX_AIN2_AIN3, MUX_AIN0, MUX_AIN1, MUX_AIN2, MUX_AIN3
+from fake_i2c import FakeI2C, FakeADS1015, EIO
+from sim.uart import VirtualUART
+
+
+class SimPWM:
+    """Sortie PWM (interface de machine.PWM) ; prévient les filtres RC à chaque changement"""
+
+    def __init__(self, scheduler, pin):
+        self.scheduler = scheduler
+        self.pin = pin
+        self._freq = 1000
+        self._duty_u16 = 0
+        self.listeners = [] # Fonctions appelées avec (t, rapport cyclique 0..1)
+        self.changes = 0
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty_u16
+        value = max(0, min(65535, int(value)))
+        self._duty_u16 = value
+        self.changes += 1
+        t = self.scheduler.seconds()
+        for listener in self.listeners:
+            listener(t, value / 65535)
+
+    def duty_ns(self, value=None):
+        period_ns = 1000000000 // self._freq
+        if value is None:
+            return self._duty_u16 * period_ns // 65535
+        self.duty_u16(value * 65535 // period_ns)
+
+    def duty(self):
+        """Rapport cyclique 0..1"""
+        return self._duty_u16 / 65535
+
+    def deinit(self):
+        self.duty_u16(0)
+
+
+class SimI2C(FakeI2C):
+    """Bus I2C simulé dont chaque transaction dure le temps de ses bits à la fréquence du bus.
+    Au-delà de max_freq (câblage, capacité des lignes), une transaction sur FAST_ERROR_RATE
+    échoue : absence d'acquittement (OSError) ou bit de donnée relu faux"""
+
+    FAST_ERROR_RATE = 0.05
+
+    def __init__(self, scheduler, devices=None, freq=100000, max_freq=None, seed=0):
+        super().__init__(devices, freq)
+        self.scheduler = scheduler
+        self.busy_us = 0
+        self.max_freq = max_freq # Fréquence maximale fiable du bus (None : illimitée)
+        self.errors = 0
+        self._random = random.Random(seed)
+
+    def _transfer(self, nbytes):
+        # Adresse + registre, (redémarrage + adresse), données : 9 bits par octet + start/stop
+        us = (9 * nbytes + 3) * 1000000 // self.freq
+        self.busy_us += us
+        self.scheduler.checkpoint() # Appel terminé : retour au code Python
+        self.scheduler.advance(us)
+        if self.max_freq is not None and self.freq > self.max_freq and self._random.random() < self.FAST_ERROR_RATE:
+            self.errors += 1
+            if self._random.random() < 0.5:
+                raise OSError(EIO)
+            return 1 << self._random.randrange(16) # Bit inversé dans les données
+        return 0
+
+    def writeto_mem(self, addr, memaddr, buf):
+        flip = self._transfer(2 + len(buf))
+        if flip:
+            buf = bytes(buf)
+            value = (buf[0] << 8 | buf[1]) ^ flip
+            buf = bytes((value >> 8, value & 0xFF))
+        super().writeto_mem(addr, memaddr, buf)
+
+    def readfrom_mem(self, addr, memaddr, nbytes):
+        flip = self._transfer(3 + nbytes)
+        data = super().readfrom_mem(addr, memaddr, nbytes)
+        if flip:
+            value = int.from_bytes(data, 'big') ^ (flip >> 8 * (2 - nbytes))
+            data = value.to_bytes(nbytes, 'big')
+        return data
+
+    def readfrom_mem_into(self, addr, memaddr, buf):
+        flip = self._transfer(3 + len(buf))
+        super().readfrom_mem_into(addr, memaddr, buf)
+        if flip:
+            buf[0] ^= flip >> 8
+            if len(buf) > 1:
+                buf[1] ^= flip & 0xFF
+
+
+class SimAdcBlock:
+    """ADC interne du RP2040 (registres CS, FCS, FIFO, DIV) : conversions continues (START_MANY)
+    cadencées par DIV, lues dans le FIFO par le processeur ou par un canal DMA simulé"""
+
+    CLOCK = 48000000
+    FIFO_DEPTH = 4
+
+    def __init__(self, board):
+        self.board = board
+        self.cs = 0
+        self.fcs = 0
+        self.div = 0
+        self.dma = None # Canal DMA relié au FIFO (sim/rp2.py)
+        self._start_us = None
+        self._produced = 0 # Conversions prises en compte depuis START_MANY
+        self._consumed = 0
+
+    def period_us(self):
+        return (256 + self.div) * 1000000 / (256 * self.CLOCK)
+
+    def code(self, pin, t):
+        """Code 12 bits de la broche (GP26 à GP29) à l'instant t, référence 3,3 V"""
+        source = self.board.analog.get(pin)
+        volts = source(t) if source is not None else 0.0
+        return max(0, min(4095, round(volts / 3.3 * 4096)))
+
+    def _update(self):
+        if self._start_us is None:
+            return
+        elapsed = self.board.scheduler.now_us - self._start_us
+        self._produced = max(self._produced, int(elapsed / self.period_us()))
+        if self.dma is not None:
+            self.dma.service(self)
+        if self._produced - self._consumed > self.FIFO_DEPTH:
+            self._consumed = self._produced - self.FIFO_DEPTH # Débordement : seules les dernières restent
+
+    def pop(self):
+        """Conversion la plus ancienne du FIFO (instant de fin de conversion)"""
+        t = (self._start_us + (self._consumed + 1) * self.period_us()) / 1000000
+        self._consumed += 1
+        return self.code(26 + (self.cs >> 12 & 0x7), t)
+
+    def available(self):
+        return self._produced - self._consumed
+
+    def read(self, offset):
+        self._update()
+        if offset == 0x00:
+            return self.cs | 0x100 # READY
+        if offset == 0x08:
+            return self.fcs | min(self.available(), self.FIFO_DEPTH) << 16
+        if offset == 0x0C:
+            return self.pop() if self.available() > 0 else 0
+        if offset == 0x10:
+            return self.div
+        return 0
+
+    def write(self, offset, value):
+        self._update()
+        if offset == 0x00:
+            running = self._start_us is not None
+            self.cs = value
+            if value & 0x08 and not running: # START_MANY
+                self._start_us = self.board.scheduler.now_us
+                self._produced = self._consumed = 0
+            elif not value & 0x08:
+                self._start_us = None
+        elif offset == 0x08:
+            self.fcs = value
+        elif offset == 0x10:
+            self.div = value
+
+
+class Board:
+    """Pico simulée : exécute un script dans son propre thread à temps virtuel"""
+
+    def __init__(self, scheduler, name, echo=True):
+        self.scheduler = scheduler
+        self.name = name
+        self.echo = echo
+        self.output = [] # (temps virtuel, ligne affichée)
+        self.error = None
+        self._pins = {}
+        self._pwms = {}
+        self._i2c = {}
+        self._uarts = {}
+        self.cable = None # Port relié à l'autre carte ; suit le premier UART ouvert par le script
+        self._cable_placed = False
+        self.wires = {} # Broche d'entrée -> sortie PWM (d'une carte) qui la pilote
+        self.analog = {} # Broche GP26-29 -> tension(t) lue par l'ADC interne
+        self.adc_block = SimAdcBlock(self)
+        self.memory = {} # Registres écrits par mem32, hors ADC
+        self.timers = set() # Timers actifs (machine.Timer), pour machine.idle
+        self.in_irq = 0 # Interruption (timer) en cours
+        self.waiting = 0 # Threads de la carte en attente (sleep, idle, boucle asyncio)
+        self._scheduled = [] # File de micropython.schedule
+        self._running_scheduled = False
+
+    def pin_state(self, pin):
+        state = self._pins.get(pin)
+        if state is None:
+            state = {'board': self, 'value': 0, 'handler': None, 'trigger': 0}
+            self._pins[pin] = state
+        return state
+
+    def set_pin(self, pin, value):
+        """Change le niveau d'une broche et déclenche son interruption éventuelle"""
+        state = self.pin_state(pin)
+        old = state['value']
+        state['value'] = value
+        handler = state['handler']
+        if handler is not None and old != value:
+            edge = 8 if value else 4 # IRQ_RISING / IRQ_FALLING
+            if state['trigger'] & edge:
+                handler(pin)
+
+    def wire(self, pin, pwm):
+        """Relie une sortie PWM à une broche d'entrée de cette carte (PIO, Pin.value)"""
+        self.wires[pin] = pwm
+
+    def wire_level(self, pin):
+        """Niveau instantané d'une broche reliée à une sortie PWM"""
+        pwm = self.wires[pin]
+        duty = pwm.duty()
+        return 1 if (self.scheduler.seconds() * pwm.freq()) % 1.0 < duty else 0
+
+    def irq(self, handler, arg):
+        """Exécute un gestionnaire d'interruption ; les callbacks qu'il programme partent aussitôt si la carte attend"""
+        self.in_irq += 1
+        try:
+            handler(arg)
+        finally:
+            self.in_irq -= 1
+        if self.waiting:
+            self.run_scheduled()
+
+    def schedule(self, function, arg):
+        """micropython.schedule : file de 8 callbacks, exécutés hors interruption"""
+        if len(self._scheduled) >= 8:
+            raise RuntimeError("schedule queue full")
+        self._scheduled.append((function, arg))
+
+    def run_scheduled(self):
+        """Exécute les callbacks en file (entre deux instructions du programme, ou pendant une attente)"""
+        if self.in_irq or self._running_scheduled:
+            return
+        self._running_scheduled = True
+        try:
+            while self._scheduled:
+                function, arg = self._scheduled.pop(0)
+                function(arg)
+        finally:
+            self._running_scheduled = False
+
+    def wait_us(self, us):
+        """Attente d'un thread de la carte ; les interruptions et leurs callbacks continuent"""
+        self.waiting += 1
+        try:
+            self.scheduler.sleep_us(us)
+        finally:
+            self.waiting -= 1
+        self.run_scheduled()
+
+    def pwm(self, pin):
+        pwm = self._pwms.get(pin)
+        if pwm is None:
+            pwm = SimPWM(self.scheduler, pin)
+            self._pwms[pin] = pwm
+        return pwm
+
+    def i2c(self, bus_id):
+        bus = self._i2c.get(bus_id)
+        if bus is None:
+            bus = SimI2C(self.scheduler)
+            self._i2c[bus_id] = bus
+        return bus
+
+    def open_uart(self, uart_id):
+        """Port ouvert par le script (machine.UART) : le premier reçoit le câble vers l'autre carte,
+        quel que soit son numéro (UART 0 de Test_1, Test_3, Test_5)"""
+        cable = self.cable
+        if cable is not None and not self._cable_placed:
+            self._cable_placed = True
+            for key, port in list(self._uarts.items()):
+                if port is cable and key != uart_id:
+                    del self._uarts[key]
+                    self._uarts[uart_id] = cable
+                    cable.name = f"{self.name}.uart{uart_id}"
+        return self.uart(uart_id)
+
+    def uart(self, uart_id):
+        port = self._uarts.get(uart_id)
+        if port is None:
+            port = VirtualUART(self.scheduler, f"{self.name}.uart{uart_id}")
+            self._uarts[uart_id] = port
+        return port
+
+    def attach_ads1015(self, bus_id=1, address=0x48, inputs=None, clock_error=0.0):
+        """Ajoute un ADS1015 sur le bus ; inputs associe un code MUX à une fonction tension(t)
+        (entrées différentielles : écart entre les deux entrées simples si elles ne sont pas dans inputs)"""
+        inputs = inputs if inputs is not None else {}
+        pairs = {MUX_AIN0_AIN1: (MUX_AIN0, MUX_AIN1), MUX_AIN0_AIN3: (MUX_AIN0, MUX_AIN3),
+                 MUX_AIN1_AIN3: (MUX_AIN1, MUX_AIN3), MUX_AIN2_AIN3: (MUX_AIN2, MUX_AIN3)}
+
+        def single(t, mux):
+            channel = inputs.get(mux)
+            return channel(t) if channel is not None else 0.0
+
+        def source(t, mux):
+            if mux in inputs:
+                return single(t, mux)
+            pair = pairs.get(mux)
+            if pair is not None: # Entrée différentielle : écart entre les deux entrées simples
+                return single(t, pair[0]) - single(t, pair[1])
+            return single(t, mux)
+
+        device = FakeADS1015(source, clock_error=clock_error, clock=self.scheduler.seconds)
+        self.i2c(bus_id).devices[address] = device
+        return device
+
+    def print(self, *args, sep=" ", end="\n", file=None, flush=False):
+        text = sep.join(str(arg) for arg in args)
+        t = self.scheduler.seconds()
+        self.output.append((t, text))
+        if self.echo:
+            sys.__stdout__.write(f"[{t:9.3f}s {self.name}] {text}{end}")
+
+    def report_error(self, error):
+        self.error = error
+        if self.echo:
+            sys.__stdout__.write(f"[{self.scheduler.seconds():9.3f}s {self.name}] Erreur: {error!r}\n")
+            traceback.print_exception(error, file=sys.__stdout__)
+
+    def run_script(self, path):
+        """Lance un script Pico (exécuté comme __main__) sur cette carte"""
+        return self.scheduler.spawn(self.name, lambda: runpy.run_path(path, run_name="__main__"), board=self)
+
+    def spawn(self, name, target):
+        """Lance une fonction sur cette carte (ex: thread du second coeur)"""
+        return self.scheduler.spawn(f"{self.name}.{name}", target, board=self)
@@ -0,0 +1,123 @@
+# Horloge virtuelle et ordonnanceur des cartes simulées.
+# Chaque carte (et chaque thread lancé par une carte) tourne dans un thread Python,
+# mais un seul à la fois possède le "jeton" d'exécution. Quand le thread actif
+# attend (time.sleep, sleep_ms, ...), le temps virtuel saute directement à la
+# prochaine échéance et le jeton passe au thread concerné. La simulation est donc
+# déterministe. Chaque thread attend son tour sur son propre verrou : un passage de
+# jeton ne réveille que le thread qui le reçoit.
+
+import heapq
+import threading
+
+CLOCK_READ_US = 2 # Coût d'une lecture d'horloge (boucles d'attente active)
+
+
+class Scheduler:
+    """Temps virtuel en microsecondes partagé par toutes les cartes simulées"""
+
+    def __init__(self):
+        self.now_us = 0
+        self._mutex = threading.Lock() # File et identifiants
+        self._turns = {0: threading.Lock()} # Verrou de chaque thread, pris tant qu'il attend son tour
+        self._turns[0].acquire()
+        self._queue = [] # (réveil, ordre, identifiant)
+        self._order = 0
+        self._next_id = 1
+        self._local = threading.local()
+        self._local.id = 0 # Le thread qui crée l'ordonnanceur (contrôleur) possède le jeton
+        self._local.board = None
+        self.switches = 0
+        self.errors = [] # (nom du thread, exception)
+
+    def seconds(self):
+        return self.now_us / 1000000
+
+    def scheduled(self):
+        """Vrai si le thread courant est géré par cet ordonnanceur"""
+        return getattr(self._local, 'id', None) is not None
+
+    def board(self):
+        """Carte du thread courant (None pour le contrôleur ou un thread externe)"""
+        return getattr(self._local, 'board', None)
+
+    def _push(self, wake_us, ident):
+        self._order += 1
+        heapq.heappush(self._queue, (wake_us, self._order, ident))
+
+    def _dispatch(self):
+        # Jeton au thread dont l'échéance est la plus proche (mutex tenu)
+        if not self._queue:
+            return
+        wake_us, _, ident = heapq.heappop(self._queue)
+        if wake_us > self.now_us:
+            self.now_us = wake_us
+        self.switches += 1
+        self._turns[ident].release()
+
+    def _wait_turn(self, ident):
+        self._turns[ident].acquire()
+
+    def sleep_us(self, us):
+        """Attente en temps virtuel (cède le jeton si un autre thread se réveille avant la fin)"""
+        ident = self._local.id
+        wake_us = self.now_us + max(0, int(us))
+        queue = self._queue
+        if not queue or queue[0][0] > wake_us:
+            # Aucun autre thread avant l'échéance : le temps avance sans changement de thread
+            self.now_us = wake_us
+            return
+        with self._mutex:
+            self._push(wake_us, ident)
+            self._dispatch()
+        self._wait_turn(ident)
+
+    def advance(self, us):
+        """Temps consommé par le thread actif ; cède le jeton si un autre thread doit se réveiller avant"""
+        if self._queue and self._queue[0][0] < self.now_us + us:
+            self.sleep_us(us) # Les cartes calculent en parallèle : l'autre thread reprend à son échéance
+        else:
+            self.now_us += us
+
+    def read_clock(self):
+        """Lecture d'horloge par le code simulé (coût CLOCK_READ_US)"""
+        if self.scheduled():
+            self.advance(CLOCK_READ_US)
+        return self.now_us
+
+    def checkpoint(self):
+        """Entre deux instructions du code simulé : callbacks micropython.schedule en attente sur la carte"""
+        board = self.board()
+        if board is not None:
+            board.run_scheduled()
+
+    def spawn(self, name, target, board=None):
+        """Crée un thread simulé qui démarrera au temps virtuel courant"""
+        with self._mutex:
+            ident = self._next_id
+            self._next_id += 1
+            turn = self._turns[ident] = threading.Lock()
+            turn.acquire()
+            self._push(self.now_us, ident)
+
+        def runner():
+            self._local.id = ident
+            self._local.board = board
+            self._wait_turn(ident)
+            try:
+                target()
+            except BaseException as e: # Erreur dans le code simulé : on la garde pour le rapport
+                self.errors.append((name, e))
+                if board is not None:
+                    board.report_error(e)
+            finally:
+                with self._mutex:
+                    del self._turns[ident]
+                    self._dispatch()
+
+        thread = threading.Thread(target=runner, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def run(self, duration_s):
+        """Fait avancer la simulation de duration_s secondes virtuelles (appelé par le contrôleur)"""
+        self.sleep_us(duration_s * 1000000)
@@ -0,0 +1,182 @@
+# Module "machine" de substitution : installé dans sys.modules par sim.install(),
+# il permet aux scripts des Pico (from machine import Pin, PWM, I2C, UART) de
+# s'exécuter sur PC. Chaque objet est rattaché à la carte simulée du thread
+# qui le crée.
+
+_scheduler = None
+
+
+def _board():
+    board = _scheduler.board() if _scheduler is not None else None
+    if board is None:
+        raise RuntimeError("Objet machine cree hors d'une carte simulee")
+    return board
+
+
+def freq(hz=None):
+    return 125000000
+
+
+IDLE_MAX_US = 1000 # Réveil par une autre interruption (UART, broche) non modélisé : veille bornée
+
+
+def idle():
+    # WFI : veille jusqu'à la prochaine interruption d'un timer de la carte
+    board = _board()
+    due = min((timer.due for timer in board.timers), default=None)
+    delay = IDLE_MAX_US if due is None else min(IDLE_MAX_US, due - _scheduler.now_us)
+    board.wait_us(max(1, delay))
+
+
+def disable_irq():
+    # Un seul thread simulé s'exécute à la fois et les interruptions ne coupent que les attentes
+    return 0
+
+
+def enable_irq(state):
+    pass
+
+
+def unique_id():
+    return _board().name.encode()
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self._state = _board().pin_state(id)
+        if value is not None:
+            self.value(value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if value is not None:
+            self.value(value)
+
+    def value(self, v=None):
+        if v is None:
+            board = self._state['board']
+            if self.id in board.wires: # Entrée reliée à une sortie PWM
+                return board.wire_level(self.id)
+            return self._state['value']
+        self._state['board'].set_pin(self.id, 1 if v else 0)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def toggle(self):
+        self.value(not self.value())
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._state['handler'] = handler
+        self._state['trigger'] = trigger
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+
+class ADC:
+    """Entrée analogique de l'ADC interne (GP26 à GP29), lecture directe en 16 bits"""
+
+    def __init__(self, pin):
+        self.pin = pin.id if isinstance(pin, Pin) else pin
+        self._board = _board()
+
+    def read_u16(self):
+        _scheduler.advance(2) # Une conversion : 2 us
+        return self._board.adc_block.code(self.pin, _scheduler.seconds()) << 4
+
+
+class _Mem32:
+    # Accès aux registres du RP2040 : seul l'ADC (0x4004C000) est modélisé
+    ADC_BASE = 0x4004C000
+
+    def __getitem__(self, address):
+        board = _board()
+        if self.ADC_BASE <= address < self.ADC_BASE + 0x24:
+            return board.adc_block.read(address - self.ADC_BASE)
+        return board.memory.get(address, 0)
+
+    def __setitem__(self, address, value):
+        board = _board()
+        if self.ADC_BASE <= address < self.ADC_BASE + 0x24:
+            board.adc_block.write(address - self.ADC_BASE, value & 0xFFFFFFFF)
+        else:
+            board.memory[address] = value & 0xFFFFFFFF
+
+
+mem32 = _Mem32()
+
+
+class Timer:
+    """Timer matériel : le gestionnaire est appelé en interruption, aux échéances exactes du temps virtuel"""
+
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, mode=PERIODIC, period=-1, freq=-1, callback=None, hard=True):
+        self._board = _board()
+        self._generation = 0
+        self.due = None # Prochaine échéance (temps virtuel, µs)
+        if callback is not None:
+            self.init(mode=mode, period=period, freq=freq, callback=callback, hard=hard)
+
+    def init(self, mode=PERIODIC, period=-1, freq=-1, callback=None, hard=True):
+        self.deinit()
+        period_us = 1000000 // freq if freq > 0 else int(period * 1000)
+        generation = self._generation
+        board = self._board
+
+        def run():
+            self.due = _scheduler.now_us
+            while True:
+                self.due += period_us # Échéances absolues : le timer ne dérive pas
+                if self.due > _scheduler.now_us:
+                    _scheduler.sleep_us(self.due - _scheduler.now_us)
+                if self._generation != generation:
+                    return
+                board.irq(callback, self)
+                if mode == Timer.ONE_SHOT:
+                    board.timers.discard(self)
+                    return
+
+        board.timers.add(self)
+        board.spawn("timer", run)
+
+    def deinit(self):
+        self._generation += 1
+        self._board.timers.discard(self)
+
+
+def PWM(pin, freq=None, duty_u16=None):
+    """Sortie PWM de la carte sur la broche donnée"""
+    pwm = _board().pwm(pin.id)
+    if freq is not None:
+        pwm.freq(freq)
+    if duty_u16 is not None:
+        pwm.duty_u16(duty_u16)
+    return pwm
+
+
+def I2C(id, scl=None, sda=None, freq=400000, timeout=50000):
+    """Bus I2C de la carte (périphériques déclarés dans la configuration de la simulation)"""
+    bus = _board().i2c(id)
+    bus.freq = freq
+    return bus
+
+
+def UART(id, baudrate=115200, **kwargs):
+    """Port UART de la carte (liaisons déclarées dans la configuration de la simulation)"""
+    port = _board().open_uart(id)
+    port.init(baudrate, **kwargs)
+    return port
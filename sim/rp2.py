@@ -0,0 +1,164 @@
+# Module "rp2" de substitution : installé dans sys.modules par sim.install().
+# Les machines d'état PIO exécutent leur programme dans le modèle de fake_pio.py, en
+# temps virtuel, sur la sortie PWM reliée à leur broche d'entrée (Board.wire) : le
+# modèle rattrape l'heure de la carte à chaque lecture du FIFO. Les canaux DMA ne
+# savent que vider le FIFO de l'ADC interne simulé (sim/board.py) dans un tableau.
+
+from fake_pio import FakeStateMachine
+from sim import machine
+
+_scheduler = None
+
+
+class PIO:
+    SHIFT_LEFT = 0
+    SHIFT_RIGHT = 1
+    JOIN_NONE = 0
+    JOIN_TX = 1
+    JOIN_RX = 2
+
+
+def asm_pio(**kwargs):
+    """Le programme est assemblé par le modèle, avec ses options"""
+    def decorator(program):
+        return program, kwargs
+    return decorator
+
+
+class PwmSignal:
+    """Niveau d'une sortie PWM simulée, en cycles d'une horloge à freq Hz depuis le temps virtuel 0.
+
+    Comme sur le RP2040, un nouveau rapport cyclique prend effet au début de la
+    période PWM suivante.
+    """
+
+    def __init__(self, pwm, freq):
+        self.pwm = pwm
+        self.freq = freq
+        self._segments = [(0, self._period(), self._high(pwm.duty()))] # (premier cycle, période, cycles hauts)
+        pwm.listeners.append(self._on_change)
+
+    def _period(self):
+        return self.freq // self.pwm.freq()
+
+    def _high(self, duty):
+        return (int(duty * 65535) * self._period() + 32767) // 65535
+
+    def _on_change(self, t, duty):
+        start, period, _ = self._segments[-1]
+        cycle = int(t * self.freq)
+        boundary = cycle + (start - cycle) % period # Prochaine fin de période
+        self._segments.append((boundary, self._period(), self._high(duty)))
+
+    def _segment(self, cycle):
+        segments = self._segments
+        while len(segments) > 1 and segments[1][0] <= cycle:
+            segments.pop(0) # Le modèle ne revient jamais en arrière
+        return segments[0]
+
+    def level(self, cycle):
+        start, period, high = self._segment(cycle)
+        return 1 if (cycle - start) % period < high else 0
+
+    def next_change(self, cycle):
+        start, period, high = self._segment(cycle)
+        phase = (cycle - start) % period
+        change = cycle - phase + (high if phase < high else period)
+        if len(self._segments) > 1:
+            change = min(change, self._segments[1][0])
+        return change
+
+
+class DMA:
+    """Canal DMA (interface de rp2.DMA) : seul le transfert depuis le FIFO de l'ADC est modélisé"""
+
+    ADC_FIFO = 0x4004C00C
+
+    def __init__(self):
+        self._board = machine._board()
+        self._write = None
+        self._count = 0
+        self._index = 0
+
+    def pack_ctrl(self, **kwargs):
+        return kwargs
+
+    def config(self, read=None, write=None, count=None, ctrl=None, trigger=False):
+        if read != self.ADC_FIFO:
+            raise ValueError(f"Transfert DMA non modelise: {read!r}")
+        self._write = write
+        self._count = count
+        self._index = 0
+        block = self._board.adc_block
+        block.dma = self if trigger else None
+
+    def service(self, block):
+        """Recopie les conversions disponibles (appelé par l'ADC simulé)"""
+        write = self._write
+        while self._index < self._count and block.available() > 0:
+            write[self._index] = block.pop()
+            self._index += 1
+        if self._index >= self._count:
+            block.dma = None
+
+    def active(self, value=None):
+        _scheduler.advance(1)
+        self._board.adc_block.read(0x08) # Rattrape les conversions écoulées
+        return self._index < self._count
+
+    @property
+    def count(self):
+        return self._count - self._index
+
+    def close(self):
+        if self._board.adc_block.dma is self:
+            self._board.adc_block.dma = None
+
+
+class _Constant:
+    # Broche sans signal relié : niveau bas permanent
+    def level(self, cycle):
+        return 0
+
+    def next_change(self, cycle):
+        return cycle + 1000000
+
+
+class StateMachine:
+    """Machine d'état PIO (interface de rp2.StateMachine) exécutée par fake_pio.FakeStateMachine"""
+
+    def __init__(self, id, program, freq=125000000, in_base=None, jmp_pin=None, **kwargs):
+        program, options = program
+        pin = jmp_pin if jmp_pin is not None else in_base
+        pwm = machine._board().wires.get(pin.id) if pin is not None else None
+        self.id = id
+        self.freq = freq
+        signal = PwmSignal(pwm, freq) if pwm is not None else _Constant()
+        depth = 8 if options.get('fifo_join') == PIO.JOIN_RX else 4
+        shift_left = options.get('in_shiftdir', PIO.SHIFT_LEFT) == PIO.SHIFT_LEFT
+        self.model = FakeStateMachine(program, signal, depth, shift_left, start_cycle=self._now())
+        self.model.active(False)
+
+    def _now(self):
+        return _scheduler.now_us * self.freq // 1000000
+
+    def _sync(self):
+        _scheduler.advance(1)
+        self.model.run_until(self._now())
+
+    def active(self, value=None):
+        if value is None:
+            return self.model.active()
+        self._sync()
+        self.model.active(value)
+
+    def rx_fifo(self):
+        self._sync()
+        return self.model.rx_fifo()
+
+    def get(self):
+        self._sync()
+        while not self.model.rx_fifo(): # Bloquant, comme sur la carte
+            _scheduler.sleep_us(10)
+            self._sync()
+        return self.model.get()
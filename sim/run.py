@@ -0,0 +1,43 @@
+# Exécute "Code Pico 1.py" et "Code Pico 2.py" l'un contre l'autre sur PC.
+# Usage (depuis la racine du dépôt) : python3 -m sim.run [--duration 30] [--tau 0.02] ...
+
+import argparse
+import sys
+
+from sim import Simulation
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulation des deux Pico (temps virtuel)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Durée simulée en secondes")
+    parser.add_argument("--tau", type=float, default=0.02, help="Constante de temps du filtre RC (s)")
+    parser.add_argument("--noise", type=float, default=0.002, help="Bruit sur l'entrée ADC (V, écart type)")
+    parser.add_argument("--baud", type=int, default=115200, help="Vitesse de la liaison UART")
+    parser.add_argument("--ber", type=float, default=0.0, help="Taux d'erreur binaire de la liaison")
+    parser.add_argument("--max-baud", type=int, default=None, help="Vitesse maximale fiable du câblage (erreurs au-delà)")
+    parser.add_argument("--i2c-max-freq", type=int, default=None, help="Fréquence I2C maximale fiable (erreurs au-delà)")
+    parser.add_argument("--quiet", action="store_true", help="Ne pas afficher la sortie des scripts")
+    parser.add_argument("--pico1", default="Code Pico 1.py")
+    parser.add_argument("--pico2", default="Code Pico 2.py")
+    args = parser.parse_args(argv)
+
+    sim = Simulation(tau=args.tau, noise=args.noise, baudrate=args.baud,
+                     bit_error_rate=args.ber, max_baudrate=args.max_baud, echo=not args.quiet,
+                     i2c_max_freq=args.i2c_max_freq)
+    real_s = sim.run_scripts(args.pico1, args.pico2, args.duration)
+
+    print("\n=== Simulation ===")
+    print(f"Temps simulé: {args.duration:.1f} s | temps réel: {real_s:.2f} s | accélération: x{args.duration / max(real_s, 1e-9):.1f}")
+    for board in (sim.pico1, sim.pico2):
+        uart = board.cable
+        i2c = board.i2c(1)
+        print(f"{board.name}: {len(board.output)} lignes | UART {uart.baudrate} bauds, {uart.bytes_sent} o émis, {uart.bytes_received} o reçus, "
+              f"{uart.overruns} débordements, {uart.corrupted} corrompus | I2C {i2c.transactions} transactions, "
+              f"{i2c.freq} Hz, occupation {100 * i2c.busy_us / (args.duration * 1e6):.1f} %, {i2c.errors} erreurs")
+    for name, error in sim.scheduler.errors:
+        print(f"Erreur dans {name}: {error!r}")
+    return 1 if sim.scheduler.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# UART simulé avec le temps de transmission réel de chaque octet (10 bits par
+# octet : start + 8 données + stop). Deux ports reliés forment la liaison série
+# entre les deux Pico. Si les vitesses des deux côtés diffèrent, les octets reçus
+# sont illisibles, comme sur le matériel. Au-delà de max_baudrate, le câblage
+# (longueur, capacité) déforme les fronts et les bits sont souvent inversés.
+
+import random
+from collections import deque
+
+
+class VirtualUART:
+    """Port UART d'une carte simulée (interface de machine.UART)"""
+
+    FAST_BIT_ERROR_RATE = 0.01 # Au-delà de max_baudrate
+
+    def __init__(self, scheduler, name="uart", rxbuf=256, txbuf=256, bit_error_rate=0.0, max_baudrate=None, seed=0):
+        self.scheduler = scheduler
+        self.name = name
+        self.baudrate = 115200
+        self.rxbuf = rxbuf
+        self.txbuf = txbuf
+        self.bit_error_rate = bit_error_rate # Probabilité d'inversion de chaque bit transmis
+        self.max_baudrate = max_baudrate # Vitesse maximale fiable du câblage (None : illimitée)
+        self.peer = None
+        self._incoming = deque() # (instant d'arrivée en µs, octet, vitesse de l'émetteur)
+        self._rx = bytearray()
+        self._tx_free_us = 0 # Fin d'émission du dernier octet en file
+        self._random = random.Random(seed)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.overruns = 0
+        self.corrupted = 0
+
+    def link(self, other):
+        """Relie TX/RX de deux ports"""
+        self.peer = other
+        other.peer = self
+
+    def init(self, baudrate=115200, bits=8, parity=None, stop=1, tx=None, rx=None, rxbuf=None, txbuf=None, **kwargs):
+        self.baudrate = baudrate
+        if rxbuf is not None:
+            self.rxbuf = rxbuf
+        if txbuf is not None:
+            self.txbuf = txbuf
+
+    def byte_us(self):
+        """Durée d'un octet sur la ligne en µs"""
+        return 10000000 / self.baudrate
+
+    def _corrupt(self, byte):
+        rate = self.bit_error_rate
+        if self.max_baudrate is not None and self.baudrate > self.max_baudrate:
+            rate = max(rate, self.FAST_BIT_ERROR_RATE)
+        if rate:
+            for bit in range(8):
+                if self._random.random() < rate:
+                    byte ^= 1 << bit
+        return byte
+
+    def write(self, buf):
+        data = buf.encode() if isinstance(buf, str) else bytes(buf)
+        sched = self.scheduler
+        sched.advance(1)
+        byte_us = self.byte_us()
+        t = max(float(sched.now_us), self._tx_free_us)
+        peer = self.peer
+        for byte in data:
+            t += byte_us
+            if peer is not None:
+                peer._incoming.append((t, self._corrupt(byte), self.baudrate))
+        self._tx_free_us = t
+        self.bytes_sent += len(data)
+        # FIFO d'émission plein : write() bloque jusqu'à ce qu'il y ait de la place
+        backlog_us = t - sched.now_us - self.txbuf * byte_us
+        if backlog_us > 0:
+            sched.sleep_us(backlog_us)
+        return len(data)
+
+    def _settle(self):
+        # Transfère dans le FIFO de réception les octets arrivés à l'instant courant
+        now = self.scheduler.now_us
+        incoming = self._incoming
+        while incoming and incoming[0][0] <= now:
+            _, byte, baudrate = incoming.popleft()
+            if baudrate != self.baudrate:
+                byte = self._random.getrandbits(8) # Vitesses différentes : octet illisible
+                self.corrupted += 1
+            if len(self._rx) >= self.rxbuf:
+                self.overruns += 1
+                continue
+            self._rx.append(byte)
+            self.bytes_received += 1
+
+    def any(self):
+        self.scheduler.advance(1)
+        self._settle()
+        return len(self._rx)
+
+    def read(self, nbytes=None):
+        self._settle()
+        if not self._rx:
+            return None
+        if nbytes is None:
+            nbytes = len(self._rx)
+        data = bytes(self._rx[:nbytes])
+        del self._rx[:nbytes]
+        return data
+
+    def readinto(self, buf, nbytes=None):
+        self._settle()
+        if not self._rx:
+            return None
+        if nbytes is None:
+            nbytes = len(buf)
+        nbytes = min(nbytes, len(self._rx), len(buf))
+        buf[:nbytes] = self._rx[:nbytes]
+        del self._rx[:nbytes]
+        return nbytes
+
+    def readline(self):
+        self._settle()
+        if not self._rx:
+            return None
+        end = self._rx.find(b"\n")
+        end = len(self._rx) if end < 0 else end + 1
+        data = bytes(self._rx[:end])
+        del self._rx[:end]
+        return data
+
+    def flush(self):
+        """Attend la fin de l'émission"""
+        remaining = self._tx_free_us - self.scheduler.now_us
+        if remaining > 0:
+            self.scheduler.sleep_us(remaining)
+
+    def txdone(self):
+        return self._tx_free_us <= self.scheduler.now_us
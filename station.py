@@ -0,0 +1,599 @@
+# Bibliothèque commune des programmes des Pico : matériel, lectures ADC, PWM, messages
+# UART et boucle de chaque rôle, en une seule implémentation.
+# "Code Pico 1.py", "Code Pico 2.py" et Test_1 à Test_8 en recopiaient chacun une
+# variante (attente de conversion de 10, 20 ou 50 ms, I2C à 100 ou 400 kHz, PWM à
+# 500 Hz ou 1 kHz) : chaque script se réduit maintenant à une Config et à run().
+#
+# Rôles :
+#   - "generator" (Pico 1) : séquence de rapports cycliques, consigne TH à chaque pas,
+#     mesure ME de Pico 2 en retour ;
+#   - "validator" (Pico 2) : mesure chaque consigne reçue et répond ME, avec sa propre
+#     séquence PWM (mode bidirectionnel) ;
+#   - "bidirectional" (Test_1 à Test_6) : symétrique, chaque carte balaie son rapport
+#     cyclique et envoie à l'autre sa consigne ou sa mesure, dans le format de ligne
+#     d'origine de chaque test (bidir_format) ou en trames binaires ME numérotées.
+#
+# L'import ne fait que des définitions (le matériel est créé par Station) : le module se
+# compile en .mpy (build.py) comme les autres modules, et le script de la carte,
+# seul fichier analysé au démarrage, ne contient plus que sa configuration.
+
+import time
+
+from ads1015 import ADS1015, MUX_AIN2, PGA_4_096, raw_to_mv
+from protocol import (Encoder, FrameReader, TYPE_HELLO, TYPE_TH, TYPE_ME, HELLO_FRAME, HELLO_ACK_FRAME,
+                      unpack_th, unpack_me, frame_seq, to_centi, from_centi, negotiate)
+from correlation import InFlight, SeqTracker
+from transport import ReliableLink
+from baud import BaudManager
+from batch import BatchReader, BatchWriter
+from dual_core import CoreSampler
+from pico_async import asyncio, GeneratorRuntime, ValidatorRuntime, SweepRuntime, duty_range
+from settle import SettlingDetector
+from adc_filter import FilteredADC, make_filter, FRAC_BITS
+from fixed import duty_u16
+from calibration import CALIBRATION_FILE, load as load_calibration
+from ticker import Ticker
+from i2c_speed import I2CSpeed
+from compat import ticks_ms, ticks_diff, sleep_ms
+
+
+class Config:
+    """Configuration d'une carte : câblage, fréquences et options de comportement.
+
+    Les valeurs par défaut sont celles du banc ("Code Pico 1.py" et "Code Pico 2.py") ;
+    Config(role, **options) refuse une option inconnue plutôt que de l'ignorer.
+    """
+
+    name = None # Nom affiché (rôle bidirectionnel)
+    pwm_pin = 16
+    pwm_freq = 1000
+    uart_id = 1 # UART 1 (GP8/GP9) pour la carte d'extension
+    uart_tx = 8
+    uart_rx = 9
+    baudrate = 115200
+    i2c_id = 1
+    i2c_scl = 15
+    i2c_sda = 14
+    i2c_freq = 100000 # Fréquence fixe, ou de repli si aucune fréquence essayée n'est fiable
+    i2c_probe = True # Fréquence I2C la plus rapide validée au démarrage par relecture de l'ADS1015 (i2c_speed.py)
+    ads_addr = 0x48
+    ads_rate = 3300 # Conversion continue, échantillons/s
+    adc_filter = "avg:8" # Filtre des lectures (adc_filter.py) : "none", "decim:16", "avg:8", "median:5", "iir:3"
+    dual_core = False # Échantillonnage de l'ADC sur le second coeur (dual_core.py)
+    async_mode = True # Tâches coopératives (pico_async.py), protocole binaire uniquement
+    adaptive_step = True # Pas suivant dès que la mesure est stabilisée et confirmée par Pico 2 (sinon toutes les step_ms)
+    step_ms = 3000 # Durée (maximale) d'un pas de la séquence de Pico 1
+    sequence = (0, 10, 25, 50, 75, 90, 100)
+    bidir_sequence = (100, 80, 60, 40, 20, 0) # Séquence PWM propre de Pico 2
+    bidir_step_ms = 4000
+    poll_ms = 300 # Période de scrutation de l'UART (boucle de Pico 2)
+    calibrate = False # Calibration enregistrée dans CALIBRATION_FILE (balayage de Pico 1, mesures de Pico 2)
+    fast_sweep = False # Balayage rapide de sweep_duties au démarrage de Pico 1 (mode binaire)
+    sweep_duties = None # 0 à 100 % par pas de 0,5 % si None
+    baud_negotiation = True # Vitesses UART plus élevées après la négociation du protocole binaire (baud.py)
+    reliable_window = 0 # Transport fiable (transport.py) en mode async_mode, même valeur sur les deux cartes (0 sans)
+    batch_samples = 0 # Mesures de Pico 2 par lots (batch.py) en mode async_mode, même réglage non nul sur Pico 1
+    batch_ms = 50 # Âge maximal du plus ancien échantillon d'un lot avant son envoi
+    duty_source = "adc" # Mesure de Pico 2 : "adc" (filtre RC + ADS1015) ou "pio" (PWM de Pico 1 sur pio_pin, pio_duty.py)
+    pio_pin = 18
+    timer_ticks = True # Échantillonnage et pas fixes cadencés par machine.Timer (ticker.py)
+    sweep_start = 0 # Rôle bidirectionnel : rapport cyclique de départ, sens (+1/-1) et période du balayage
+    sweep_direction = 1
+    sweep_ms = 300
+    display_ms = 2000 # Rôle bidirectionnel : période de l'affichage de l'émission
+    bidir_format = "binary" # Rôle bidirectionnel : "duty" (ligne "50.0", Test_1/2), "D" ("D50", Test_3/4),
+                            # "S" ("S001D050V1.65R50.0E", Test_5/6) ou "binary" (trames ME numérotées)
+
+    def __init__(self, role, **options):
+        if role not in ROLES:
+            raise ValueError(f"Role inconnu: {role}")
+        self.role = role
+        for name, value in options.items():
+            if not hasattr(Config, name):
+                raise ValueError(f"Option inconnue: {name}")
+            setattr(self, name, value)
+
+
+class Station:
+    """Matériel d'une carte (PWM, UART, ADS1015 sur AIN2) et fonctions communes à tous les rôles.
+
+    Chaque rôle est une sous-classe qui fournit main(), sa boucle principale.
+    """
+
+    def __init__(self, config):
+        from machine import Pin, PWM, I2C, UART
+        self.config = config
+        self.pwm = PWM(Pin(config.pwm_pin))
+        self.pwm.freq(config.pwm_freq)
+        self.uart = UART(config.uart_id, baudrate=config.baudrate, tx=Pin(config.uart_tx), rx=Pin(config.uart_rx))
+        self.encoder = Encoder() # Trames binaires préallouées
+        self.reader = FrameReader(self.uart)
+        self.binary_mode = False # Protocole binaire négocié entre les deux cartes
+        self.baud = BaudManager(self.uart) if config.baud_negotiation else None # Vitesse négociée, repli sur 115200 bauds
+
+        def make_i2c(freq):
+            return I2C(config.i2c_id, scl=Pin(config.i2c_scl), sda=Pin(config.i2c_sda), freq=freq)
+
+        self.i2c_speed = None
+        if config.i2c_probe:
+            self.i2c_speed = I2CSpeed(make_i2c, config.ads_addr, base=config.i2c_freq)
+            self.i2c_speed.probe()
+            self.i2c = self.i2c_speed.bus
+        else:
+            self.i2c = make_i2c(config.i2c_freq)
+        self.adc = ADS1015(self.i2c, config.ads_addr, mux=MUX_AIN2, pga=PGA_4_096, rate=config.ads_rate) # AIN2, ±4.096V, continu
+        self.read_next = self.adc.read_raw # Prochaine conversion
+        if config.dual_core:
+            self.adc = CoreSampler(self.adc) # Les lectures rendent le dernier échantillon du coeur 1
+            self.read_next = self.adc.read_next
+        self.settler = SettlingDetector() # Détection de la stabilisation du filtre RC (settle.py)
+        self.filtered_adc = FilteredADC(self.adc, make_filter(config.adc_filter))
+        self.calibration = load_calibration(CALIBRATION_FILE, self.adc.pga) # Code ADC -> rapport cyclique
+        self.duty_meter = None
+        if config.duty_source == "pio":
+            from pio_duty import PioDutyMeter
+            self.duty_meter = PioDutyMeter(Pin(config.pio_pin, Pin.IN), pwm_freq=config.pwm_freq) # Une mesure par période
+
+    def read_voltage(self):
+        """Tension filtrée sur AIN2 (V), 0 en cas d'erreur I2C"""
+        try:
+            return self.filtered_adc.read_voltage() # Conversions neuves filtrées selon adc_filter
+        except Exception as e:
+            print(f"Erreur ADC: {e}")
+            return 0
+
+    def read_q4(self):
+        """Code ADC filtré en 1/16, sans attendre la stabilisation"""
+        try:
+            return self.filtered_adc.read_q4()
+        except Exception as e:
+            print(f"Erreur ADC: {e}")
+            return 0
+
+    def read_settled_q4(self):
+        """Code ADC en 1/16 une fois le filtre RC stabilisé (durée dans settler.settle_us)"""
+        try:
+            self.settler.wait(self.read_next)
+            return self.settler.value_q4
+        except Exception as e:
+            print(f"Erreur ADC: {e}")
+            return 0
+
+    def voltage_mv(self, raw_q4):
+        return raw_to_mv(raw_q4, self.adc.pga, FRAC_BITS)
+
+    def calculate_real_duty(self, raw_q4):
+        """Rapport cyclique réel (centièmes de pourcent) à partir du code ADC en 1/16 (table de calibration)"""
+        return self.calibration.duty_centi_q4(raw_q4)
+
+    def read_pio_duty(self):
+        """Rapport cyclique (centièmes de pourcent) d'une période PWM commencée après l'appel, mesuré par PIO"""
+        return self.duty_meter.read_next_centi()
+
+    def set_duty(self, duty_cycle):
+        """Applique le rapport cyclique (pourcent) ; retourne la consigne en centièmes de pourcent"""
+        centi = to_centi(duty_cycle)
+        self.pwm.duty_u16(duty_u16(centi)) # Conversion en valeur 16 bits, en entiers
+        return centi
+
+    def start(self):
+        if self.i2c_speed is not None:
+            print(f"I2C: {self.i2c_speed.freq} Hz ({self.i2c_speed.report()})")
+        if self.config.dual_core:
+            self.adc.start() # Lancement de l'échantillonnage sur le coeur 1
+
+
+class Generator(Station):
+    """Pico 1 : parcourt la séquence, envoie chaque consigne à Pico 2 et affiche sa mesure"""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.inflight = InFlight(timeout_ms=config.step_ms) # Consignes TH en attente de leur trame ME
+        self.step_seq = None # Séquence de la consigne en cours
+
+    def set_pwm_duty(self, duty_cycle):
+        """Définit le rapport cyclique PWM et envoie la valeur théorique"""
+        centi = self.set_duty(duty_cycle)
+        if self.binary_mode:
+            frame = self.encoder.pack_th_centi(centi) # Trame binaire TH
+            self.step_seq = frame_seq(frame)
+            self.inflight.expire() # Consignes précédentes restées sans réponse : perdues
+            self.inflight.add(self.step_seq, centi)
+            self.uart.write(frame)
+        else:
+            self.uart.write(f"TH:{duty_cycle:.1f}\n")
+        return duty_cycle
+
+    def read_uart_measurement(self):
+        """Mesure envoyée par Pico 2 pour la consigne en cours : (consigne, mesure, erreur) en pourcent"""
+        uart = self.uart
+        if self.binary_mode:
+            reader = self.reader
+            last = None
+            ftype = reader.read()
+            while ftype: # Toutes les trames reçues depuis le dernier appel, on garde la plus récente
+                if ftype == TYPE_ME:
+                    seq = frame_seq(reader.buf)
+                    if self.inflight.match(seq) is not None and seq == self.step_seq: # Réponse à la consigne en cours
+                        last = unpack_me(reader.buf)
+                ftype = reader.read()
+            if last is not None:
+                return from_centi(last[0]), from_centi(last[1]), from_centi(last[2])
+            return None, None, None
+        if uart.any():
+            try:
+                data = uart.readline().decode().strip() #type:ignore
+                if data.startswith("ME:"):
+                    parts = data.split(":")
+                    return float(parts[1]), float(parts[2]), float(parts[3])
+            except Exception as e:
+                print(f"Erreur lecture UART: {e}")
+        return None, None, None
+
+    def renegotiate(self):
+        # Pico 2 a peut-être redémarré en ASCII, et donc à 115200 bauds
+        baud = self.baud
+        if baud is not None:
+            baud.fallback()
+        self.binary_mode = negotiate(self.uart, self.reader)
+        if baud is not None and self.binary_mode:
+            baud.negotiate(self.reader)
+
+    def main(self):
+        config = self.config
+        baud = self.baud
+        print("=== Pico 1 - Générateur PWM Principal ===")
+        self.start()
+        self.binary_mode = negotiate(self.uart, self.reader) # Proposition du protocole binaire à Pico 2
+        print("Protocole:", "binaire" if self.binary_mode else "ASCII")
+        if baud is not None and self.binary_mode:
+            print("Vitesse:", baud.negotiate(self.reader), "bauds")
+        print("Duty | Tension | Réel | Erreur Pico2 | Stabilisation")
+        print("-" * 45)
+
+        sequence = config.sequence
+        link = ReliableLink(window=config.reliable_window) if config.reliable_window else None # Balayage et séquence
+        if (config.fast_sweep or config.calibrate) and self.binary_mode:
+            duties = config.sweep_duties if config.sweep_duties is not None else duty_range(0, 100, 0.5)
+            sweep = SweepRuntime(self.uart, self.filtered_adc, self.pwm, duties, calibration=self.calibration,
+                                 encoder=self.encoder, link=link, calibrate_path=CALIBRATION_FILE if config.calibrate else None)
+            asyncio.run(sweep.run())
+            self.calibration = sweep.calibration
+        if config.async_mode and self.binary_mode:
+            runtime = GeneratorRuntime(self.uart, self.filtered_adc, self.pwm, sequence=sequence, step_ms=config.step_ms,
+                                       report_ms=3000, adaptive=config.adaptive_step, calibration=self.calibration,
+                                       encoder=self.encoder, link=link, baud=baud,
+                                       batches=BatchReader() if config.batch_samples else None, timer_ticks=config.timer_ticks)
+            asyncio.run(runtime.run())
+            return
+        self.loop()
+
+    def loop(self):
+        """Boucle principale sans tâches coopératives (ASCII, ou async_mode désactivé)"""
+        config = self.config
+        sequence = config.sequence
+        adaptive = config.adaptive_step
+        current_index = 0
+        last_change = ticks_ms()
+        step_ms = 0 # Premier pas immédiat
+        missed_replies = 0 # Pas sans réponse de Pico 2
+        step_ticker = Ticker(config.step_ms) if config.timer_ticks and not adaptive else None # Pas fixes, sans dérive
+
+        while True:
+            # Changement du duty cycle à la fin du pas précédent
+            if ticks_diff(ticks_ms(), last_change) >= step_ms:
+                last_change = ticks_ms()
+                step_ms = 0 if adaptive else config.step_ms
+                duty_cycle = sequence[current_index]
+
+                # 1. Génération du signal PWM
+                self.set_pwm_duty(duty_cycle)
+
+                # 2. Mesure locale de la tension filtrée, dès la stabilisation du filtre RC
+                raw_q4 = self.read_settled_q4()
+                voltage_mv = self.voltage_mv(raw_q4)
+                real_local = self.calculate_real_duty(raw_q4)
+                settle_ms = (self.settler.settle_us or 0) / 1000
+
+                # Liaison dégradée (erreurs CRC, vitesses différentes) : retour à 115200 bauds et renégociation
+                if self.baud is not None and self.binary_mode and self.baud.check(self.reader, self.inflight.lost):
+                    print(f"Liaison degradee: vitesse renegociee a {self.baud.renegotiate(self.reader)} bauds")
+
+                # 3. Réception des mesures de Pico 2 (qui attend aussi la stabilisation)
+                received_duty, measured_duty, error_pico2 = self.read_uart_measurement()
+                while adaptive and received_duty is None and ticks_diff(ticks_ms(), last_change) < config.step_ms:
+                    sleep_ms(1)
+                    received_duty, measured_duty, error_pico2 = self.read_uart_measurement()
+
+                # 4. Affichage des résultats (seule conversion en flottant)
+                voltage = voltage_mv / 1000
+                real_duty_local = from_centi(real_local)
+                if received_duty is not None:
+                    print(f"{duty_cycle:3.0f}% | {voltage:6.2f}V | {real_duty_local:4.1f}% | Erreur Pico2: {error_pico2:+.1f}% | {settle_ms:.0f} ms")
+                    missed_replies = 0
+                else:
+                    print(f"{duty_cycle:3.0f}% | {voltage:6.2f}V | {real_duty_local:4.1f}% | En attente Pico2... | {settle_ms:.0f} ms")
+                    missed_replies += 1
+                    if self.binary_mode and missed_replies >= 3:
+                        self.renegotiate()
+                        missed_replies = 0
+
+                # Passage au duty cycle suivant
+                current_index = (current_index + 1) % len(sequence)
+                if step_ticker is not None and current_index == 0:
+                    stats = step_ticker.stats()
+                    print(f"Timer pas ({config.step_ms} ms): gigue max {stats['jitter_max_us']} us | retards {stats['overruns']}")
+
+            if step_ticker is not None:
+                step_ticker.wait() # Pas suivant à l'échéance du timer, quelle que soit la durée du pas
+                step_ms = 0
+            elif not adaptive:
+                time.sleep(0.1)
+
+
+class Validator(Station):
+    """Pico 2 : mesure chaque consigne reçue de Pico 1, lui répond, et génère sa propre séquence PWM"""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.th_seq = None # Séquence de la dernière trame TH reçue
+        self.th_seqs = SeqTracker() # Consignes manquantes, réordonnées ou en double (correlation.py)
+
+    def send_measurement(self, theoretical, measured, error):
+        """Envoie les mesures à Pico 1 (centièmes de pourcent)"""
+        if self.binary_mode:
+            self.uart.write(self.encoder.pack_me_centi(theoretical, measured, error, self.th_seq)) # Trame binaire ME
+            return
+        self.uart.write(f"ME:{from_centi(theoretical):.1f}:{from_centi(measured):.1f}:{from_centi(error):.1f}\n")
+
+    def read_uart_theoretical(self):
+        """Consigne envoyée par Pico 1 (centièmes de pourcent), None sans nouvelle consigne"""
+        uart = self.uart
+        baud = self.baud
+        if self.binary_mode:
+            reader = self.reader
+            if baud is not None:
+                baud.poll() # Vitesse en essai non confirmée : retour à la précédente
+                if baud.check(reader):
+                    print(f"Liaison degradee: retour a {baud.baudrate} bauds")
+            ftype = reader.read()
+            while ftype:
+                if baud is not None and baud.on_frame(ftype, reader.buf): # Négociation de vitesse
+                    baud.follow(reader) # Motifs de test et validation, sans attendre la boucle principale
+                    ftype = reader.read()
+                    continue
+                if ftype == TYPE_TH and self.th_seqs.update(frame_seq(reader.buf)): # Ni doublon ni périmée
+                    self.th_seq = frame_seq(reader.buf) # Repris dans la trame ME de réponse
+                    return unpack_th(reader.buf)
+                if ftype == TYPE_HELLO: # Pico 1 a redémarré : on confirme le protocole
+                    self.th_seqs.reset() # Ses séquences repartent de 0
+                    uart.write(HELLO_ACK_FRAME)
+                ftype = reader.read()
+            return None
+        if uart.any():
+            try:
+                line = uart.readline()
+                if line == HELLO_FRAME: # Pico 1 propose le protocole binaire
+                    self.th_seqs.reset()
+                    uart.write(HELLO_ACK_FRAME)
+                    self.binary_mode = True
+                    print("Protocole: binaire")
+                    return None
+                data = line.decode().strip() #type:ignore
+                if data.startswith("TH:"):
+                    return to_centi(float(data[3:]))
+            except Exception:
+                pass
+        return None
+
+    def main(self):
+        config = self.config
+        print("=== Pico 2 - Mesure et Validation ===")
+        self.start()
+        print("Attente des donnees de Pico 1...")
+        if config.async_mode:
+            calibrate_path = CALIBRATION_FILE if config.calibrate and self.duty_meter is None else None
+            runtime = ValidatorRuntime(self.uart, self.filtered_adc, self.pwm, sequence=config.bidir_sequence,
+                                       step_ms=config.bidir_step_ms, wait_settle=True, calibration=self.calibration,
+                                       calibrate_path=calibrate_path,
+                                       link=ReliableLink(window=config.reliable_window) if config.reliable_window else None,
+                                       baud=self.baud,
+                                       batch=BatchWriter(self.uart.write, config.batch_samples, config.batch_ms) if config.batch_samples else None,
+                                       duty_meter=self.duty_meter, timer_ticks=config.timer_ticks)
+            asyncio.run(runtime.run())
+            return
+        self.loop()
+
+    def loop(self):
+        """Boucle principale sans tâches coopératives (Pico 1 en ASCII, ou async_mode désactivé)"""
+        config = self.config
+        bidir_sequence = config.bidir_sequence
+        bidir_index = 0
+        last_bidir_change = ticks_ms()
+        bidir_ticker = Ticker(config.bidir_step_ms) if config.timer_ticks else None
+        poll_ticker = Ticker(config.poll_ms) if config.timer_ticks else None
+
+        while True:
+            # 1. Réception de la valeur théorique de Pico 1
+            theoretical = self.read_uart_theoretical()
+
+            while theoretical is not None: # Traite toutes les consignes reçues pendant la pause
+                # 2. Mesure de la tension filtrée, dès la stabilisation du filtre RC (entiers : 1/16 de code, mV)
+                raw_q4 = self.read_settled_q4() if self.duty_meter is None else self.read_q4() # "pio" : tension affichée seulement
+                voltage_mv = self.voltage_mv(raw_q4)
+
+                # 3. Calcul du rapport cyclique réel et de l'erreur (centièmes de pourcent)
+                measured = self.calculate_real_duty(raw_q4) if self.duty_meter is None else self.read_pio_duty()
+                error = measured - theoretical
+
+                # 4. Envoi des résultats à Pico 1 puis affichage local (seule conversion en flottant)
+                self.send_measurement(theoretical, measured, error)
+                print(f"Theorique: {from_centi(theoretical):5.1f}% | Mesure: {from_centi(measured):5.1f}% | Erreur: {from_centi(error):+.1f}% | Tension: {voltage_mv / 1000:.2f}V | Stabilisation: {(self.settler.settle_us or 0) / 1000:.0f} ms")
+                theoretical = self.read_uart_theoretical()
+
+            # Mode bidirectionnel : Pico 2 génère aussi un PWM
+            if bidir_ticker is not None:
+                step_due = bidir_ticker.ready() > 0 # Tick du timer depuis le dernier tour
+            else:
+                step_due = ticks_diff(ticks_ms(), last_bidir_change) >= config.bidir_step_ms
+            if step_due:
+                bidir_duty = bidir_sequence[bidir_index]
+                self.set_duty(bidir_duty)
+                bidir_q4 = self.read_q4() # Mesure filtrée (code ADC en 1/16)
+                bidir_real = self.calculate_real_duty(bidir_q4)
+                print(f"Pico2 Emission - Duty: {bidir_duty}% -> Tension: {self.voltage_mv(bidir_q4) / 1000:.2f}V ({from_centi(bidir_real):.1f}%)")
+
+                bidir_index = (bidir_index + 1) % len(bidir_sequence)
+                last_bidir_change = ticks_ms()
+                if poll_ticker is not None and bidir_index == 0:
+                    stats = poll_ticker.stats()
+                    print(f"Timer scrutation ({config.poll_ms} ms): gigue max {stats['jitter_max_us']} us | retards {stats['overruns']}")
+
+            if poll_ticker is not None:
+                poll_ticker.wait() # Période fixe : la durée des mesures ne s'ajoute plus à la pause
+            else:
+                time.sleep(config.poll_ms / 1000)
+
+
+BIDIR_FORMATS = ("duty", "D", "S", "binary")
+TEXT_SEQ_MOD = 1000 # Format "S" : trois chiffres de séquence
+
+
+class Bidirectional(Station):
+    """Deux cartes symétriques : chacune balaie son rapport cyclique de 1 % par période et mesure sa tension
+    une fois le filtre RC stabilisé. Selon config.bidir_format, elle envoie à l'autre sa consigne (formats
+    "duty" et "D", comparée par la carte qui la reçoit à sa propre mesure) ou sa mesure numérotée (format
+    "S" et trames binaires ME).
+
+    Les mesures numérotées en double ou plus anciennes que la dernière reçue sont
+    ignorées (compteurs de self.seqs en binaire).
+    """
+
+    def __init__(self, config):
+        if config.bidir_format not in BIDIR_FORMATS:
+            raise ValueError(f"Format bidirectionnel inconnu: {config.bidir_format}")
+        super().__init__(config)
+        self.seqs = SeqTracker()
+        self.binary_mode = config.bidir_format == "binary" # Les deux cartes exécutent ce rôle : pas de négociation
+        self.text_seq = 0 # Format "S" : séquence de la prochaine mesure envoyée
+        self.text_received = -1 # Format "S" : séquence de la dernière mesure reçue
+        self.last_print = ticks_ms() # Format "D" : dernier affichage (ligne reçue ou émission)
+
+    def send(self, duty_cycle, centi, measured, raw_q4):
+        """Envoie la consigne ou la mesure de cette carte dans le format configuré"""
+        fmt = self.config.bidir_format
+        if fmt == "binary":
+            self.uart.write(self.encoder.pack_me_centi(centi, measured, measured - centi))
+        elif fmt == "S":
+            self.uart.write(f"S{self.text_seq:03d}D{duty_cycle:03d}V{self.voltage_mv(raw_q4) / 1000:.2f}"
+                            f"R{from_centi(measured):.1f}E\n")
+            self.text_seq = (self.text_seq + 1) % TEXT_SEQ_MOD
+        elif fmt == "D":
+            self.uart.write(f"D{int(duty_cycle)}\n")
+        else:
+            self.uart.write(f"{duty_cycle:.1f}\n")
+
+    def receive(self, raw_q4):
+        """Affiche ce que l'autre carte a envoyé (raw_q4 : dernière mesure locale, code en 1/16)"""
+        if self.binary_mode:
+            reader = self.reader
+            ftype = reader.read()
+            while ftype:
+                if ftype == TYPE_ME and self.seqs.update(frame_seq(reader.buf)):
+                    theoretical, measured, error = unpack_me(reader.buf)
+                    print(f"RECU - Seq:{frame_seq(reader.buf):03d} | Théo:{from_centi(theoretical):5.1f}% | "
+                          f"Mes:{from_centi(measured):5.1f}% | Erreur:{from_centi(error):+.1f}%")
+                ftype = reader.read()
+            return
+        uart = self.uart
+        while uart.any():
+            line = uart.readline()
+            try:
+                self.show_line(line.decode().strip(), raw_q4)
+            except (ValueError, IndexError, UnicodeError) as e:
+                print(f"Erreur parsing: {e}")
+
+    def show_line(self, text, raw_q4):
+        """Affiche une ligne reçue ; formats duty et D : consigne comparée à la mesure locale"""
+        name = self.config.name or "Pico"
+        if self.config.bidir_format == "S":
+            if not text.startswith("S"): # Format: S001D050V1.65R50.0E
+                return
+            seq = int(text[1:4])
+            last = self.text_received
+            if last >= 0 and not 0 < (seq - last) % TEXT_SEQ_MOD < TEXT_SEQ_MOD // 2:
+                return # Mesure déjà reçue ou plus ancienne
+            self.text_received = seq
+            theoretical = int(text[5:8])
+            voltage = float(text[9:text.index("R")])
+            real_duty = float(text[text.index("R") + 1:text.index("E")])
+            print(f"RECU - Seq:{seq:03d} | Théo:{theoretical:3d}% | Mes:{real_duty:5.1f}% | "
+                  f"Tens:{voltage:4.2f}V | Erreur:{real_duty - theoretical:+.1f}%")
+            return
+        received = float(text[1:] if text.startswith("D") else text)
+        measured = from_centi(self.calculate_real_duty(raw_q4))
+        if self.config.bidir_format == "D":
+            print(f"{name} - Théorique: {received:.1f}%, Mesuré: {measured:.1f}%, Erreur: {measured - received:.2f}%, "
+                  f"Tension: {self.voltage_mv(raw_q4) / 1000:.2f}V")
+            self.last_print = ticks_ms()
+        else:
+            print(f"{name} - Théorique: {received:.1f}%, Mesuré: {measured:.1f}%, Erreur: {measured - received:.1f}%")
+
+    def main(self):
+        config = self.config
+        print(f"{config.name or 'Pico'} - Mode bidirectionnel démarré")
+        self.start()
+        duty_cycle = config.sweep_start
+        direction = config.sweep_direction
+        fmt = config.bidir_format
+        last_display = self.last_print = ticks_ms()
+        ticker = Ticker(config.sweep_ms) if config.timer_ticks else None
+
+        while True:
+            # 1. Génération PWM et mesure locale, dès la stabilisation du filtre RC
+            centi = self.set_duty(duty_cycle)
+            raw_q4 = self.read_settled_q4()
+            measured = self.calculate_real_duty(raw_q4)
+
+            # 2. Envoi à l'autre carte, réception de ses messages
+            self.send(duty_cycle, centi, measured, raw_q4)
+            self.receive(raw_q4)
+
+            # Affichage de l'émission : format "D", seulement sans ligne reçue depuis display_ms ;
+            # formats "S" et binaire, toutes les display_ms ; format "duty", jamais
+            if fmt == "D":
+                if ticks_diff(ticks_ms(), self.last_print) > config.display_ms:
+                    print(f"{config.name or 'Pico'} - Emission: {duty_cycle}%, Tension mesurée: "
+                          f"{self.voltage_mv(raw_q4) / 1000:.2f}V ({from_centi(measured):.1f}%)")
+                    self.last_print = ticks_ms()
+            elif fmt != "duty" and ticks_diff(ticks_ms(), last_display) >= config.display_ms:
+                print(f"EMIS - Duty:{duty_cycle:3d}% | Tens:{self.voltage_mv(raw_q4) / 1000:4.2f}V | Réel:{from_centi(measured):5.1f}%")
+                last_display = ticks_ms()
+
+            # Variation du duty cycle
+            duty_cycle += direction
+            if duty_cycle >= 100 or duty_cycle <= 0:
+                duty_cycle = max(0, min(100, duty_cycle))
+                direction = -direction
+
+            if ticker is not None:
+                ticker.wait()
+            else:
+                time.sleep(config.sweep_ms / 1000)
+
+
+ROLES = {
+    "generator": Generator,
+    "validator": Validator,
+    "bidirectional": Bidirectional,
+}
+
+
+def make_station(config):
+    """Carte du rôle de config, matériel initialisé"""
+    return ROLES[config.role](config)
+
+
+def run(config):
+    """Crée la carte du rôle de config et lance sa boucle principale"""
+    make_station(config).main()
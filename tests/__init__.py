@@ -0,0 +1,3 @@
+# Tests sur PC (python -m pytest tests, ou python -m unittest discover tests) :
+# les modules du dépôt tournent sur CPython grâce à compat.py, avec les faux
+# périphériques (fake_*.py) ou les cartes simulées (sim/).
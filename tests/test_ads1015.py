@@ -0,0 +1,141 @@
+# Pilote ADS1015 (ads1015.py) sur le bus simulé : conversion unique, broche ALERT/RDY
+# échéances des attentes quand la puce ou la broche ne répondent plus, et conversions
+# perdues ou relues comptées par le pilote contre celles de la puce simulée.
+
+import unittest
+
+import compat
+from ads1015 import ADS1015, ADS1015_ADDR, MUX_AIN2, PGA_4_096, REG_CONFIG, ETIMEDOUT
+from compat import ticks_us
+from fake_i2c import FakeI2C, FakeADS1015
+
+
+class ReadyPin:
+    """Broche ALERT/RDY simulée : seul le test appelle le gestionnaire (jamais de front sinon)"""
+
+    IRQ_FALLING = 2
+
+    def irq(self, trigger=None, handler=None):
+        self.handler = handler
+
+
+class StuckADS1015(FakeADS1015):
+    """Conversion unique qui ne se termine jamais (bit OS toujours à 0)"""
+
+    def read_reg(self, reg):
+        if reg == REG_CONFIG:
+            return self.regs[REG_CONFIG]
+        return super().read_reg(reg)
+
+
+class VirtualClock:
+    """Horloge de compat indépendante de la charge du PC : chaque lecture coûte 2 µs, sleep avance le temps"""
+
+    def __init__(self):
+        self.ns = 0
+
+    def clock_ns(self):
+        self.ns += 2000
+        return self.ns
+
+    def sleep(self, seconds):
+        self.ns += int(seconds * 1000000000)
+
+    def seconds(self):
+        return self.ns / 1000000000
+
+
+class VirtualClockTest(unittest.TestCase):
+    """Pilote et puce sur une VirtualClock : échéances et comptes indépendants de la charge du PC"""
+
+    def setUp(self):
+        self.host_clock = compat._clock_ns, compat._sleep
+        self.clock = VirtualClock()
+        compat.set_host_clock(self.clock.clock_ns, self.clock.sleep)
+
+    def tearDown(self):
+        compat.set_host_clock(*self.host_clock)
+
+    def device(self, device_class=FakeADS1015):
+        return device_class(1.024, clock=self.clock.seconds)
+
+
+def make_adc(device, **kwargs):
+    return ADS1015(FakeI2C({ADS1015_ADDR: device}), ADS1015_ADDR, mux=MUX_AIN2, pga=PGA_4_096, rate=3300, **kwargs)
+
+
+class ReadSingleTest(VirtualClockTest):
+
+    def test_polls_until_done(self):
+        adc = make_adc(self.device())
+        self.assertEqual(adc.read_single(), 512)
+
+    def test_timeout(self):
+        adc = make_adc(self.device(StuckADS1015))
+        with self.assertRaises(OSError) as raised:
+            adc.read_single()
+        self.assertEqual(raised.exception.args[0], ETIMEDOUT)
+        self.assertFalse(adc.configured)
+
+
+class ReadyPinTest(VirtualClockTest):
+
+    def test_ready_signal(self):
+        pin = ReadyPin()
+        adc = make_adc(self.device(), rdy_pin=pin)
+        adc.start()
+        compat.sleep_ms(1) # Première conversion terminée (3300 SPS)
+        pin.handler(pin) # Front descendant : conversion prête
+        self.assertEqual(adc.read_raw(), 512)
+
+    def test_silent_pin_times_out(self):
+        adc = make_adc(self.device(), rdy_pin=ReadyPin())
+        with self.assertRaises(OSError) as raised:
+            adc.read_raw()
+        self.assertEqual(raised.exception.args[0], ETIMEDOUT)
+        self.assertFalse(adc.configured) # Configuration réécrite à la prochaine lecture
+
+    def test_counts_missed_edges(self):
+        pin = ReadyPin()
+        adc = make_adc(self.device(), rdy_pin=pin)
+        adc.start()
+        compat.sleep_ms(1)
+        for _ in range(3): # Trois conversions terminées, une seule lue
+            pin.handler(pin)
+        adc.read_raw()
+        self.assertEqual(adc.missed, 2)
+        self.assertEqual(adc.stale, 0)
+
+
+class CountersTest(VirtualClockTest):
+
+    def test_paced_reads(self):
+        device = self.device()
+        adc = make_adc(device)
+        for _ in range(50):
+            adc.read_raw()
+        self.assertEqual(device.stale_reads, 0) # Lectures espacées d'une période et de sa marge
+        self.assertEqual(adc.stale, 0)
+        self.assertLessEqual(abs(adc.missed - device.missed), 1)
+
+    def test_missed_after_pause(self):
+        device = self.device()
+        adc = make_adc(device)
+        adc.read_raw()
+        compat.sleep_ms(10) # Une trentaine de conversions écrasées
+        adc.read_raw()
+        self.assertGreater(device.missed, 20)
+        self.assertLessEqual(abs(adc.missed - device.missed), 1)
+
+    def test_stale_read(self):
+        device = self.device()
+        adc = make_adc(device)
+        adc.read_raw()
+        adc._due = ticks_us() # Relecture immédiate, avant la fin de la conversion suivante
+        adc.read_raw()
+        self.assertEqual(device.stale_reads, 1)
+        self.assertEqual(adc.stale, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
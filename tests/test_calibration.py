@@ -0,0 +1,145 @@
+# Calibration code ADC -> rapport cyclique (calibration.py) : précision de la table
+# sur une chaîne non idéale, contre le calcul flottant d'origine, conversion par simple
+# lecture de table, et fichier JSON.
+
+import json
+import os
+import tempfile
+import unittest
+
+from ads1015 import PGA_4_096, PGA_2_048
+from calibration import Calibration, Calibrator, ideal, load, TABLE_SIZE
+
+FULL_SCALE = 4.096
+VDD = 3.22 # Sortie PWM réelle, sous les 3,3 V supposés
+OFFSET = 12 # Décalage de l'ADC (codes)
+
+
+def code(duty):
+    """Code ADC (fractionnaire) de la chaîne non idéale pour un rapport cyclique en pourcent"""
+    return duty / 100 * VDD * 2048 / FULL_SCALE + OFFSET
+
+
+def float_duty(raw):
+    """Calcul d'origine : tension / 3,3 V en flottant"""
+    return max(0, min(100, raw * FULL_SCALE / 2048 / 3.3 * 100))
+
+
+class CountingTable:
+    """Table de calibration qui compte ses lectures"""
+
+    def __init__(self, table):
+        self.table = table
+        self.reads = 0
+
+    def __getitem__(self, index):
+        self.reads += 1
+        return self.table[index]
+
+
+def sweep(calibrator, steps=201):
+    for step in range(steps):
+        duty = step * 10000 // (steps - 1)
+        calibrator.add(duty, code(duty / 100))
+
+
+def max_error(convert):
+    return max(abs(convert(code(step / 10)) - step / 10) for step in range(1, 1000))
+
+
+class CalibrationTest(unittest.TestCase):
+
+    def test_ideal_matches_float(self):
+        table = ideal(PGA_4_096)
+        for raw in range(0, TABLE_SIZE, 7):
+            self.assertAlmostEqual(table.duty(raw), float_duty(raw), delta=0.011)
+        self.assertEqual(table.duty_centi(-5), 0)
+        self.assertEqual(table.duty_centi(TABLE_SIZE + 10), 10000)
+
+    def test_fitted_accuracy(self):
+        calibrator = Calibrator(201)
+        sweep(calibrator)
+        fitted = calibrator.fit(PGA_4_096)
+        linear = calibrator.fit_linear(PGA_4_096)
+        self.assertGreater(max_error(float_duty), 1.5) # 3,22 V et +12 codes : erreur du calcul d'origine
+        self.assertGreater(max_error(ideal(PGA_4_096).duty), 1.5)
+        self.assertLess(max_error(fitted.duty), 0.05)
+        self.assertLess(max_error(linear.duty), 0.05)
+        self.assertLessEqual(len(fitted.knots), 32)
+
+    def test_q4_interpolation(self):
+        table = Calibration([(0, 0), (1000 << 4, 10000)])
+        self.assertEqual(table.duty_centi_q4(500 << 4), 5000)
+        self.assertEqual(table.duty_centi_q4((500 << 4) + 8), 5005) # Demi-code
+        self.assertEqual(table.duty_centi_q4(-16), 0)
+        self.assertEqual(table.duty(500.5), 50.05)
+
+    def test_monotonic_and_bounded(self):
+        calibrator = Calibrator(64)
+        for step in range(64):
+            calibrator.add(step * 10000 // 63, code(step * 100 / 63) + (step % 3) * 0.5) # Bruit de mesure
+        table = calibrator.fit(PGA_4_096).table
+        self.assertEqual(min(table), 0)
+        self.assertLessEqual(max(table), 10000)
+        self.assertTrue(all(table[i] <= table[i + 1] for i in range(TABLE_SIZE)))
+
+    def test_conversion_is_one_lookup(self):
+        table = ideal(PGA_4_096)
+        table.table = CountingTable(table.table)
+        for raw in (-5, 0, 1, 700, TABLE_SIZE - 1, TABLE_SIZE, TABLE_SIZE + 10):
+            table.table.reads = 0
+            centi = table.duty_centi(raw)
+            self.assertEqual(table.table.reads, 1, raw) # Ni calcul flottant ni interpolation
+            self.assertIs(type(centi), int)
+        table.table.reads = 0
+        table.duty_centi_q4((700 << 4) + 8)
+        self.assertEqual(table.table.reads, 2) # Code fractionnaire : deux entrées voisines
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Calibration([(0, 0)])
+        calibrator = Calibrator(4)
+        for duty in (0, 5000, 10000):
+            calibrator.add(duty, 100)
+        with self.assertRaises(ValueError):
+            calibrator.fit_linear()
+        with self.assertRaises(ValueError):
+            calibrator.fit()
+
+
+class CalibrationFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "calibration.json")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, data):
+        with open(self.path, "w") as f:
+            f.write(data if isinstance(data, str) else json.dumps(data))
+
+    def test_round_trip(self):
+        calibrator = Calibrator(201)
+        sweep(calibrator)
+        fitted = calibrator.fit(PGA_4_096)
+        fitted.save(self.path)
+        loaded = load(self.path, PGA_4_096)
+        self.assertEqual(loaded.mode, "pwl")
+        self.assertEqual(loaded.knots, fitted.knots)
+        self.assertEqual(loaded.table, fitted.table)
+
+    def test_fallback_to_ideal(self):
+        self.assertEqual(load(self.path, PGA_4_096).mode, "ideal") # Fichier absent
+        ideal(PGA_4_096).save(self.path)
+        self.assertEqual(load(self.path, PGA_2_048).mode, "ideal") # Autre gain
+        for data in ("{pas du json", [1, 2], {'pga': PGA_4_096}, {'pga': PGA_4_096, 'knots': [[0, 0]]},
+                     {'pga': PGA_4_096, 'knots': [[0, 0, 0], [1, 1, 1]]}, {'pga': PGA_4_096, 'knots': 3},
+                     {'pga': PGA_4_096, 'knots': [["a", 0], [16, 100]]}):
+            self.write(data)
+            self.assertEqual(load(self.path, PGA_4_096).mode, "ideal", data)
+
+
+if __name__ == "__main__":
+    unittest.main()
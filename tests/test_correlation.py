@@ -0,0 +1,116 @@
+# Corrélation par numéro de séquence (correlation.py) : passage de 255 à 0 et
+# rebouclage des ticks sur 30 bits, doublons, réponses réordonnées, requêtes
+# expirées comptées perdues puis tardives.
+
+import unittest
+
+from compat import TICKS_PERIOD
+from correlation import InFlight, SeqTracker, seq_diff, SEQ_MOD, WINDOW
+
+NEAR_WRAP_US = TICKS_PERIOD - 500 # 0,5 ms avant le rebouclage des ticks
+
+
+def ticks(us):
+    """Instant us µs après NEAR_WRAP_US, ramené sur 30 bits"""
+    return (NEAR_WRAP_US + us) % TICKS_PERIOD
+
+
+class SeqDiffTest(unittest.TestCase):
+
+    def test_wrap(self):
+        self.assertEqual(seq_diff(0, 255), 1)
+        self.assertEqual(seq_diff(255, 0), -1)
+        self.assertEqual(seq_diff(2, 250), 8)
+        self.assertEqual(seq_diff(127, 0), 127)
+        self.assertEqual(seq_diff(128, 0), -128)
+
+
+class InFlightTest(unittest.TestCase):
+
+    def test_round_trip_across_wraps(self):
+        flight = InFlight(timeout_ms=10)
+        for i, seq in enumerate(range(250, 262)): # 250..255 puis 0..5
+            flight.add(seq, value=i, now=ticks(i * 100))
+        for i, seq in enumerate(range(250, 262)):
+            self.assertEqual(flight.match(seq % SEQ_MOD, now=ticks(i * 100 + 1000)), i)
+        self.assertEqual(flight.latencies_us(), [1000] * 12) # Ticks rebouclés entre envoi et réponse
+        self.assertEqual(flight.expire(now=ticks(100000)), 0)
+        self.assertEqual(flight.stats()['replied'], 12)
+        self.assertEqual(flight.lost + flight.reordered + flight.duplicates + flight.unknown, 0)
+
+    def test_duplicates_and_unknown(self):
+        flight = InFlight()
+        flight.add(255, value=7, now=ticks(0))
+        self.assertEqual(flight.match(255, now=ticks(200)), 7)
+        self.assertIsNone(flight.match(255, now=ticks(300)))
+        self.assertIsNone(flight.match(0, now=ticks(300))) # Jamais envoyée
+        self.assertEqual((flight.replied, flight.duplicates, flight.unknown), (1, 1, 1))
+
+    def test_reordered_replies(self):
+        flight = InFlight()
+        for seq in (254, 255, 0, 1):
+            flight.add(seq, now=ticks(0))
+        for seq in (0, 255, 1, 254): # 255 et 254 après 0 : plus anciennes malgré le rebouclage
+            flight.match(seq, now=ticks(1000))
+        self.assertEqual(flight.replied, 4)
+        self.assertEqual(flight.reordered, 2)
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_expired_then_late(self):
+        flight = InFlight(timeout_ms=1)
+        flight.add(255, value=3, now=ticks(0))
+        flight.add(0, value=4, now=ticks(800))
+        self.assertEqual(flight.expire(now=ticks(1200)), 1) # 255 expirée, 0 encore dans les temps
+        self.assertTrue(flight.pending(0))
+        self.assertFalse(flight.pending(255))
+        self.assertEqual(flight.lost, 1)
+        self.assertEqual(flight.match(255, now=ticks(1500)), 3) # Réponse tardive : plus perdue
+        self.assertEqual((flight.lost, flight.late, flight.replied), (0, 1, 1))
+        self.assertEqual(flight.expire(now=ticks(1900)), 1)
+        self.assertEqual(flight.loss_rate(), 0.5)
+        self.assertIsNone(flight.match(255, now=ticks(2000))) # Déjà servie
+        self.assertEqual(flight.duplicates, 1)
+
+    def test_overwritten_request_is_lost(self):
+        flight = InFlight()
+        for seq in range(SEQ_MOD + 1): # La séquence 0 est réutilisée sans réponse
+            flight.add(seq, now=ticks(seq))
+        self.assertEqual(flight.lost, 1)
+        self.assertEqual(flight.in_flight(), SEQ_MOD)
+
+
+class SeqTrackerTest(unittest.TestCase):
+
+    def test_in_order_across_wrap(self):
+        tracker = SeqTracker()
+        self.assertTrue(all(tracker.update(seq % SEQ_MOD) for seq in range(200, 600)))
+        self.assertEqual(tracker.newest, 599 % SEQ_MOD)
+        self.assertEqual((tracker.received, tracker.missing, tracker.reordered, tracker.duplicates), (400, 0, 0, 0))
+
+    def test_gap_then_late_arrival(self):
+        tracker = SeqTracker()
+        for seq in (253, 254, 1): # 255 et 0 sautées
+            self.assertTrue(tracker.update(seq))
+        self.assertEqual(tracker.missing, 2)
+        self.assertFalse(tracker.update(0)) # Arrivée en retard : comptée, pas appliquée
+        self.assertEqual((tracker.missing, tracker.reordered, tracker.received), (1, 1, 4))
+
+    def test_duplicates(self):
+        tracker = SeqTracker()
+        for seq in (255, 0, 1):
+            tracker.update(seq)
+        self.assertFalse(tracker.update(0))
+        self.assertFalse(tracker.update(1))
+        self.assertEqual((tracker.duplicates, tracker.reordered, tracker.received), (2, 0, 3))
+
+    def test_older_than_window(self):
+        tracker = SeqTracker()
+        tracker.update(250)
+        tracker.update((250 + WINDOW + 2) % SEQ_MOD)
+        self.assertFalse(tracker.update(251)) # Hors de la fenêtre : indiscernable d'un doublon
+        self.assertEqual(tracker.duplicates, 1)
+        self.assertEqual(tracker.missing, WINDOW + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
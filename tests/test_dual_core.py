@@ -0,0 +1,103 @@
+# Tampon circulaire SPSC et échantillonnage sur le second coeur (dual_core.py) :
+# sur PC, le coeur 1 est un thread CPython qui lit un ADS1015 simulé.
+
+import time
+import unittest
+from array import array
+
+from ads1015 import ADS1015, ADS1015_ADDR
+from dual_core import SampleRing, CoreSampler
+from fake_i2c import FakeI2C, FakeADS1015
+
+
+class SampleRingTest(unittest.TestCase):
+
+    def test_fifo_order(self):
+        ring = SampleRing(8)
+        for raw in range(5):
+            self.assertTrue(ring.push(raw, raw))
+        self.assertEqual(len(ring), 5)
+        self.assertEqual([ring.pop() for _ in range(5)], [0, 1, 2, 3, 4])
+        self.assertIsNone(ring.pop())
+
+    def test_index_wrap_around(self):
+        # Indices 16 bits : plus de 65536 échanges, par lots qui chevauchent la fin du tableau
+        ring = SampleRing(16)
+        block = array('h', bytes(2 * 16))
+        expected = 0
+        for batch in range(7000):
+            for i in range(11):
+                self.assertTrue(ring.push((expected + i) % 2000, 0))
+            self.assertEqual(ring.pop_into(block), 11)
+            self.assertEqual(list(block[:11]), [(expected + i) % 2000 for i in range(11)])
+            expected += 11
+        self.assertGreater(expected, 0x10000)
+        self.assertEqual(len(ring), 0)
+        self.assertEqual(ring.overruns, 0)
+
+    def test_overrun(self):
+        ring = SampleRing(4)
+        for raw in range(4):
+            self.assertTrue(ring.push(raw, 0))
+        self.assertFalse(ring.push(4, 0))
+        self.assertFalse(ring.push(5, 0))
+        self.assertEqual(ring.overruns, 2)
+        self.assertEqual(ring.latest(), 3) # Les plus récents sont perdus, pas les plus anciens
+        self.assertEqual(ring.pop(), 0)
+        self.assertTrue(ring.push(6, 0))
+        self.assertEqual([ring.pop() for _ in range(4)], [1, 2, 3, 6])
+
+    def test_pop_into_offset_and_discard(self):
+        ring = SampleRing(8)
+        for raw in range(6):
+            ring.push(raw, 0)
+        self.assertEqual(ring.discard(4), 2)
+        dest = array('h', bytes(2 * 6))
+        self.assertEqual(ring.pop_into(dest, 3, 2), 3)
+        self.assertEqual(list(dest), [0, 0, 2, 3, 4, 0])
+        self.assertEqual(ring.discard(), 1)
+        self.assertEqual(ring.discard(), 0)
+
+    def test_invalid_size(self):
+        for size in (0, 12, 32768):
+            with self.assertRaises(ValueError):
+                SampleRing(size)
+
+
+class CoreSamplerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FakeADS1015(1.0)
+        self.sampler = CoreSampler(ADS1015(FakeI2C({ADS1015_ADDR: self.device}), ADS1015_ADDR, rate=3300),
+                                   SampleRing(64))
+        self.sampler.start()
+
+    def tearDown(self):
+        self.sampler.stop()
+
+    def test_consumer_drains_ring(self):
+        sampler = self.sampler
+        block = array('h', bytes(2 * 8))
+        for _ in range(40):
+            time.sleep(0.005)
+            self.assertEqual(sampler.read_into(block), 8)
+            self.assertEqual(set(block), {500}) # 1 V avec ±4,096 V : 500 codes
+            self.assertEqual(sampler.read_next(), 500)
+            self.assertEqual(sampler.read_raw(), 500)
+        self.assertEqual(sampler.ring.overruns, 0)
+        self.assertLess(len(sampler.ring), sampler.ring.size)
+
+    def test_stale_ring_dropped(self):
+        # Consommateur en pause : le tampon se remplit, les lectures suivantes rendent une tension neuve
+        sampler = self.sampler
+        sampler.read_raw()
+        time.sleep(0.1)
+        self.assertGreater(sampler.ring.overruns, 0)
+        self.device.source = 2.0
+        time.sleep(0.002)
+        self.assertEqual(sampler.read_next(), 1000)
+        self.assertGreater(sampler.skipped, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
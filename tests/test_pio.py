@@ -0,0 +1,135 @@
+# Mesure du rapport cyclique par PIO (pio_duty.py) : le programme tourne dans le modèle
+# de fake_pio.py sur des PWM connus, puis PioDutyMeter sur les Pico simulées.
+
+import unittest
+
+import pio_duty
+from compat import sleep_ms
+from fake_pio import FakeStateMachine, SquareWave
+
+PWM_FREQ = 1000
+FIRST_HIGH_CYCLES = pio_duty.HIGH_OFFSET_CYCLES - 2 # Cycles non comptés en moins dans la première mesure
+
+
+def period_cycles(pwm_freq=PWM_FREQ):
+    return pio_duty.sm_freq(pwm_freq) // pwm_freq
+
+
+def measure(period, high, count=5, start_cycle=0, fifo_depth=16):
+    """Durées haute et basse décodées des count premières périodes complètes"""
+    sm = FakeStateMachine(pio_duty.duty_program, SquareWave(period, high), fifo_depth=fifo_depth,
+                          start_cycle=start_cycle)
+    return [pio_duty.decode(sm.get()) for _ in range(count)]
+
+
+class DecodeTest(unittest.TestCase):
+
+    def test_sm_freq_keeps_counters_in_16_bits(self):
+        for pwm_freq in (10, 100, 1000, 20000):
+            freq = pio_duty.sm_freq(pwm_freq)
+            self.assertLessEqual(freq, pio_duty.MAX_FREQ)
+            self.assertLess(freq // pwm_freq // pio_duty.CYCLES_PER_COUNT, 0xFFFF)
+
+    def test_decode_offsets(self):
+        self.assertEqual(pio_duty.decode(0xFFFFFFFF), (pio_duty.HIGH_OFFSET_CYCLES, pio_duty.LOW_OFFSET_CYCLES))
+        word = (0xFFFF - 100) << 16 | (0xFFFF - 50)
+        self.assertEqual(pio_duty.decode(word), (200 + pio_duty.HIGH_OFFSET_CYCLES, 100 + pio_duty.LOW_OFFSET_CYCLES))
+
+    def test_duty_centi_rounds(self):
+        self.assertEqual(pio_duty.duty_centi(1, 2), 3333)
+        self.assertEqual(pio_duty.duty_centi(2, 1), 6667)
+        self.assertEqual(pio_duty.duty_centi(1, 0), 10000)
+
+
+class StateMachineTest(unittest.TestCase):
+
+    def assert_measures(self, period, high, **kwargs):
+        expected = (high * 10000 + period // 2) // period
+        for i, (word_high, word_low) in enumerate(measure(period, high, **kwargs)):
+            # Une boucle de comptage dure CYCLES_PER_COUNT cycles : erreur d'un cycle au plus par phase.
+            # Première période : seulement wait, mov, mov avant le comptage (ni in_, in_, push)
+            first = FIRST_HIGH_CYCLES if i == 0 else 0
+            self.assertLessEqual(abs(word_high - high - first), 1, (period, high, i))
+            self.assertLessEqual(abs(word_low - (period - high)), 1, (period, high))
+            self.assertLessEqual(abs(pio_duty.duty_centi(word_high, word_low) - expected), 1, (period, high))
+
+    def test_known_duties(self):
+        period = period_cycles()
+        for pct in (1, 10, 25, 50, 75, 90, 99):
+            self.assert_measures(period, period * pct // 100)
+
+    def test_extreme_duties(self):
+        period = period_cycles()
+        self.assert_measures(period, 8)
+        self.assert_measures(period, period - 8)
+
+    def test_odd_lengths(self):
+        period = period_cycles()
+        for high in (period // 3, period // 3 + 1, period // 7 + 3):
+            self.assert_measures(period, high)
+
+    def test_start_phase(self):
+        # Démarrage n'importe où dans la période : la première mesure attend un front montant
+        period = period_cycles()
+        for start in (0, 1, period // 4, period // 2, period - 1):
+            self.assert_measures(period, period // 4, start_cycle=start)
+
+    def test_slow_pwm(self):
+        period = period_cycles(50)
+        self.assertEqual(pio_duty.sm_freq(50), 50 * pio_duty.CYCLES_PER_COUNT * pio_duty.MAX_COUNT)
+        self.assert_measures(period, period * 3 // 10)
+
+    def test_constant_signal_pushes_nothing(self):
+        for high in (0, 1000):
+            sm = FakeStateMachine(pio_duty.duty_program, SquareWave(1000, high))
+            sm.run_until(100000)
+            self.assertEqual(sm.rx_fifo(), 0)
+
+    def test_full_fifo_drops(self):
+        sm = FakeStateMachine(pio_duty.duty_program, SquareWave(1000, 400), fifo_depth=4)
+        sm.run_until(10 * 1000 + 500)
+        self.assertEqual(sm.rx_fifo(), 4)
+        self.assertGreater(sm.dropped, 0)
+        self.assertEqual(sm.pushed, 4)
+        # Les mesures conservées sont les plus anciennes, toujours exactes
+        for i in range(4):
+            high, low = pio_duty.decode(sm.get())
+            self.assertLessEqual(abs(high - 400 - (FIRST_HIGH_CYCLES if i == 0 else 0)), 1)
+            self.assertLessEqual(abs(low - 600), 1)
+
+
+class DutyMeterTest(unittest.TestCase):
+
+    def test_meter_follows_pwm(self):
+        from sim import Simulation
+        from fixed import duty_u16
+        sim = Simulation(echo=False)
+        from machine import Pin # Module simulé, installé par Simulation
+        pwm = sim.pico1.pwm(16)
+        duties = (1000, 2500, 5000, 9000)
+        results = []
+
+        def generator():
+            for centi in duties:
+                pwm.duty_u16(duty_u16(centi))
+                sleep_ms(20)
+
+        def measurer():
+            meter = pio_duty.PioDutyMeter(Pin(18, Pin.IN))
+            sleep_ms(10) # Milieu de la première consigne
+            for _ in duties:
+                results.append(meter.read_next_centi())
+                sleep_ms(20 - 3)
+            meter.stop()
+
+        sim.pico1.spawn("generator", generator)
+        sim.pico2.spawn("measurer", measurer)
+        sim.scheduler.run(0.2)
+        self.assertEqual(sim.scheduler.errors, [])
+        self.assertEqual(len(results), len(duties))
+        for measured, centi in zip(results, duties):
+            self.assertLessEqual(abs(measured - centi), 2, results)
+
+
+if __name__ == "__main__":
+    unittest.main()
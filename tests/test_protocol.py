@@ -0,0 +1,175 @@
+# Trames binaires (protocol.py) : aller-retour de chaque type de trame, CRC faux
+# et resynchronisation après des octets parasites, sur un UART simulé.
+
+import random
+import struct
+import unittest
+
+from fake_uart import FakeUART
+from protocol import (Encoder, FrameReader, finish_frame, check_frame, unpack_th, unpack_me, frame_seq,
+                      to_centi, from_centi, negotiate, SYNC, HEADER_SIZE, MAX_PAYLOAD, MAX_FRAME, BATCH_MAX_PAYLOAD,
+                      TH_FRAME_SIZE, ME_FRAME_SIZE, HELLO_FRAME, HELLO_ACK_FRAME, PROTOCOL_VERSION,
+                      TYPE_HELLO, TYPE_HELLO_ACK, TYPE_BAUD, TYPE_BAUD_ACK, TYPE_BAUD_OK, TYPE_PATTERN,
+                      TYPE_TH, TYPE_ME, TYPE_BATCH, TYPE_DATA, TYPE_ACK)
+
+ALL_TYPES = (TYPE_HELLO, TYPE_HELLO_ACK, TYPE_BAUD, TYPE_BAUD_ACK, TYPE_BAUD_OK, TYPE_PATTERN,
+             TYPE_TH, TYPE_ME, TYPE_BATCH, TYPE_DATA, TYPE_ACK)
+
+
+def frame(ftype, seq, payload):
+    buf = bytearray(HEADER_SIZE + len(payload) + 1)
+    buf[HEADER_SIZE:HEADER_SIZE + len(payload)] = payload
+    return bytes(buf[:finish_frame(buf, ftype, seq, len(payload))])
+
+
+def received(reader):
+    frames = []
+    reader.poll(lambda ftype, buf: frames.append((ftype, frame_seq(buf), bytes(buf[HEADER_SIZE:HEADER_SIZE + buf[3]]))))
+    return frames
+
+
+class EncoderTest(unittest.TestCase):
+
+    def test_th_round_trip(self):
+        uart = FakeUART()
+        encoder = Encoder()
+        reader = FrameReader(uart)
+        for duty in (0, 0.01, 12.34, 50, 99.99, 100):
+            data = encoder.pack_th(duty)
+            self.assertEqual(len(data), TH_FRAME_SIZE)
+            uart.write(data)
+            self.assertEqual(reader.read(), TYPE_TH)
+            self.assertEqual(unpack_th(reader.buf), to_centi(duty))
+            self.assertAlmostEqual(from_centi(unpack_th(reader.buf)), duty, places=2)
+
+    def test_me_round_trip(self):
+        uart = FakeUART()
+        encoder = Encoder()
+        reader = FrameReader(uart)
+        for values in ((0, 0, 0), (50, 49.63, -0.37), (100, 101.5, 1.5), (-327.68, 327.67, -12.0)):
+            uart.write(encoder.pack_me(*values, seq=42))
+            self.assertEqual(reader.read(), TYPE_ME)
+            self.assertEqual(frame_seq(reader.buf), 42) # SEQ de la trame TH
+            self.assertEqual(unpack_me(reader.buf), tuple(to_centi(value) for value in values))
+        self.assertEqual(len(encoder.pack_me_centi(1, 2, 3)), ME_FRAME_SIZE)
+
+    def test_sequence_wraps(self):
+        encoder = Encoder()
+        seqs = [frame_seq(encoder.pack_th_centi(0)) for _ in range(300)]
+        self.assertEqual(seqs[:256], list(range(256)))
+        self.assertEqual(seqs[256:], list(range(44)))
+
+    def test_to_centi_saturates(self):
+        self.assertEqual(to_centi(-0.005), -1)
+        self.assertEqual(to_centi(1000), 32767)
+        self.assertEqual(to_centi(-1000), -32768)
+
+
+class FrameReaderTest(unittest.TestCase):
+
+    def test_all_frame_types(self):
+        uart = FakeUART()
+        reader = FrameReader(uart, size=512, max_payload=BATCH_MAX_PAYLOAD)
+        sent = []
+        for i, ftype in enumerate(ALL_TYPES):
+            for length in (0, 1, MAX_PAYLOAD, BATCH_MAX_PAYLOAD if ftype == TYPE_BATCH else 7):
+                payload = bytes((i * 31 + k) & 0xFF for k in range(length))
+                sent.append((ftype, (i + length) & 0xFF, payload))
+                uart.write(frame(*sent[-1]))
+                self.assertEqual(received(reader), [sent[-1]])
+        self.assertEqual(reader.frames, len(sent))
+        self.assertEqual((reader.errors, reader.discarded, reader.overflows), (0, 0, 0))
+
+    def test_static_frames(self):
+        uart = FakeUART()
+        reader = FrameReader(uart)
+        for data, ftype in ((HELLO_FRAME, TYPE_HELLO), (HELLO_ACK_FRAME, TYPE_HELLO_ACK)):
+            self.assertEqual(data[-1:], b"\n")
+            self.assertNotIn(b"\n", data[:-1])
+            uart.write(data)
+            self.assertEqual(reader.read(), ftype)
+            self.assertEqual(reader.buf[HEADER_SIZE], PROTOCOL_VERSION)
+        self.assertEqual(reader.discarded, 1) # Le "\n" de la première trame
+        self.assertEqual(check_frame(HELLO_FRAME, len(HELLO_FRAME) - 1), TYPE_HELLO)
+
+    def test_split_across_reads(self):
+        uart = FakeUART()
+        reader = FrameReader(uart)
+        data = frame(TYPE_ME, 7, struct.pack("<hhh", 5000, 4963, -37)) * 3
+        frames = []
+        for byte in data:
+            uart.write(bytes((byte,)))
+            frames += received(reader)
+        self.assertEqual([ftype for ftype, _, _ in frames], [TYPE_ME] * 3)
+
+    def test_crc_error(self):
+        uart = FakeUART()
+        reader = FrameReader(uart)
+        good = frame(TYPE_TH, 1, struct.pack("<h", 2500))
+        for bit in range(8):
+            bad = bytearray(good)
+            bad[HEADER_SIZE] ^= 1 << bit # Charge utile corrompue
+            uart.write(bad)
+            uart.write(good)
+            self.assertEqual(received(reader), [(TYPE_TH, 1, good[HEADER_SIZE:-1])])
+        self.assertEqual(reader.errors, 8)
+        self.assertEqual(reader.frames, 8)
+
+    def test_corrupt_length(self):
+        uart = FakeUART()
+        reader = FrameReader(uart)
+        good = frame(TYPE_TH, 3, struct.pack("<h", 100))
+        bad = bytearray(good)
+        bad[3] = MAX_PAYLOAD + 1 # Longueur impossible : octet SYNC abandonné tout de suite
+        uart.write(bad + good)
+        self.assertEqual(received(reader), [(TYPE_TH, 3, good[HEADER_SIZE:-1])])
+        self.assertEqual(reader.errors, 0)
+
+    def test_resync_after_garbage(self):
+        rng = random.Random(1)
+        uart = FakeUART()
+        reader = FrameReader(uart)
+        sent = []
+        frames = []
+        for i in range(500):
+            garbage = bytes(rng.choice((SYNC, rng.randrange(256))) for _ in range(rng.randrange(6)))
+            uart.write(garbage)
+            sent.append((TYPE_ME, i & 0xFF, struct.pack("<hhh", i, -i, 7)))
+            uart.write(frame(*sent[-1]))
+            frames += received(reader)
+        self.assertEqual(reader.overflows, 0)
+        # Un SYNC parasite peut annoncer une trame plus longue que ce qui suit : au pire,
+        # la trame suivante est perdue avec lui ; jamais de trame fausse acceptée
+        self.assertGreaterEqual(len(frames), 480)
+        for got in frames:
+            self.assertIn(got, sent)
+        self.assertEqual([sent.index(got) for got in frames], sorted(sent.index(got) for got in frames))
+
+    def test_overflow(self):
+        uart = FakeUART()
+        reader = FrameReader(uart, size=64)
+        data = frame(TYPE_TH, 0, struct.pack("<h", 1)) * 20 # 140 octets d'un coup
+        reader.feed(data, len(data))
+        self.assertEqual(reader.overflows, len(data) - 64)
+        self.assertGreaterEqual(len(received(reader)), 8)
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            FrameReader(FakeUART(), size=100)
+        with self.assertRaises(ValueError):
+            FrameReader(FakeUART(), size=32, max_payload=MAX_PAYLOAD)
+        self.assertEqual(HEADER_SIZE + MAX_PAYLOAD + 1, MAX_FRAME)
+
+    def test_negotiate(self):
+        pico1, pico2 = FakeUART(), FakeUART()
+        pico1.link(pico2)
+        pico2.write(HELLO_ACK_FRAME) # Réponse de Pico 2 déjà dans le FIFO
+        self.assertTrue(negotiate(pico1, FrameReader(pico1), timeout_ms=50))
+        self.assertEqual(pico2.readline(), HELLO_FRAME)
+        silent = FakeUART()
+        silent.link(FakeUART())
+        self.assertFalse(negotiate(silent, FrameReader(silent), timeout_ms=20))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+# Balayage de plusieurs entrées de l'ADS1015 (scanner.py) et voies multiples (channels.py)
+# sur une Pico simulée : chaque canal doit recevoir sa propre tension, quelle que soit
+# la fréquence du bus.
+
+import unittest
+
+from ads1015 import ADS1015, ADS1015_ADDR, MUX_AIN2
+from compat import sleep_ms
+
+CHANNELS = ("ain2", "ain3", "ain2-ain3:2.048:1600")
+DUTIES = (0.3, 0.7)
+TOLERANCE_MV = 40
+
+
+def run_on_pico1(sim, task):
+    """Exécute task sur Pico 1 simulée ; retourne son résultat"""
+    result = []
+    sim.pico1.spawn("test", lambda: result.append(task()))
+    sim.scheduler.run(5.0)
+    for name, error in sim.scheduler.errors:
+        raise AssertionError(f"{name}: {error!r}")
+    return result[0]
+
+
+def scan(i2c_freq, conversions=300, force_pipeline=False):
+    from sim import Simulation
+    from scanner import MuxScanner
+    sim = Simulation(echo=False)
+    from machine import I2C, Pin
+
+    def task():
+        sim.pico1.pwm(16).duty_u16(int(DUTIES[0] * 65535))
+        sim.pico2.pwm(16).duty_u16(int(DUTIES[1] * 65535))
+        sleep_ms(300)
+        adc = ADS1015(I2C(1, scl=Pin(15), sda=Pin(14), freq=i2c_freq), ADS1015_ADDR)
+        scanner = MuxScanner(adc, CHANNELS, i2c_freq=i2c_freq)
+        if force_pipeline:
+            scanner.pipelined = [True] * len(CHANNELS)
+        scanner.scan(conversions)
+        return scanner
+
+    return run_on_pico1(sim, task)
+
+
+class MuxScannerTest(unittest.TestCase):
+
+    def expected_mv(self):
+        vdd_mv = 3300
+        return (DUTIES[0] * vdd_mv, DUTIES[1] * vdd_mv, (DUTIES[0] - DUTIES[1]) * vdd_mv)
+
+    def check_channels(self, scanner):
+        for k, expected in enumerate(self.expected_mv()):
+            for _, code in scanner.samples(k)[-20:]:
+                self.assertAlmostEqual(scanner.mv(k, code), expected, delta=TOLERANCE_MV, msg=CHANNELS[k])
+
+    def test_400khz_pipelined(self):
+        scanner = scan(400000)
+        self.assertEqual(scanner.pipelined, [True, True, True])
+        self.assertEqual(scanner.collisions, 0)
+        self.check_channels(scanner)
+
+    def test_100khz_reads_before_start(self):
+        # Une lecture (480 µs) ne tient pas dans une conversion à 3300 éch/s
+        scanner = scan(100000)
+        self.assertEqual(scanner.pipelined, [False, False, False])
+        self.check_channels(scanner)
+
+    def test_collision_detected(self):
+        # Ordre forcé à 100 kHz : les lectures trop longues sont jetées, les valeurs restent justes
+        scanner = scan(100000, force_pipeline=True)
+        self.assertGreater(scanner.collisions, 0)
+        self.check_channels(scanner)
+
+    def test_parse_channel(self):
+        from scanner import parse_channel
+        from ads1015 import MUX_AIN0_AIN1, PGA_2_048
+        self.assertEqual(parse_channel("ain0-ain1:2.048:1600"), (MUX_AIN0_AIN1, PGA_2_048, 1600))
+        with self.assertRaises(ValueError):
+            parse_channel("ain4")
+        with self.assertRaises(ValueError):
+            parse_channel("ain2:4.096:3000")
+
+
+class ChannelManagerTest(unittest.TestCase):
+
+    def test_100khz_two_devices(self):
+        from sim import Simulation, RCFilter, AnalogInput
+        from channels import ChannelManager
+        sim = Simulation(echo=False)
+        from machine import I2C, Pin
+        rc = RCFilter(sim.pico1.pwm(18), 0.02)
+        sim.pico1.attach_ads1015(1, 0x49, {MUX_AIN2: AnalogInput(rc.voltage, 0.002, seed=1)})
+        duties = (2000, 6500)
+
+        def task():
+            manager = ChannelManager(I2C(1, scl=Pin(15), sda=Pin(14), freq=100000),
+                                     [(16, 0x48, MUX_AIN2), (18, 0x49, MUX_AIN2)], i2c_freq=100000)
+            for k, duty in enumerate(duties):
+                manager.set_duty(k, duty)
+            sleep_ms(300)
+            manager.run(200)
+            return manager
+
+        manager = run_on_pico1(sim, task)
+        self.assertEqual(sum(manager.reads.values()), 200)
+        for k, duty in enumerate(duties):
+            self.assertAlmostEqual(manager.mv(k, manager.latest(k)[0]), duty * 3300 / 10000, delta=TOLERANCE_MV)
+
+    def test_shared_pwm_output(self):
+        from sim import Simulation
+        from channels import ChannelManager
+        sim = Simulation(echo=False)
+        from machine import I2C, Pin
+
+        def task():
+            with self.assertRaises(ValueError):
+                ChannelManager(I2C(1, scl=Pin(15), sda=Pin(14)), [(0, 0x48, MUX_AIN2), (16, 0x49, MUX_AIN2)])
+            with self.assertRaises(ValueError):
+                ChannelManager(I2C(1, scl=Pin(15), sda=Pin(14)), [(16, 0x47, MUX_AIN2)])
+            return True
+
+        self.assertTrue(run_on_pico1(sim, task))
+
+
+if __name__ == "__main__":
+    unittest.main()
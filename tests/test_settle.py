@@ -0,0 +1,68 @@
+# Détection de la stabilisation du filtre RC (settle.py) sur une exponentielle
+# synthétique, lectures horodatées explicitement.
+
+import math
+import unittest
+
+from settle import SettlingDetector
+
+TAU_US = 20000
+PERIOD_US = 300
+FINAL = 1000
+
+
+def code(t_us):
+    return round(FINAL * (1 - math.exp(-t_us / TAU_US)))
+
+
+def feed(detector, gaps=()):
+    """Lectures toutes les PERIOD_US depuis t = 0 ; gaps : {numéro de lecture: retard ajouté (µs)}"""
+    detector.reset()
+    detector.start = 0
+    t = 0
+    n = 0
+    while not detector.feed(code(t), t):
+        n += 1
+        t += PERIOD_US + dict(gaps).get(n, 0)
+    return t
+
+
+class SettlingDetectorTest(unittest.TestCase):
+
+    def test_extrapolates_before_plateau(self):
+        extrapolated = SettlingDetector()
+        t = feed(extrapolated)
+        plateau = SettlingDetector(extrapolate=False)
+        t_plateau = feed(plateau)
+        self.assertAlmostEqual(extrapolated.value, FINAL, delta=extrapolated.tolerance)
+        self.assertLess(t, t_plateau)
+        self.assertEqual(extrapolated.uneven, 0)
+        self.assertEqual(extrapolated.value_q4 >> 4, int(extrapolated.value))
+
+    def test_plateau(self):
+        detector = SettlingDetector(extrapolate=False)
+        feed(detector)
+        self.assertAlmostEqual(detector.value, FINAL, delta=4 * detector.tolerance) # Plateau : en retard sur l'exponentielle
+
+    def test_uneven_blocks_skip_extrapolation(self):
+        # Deux lectures retardées de 2,7 ms (lecture filtrée du callback de timer) dans les
+        # premiers blocs : sans horodatage des blocs, deux extrapolations fausses concordaient
+        # (valeur finale à -218 codes)
+        detector = SettlingDetector()
+        feed(detector, {12: 2700, 25: 2700}.items())
+        self.assertGreater(detector.uneven, 0)
+        self.assertAlmostEqual(detector.value, FINAL, delta=4 * detector.tolerance) # Plateau : en retard sur l'exponentielle
+
+    def test_timeout(self):
+        detector = SettlingDetector(timeout_ms=5)
+        detector.reset()
+        detector.start = 0
+        t = 0
+        while not detector.feed(code(t * 100), t):
+            t += PERIOD_US
+        self.assertTrue(detector.timed_out)
+        self.assertGreaterEqual(detector.settle_us, 5000)
+
+
+if __name__ == "__main__":
+    unittest.main()
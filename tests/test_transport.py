@@ -0,0 +1,138 @@
+# Transport fiable (transport.py) sur une liaison série virtuelle : pertes, trames
+# réordonnées, dupliquées ou corrompues, récepteur lent. Temps virtuel en µs
+# (argument now), sans attente réelle.
+
+import random
+import unittest
+
+from protocol import Encoder, check_frame, unpack_th, frame_seq, TYPE_TH
+from transport import ReliableLink
+
+
+class LossyLine:
+    """Sens unique de la liaison : chaque trame arrive après delay_us ± jitter_us (donc parfois
+    avant la précédente), ou pas du tout, en double ou avec un octet faux"""
+
+    def __init__(self, rng, loss=0.0, duplicate=0.0, corrupt=0.0, delay_us=2000, jitter_us=0):
+        self.rng = rng
+        self.loss = loss
+        self.duplicate = duplicate
+        self.corrupt = corrupt
+        self.delay_us = delay_us
+        self.jitter_us = jitter_us
+        self.now = 0
+        self.queue = []
+        self.written = 0
+        self.dropped = 0
+        self.reordered = 0 # Trames arrivées après une trame écrite plus tard
+        self._last = -1
+
+    def write(self, frame):
+        data = bytearray(frame)
+        rng = self.rng
+        if rng.random() < self.loss:
+            self.dropped += 1
+            return
+        if rng.random() < self.corrupt:
+            data[rng.randrange(1, len(data))] ^= 1 << rng.randrange(8)
+        copies = 2 if rng.random() < self.duplicate else 1
+        for _ in range(copies):
+            self.queue.append((self.now + self.delay_us + rng.randint(-self.jitter_us, self.jitter_us), self.written, bytes(data)))
+        self.written += 1
+
+    def deliver(self, now, link):
+        due = sorted(item for item in self.queue if item[0] <= now) # Ordre d'arrivée
+        if not due:
+            return
+        self.queue = [item for item in self.queue if item[0] > now]
+        for _, index, data in due:
+            if index < self._last:
+                self.reordered += 1
+            self._last = max(self._last, index)
+            ftype = check_frame(data, len(data)) # Comme FrameReader : CRC faux, trame ignorée
+            if ftype > 0:
+                link.on_frame(ftype, data, now)
+
+
+def run(messages=300, seed=1, window=4, inbox=8, receive_every_us=0, step_us=100, limit_us=60000000, trace=None, **line):
+    """Envoie messages trames TH de sender à receiver ; trace (dict) reçoit le plus petit crédit vu
+    par l'émetteur et le plus grand nombre de trames en vol"""
+    rng = random.Random(seed)
+    forward = LossyLine(rng, **line)
+    backward = LossyLine(rng, **line)
+    sender = ReliableLink(forward.write, window=window, timeout_ms=10, inbox=inbox)
+    receiver = ReliableLink(backward.write, window=window, timeout_ms=10, inbox=inbox)
+    encoder = Encoder()
+    received = []
+    next_value = 0
+    last_receive = 0
+    now = 0
+    while len(received) < messages and now < limit_us:
+        now += step_us
+        forward.now = backward.now = now
+        while next_value < messages and sender.can_send(): # Trame construite seulement si elle part (SEQ du codeur)
+            sender.send(encoder.pack_th_centi(next_value), now)
+            next_value += 1
+        forward.deliver(now, receiver)
+        backward.deliver(now, sender)
+        if now - last_receive >= receive_every_us:
+            last_receive = now
+            frame = receiver.receive()
+            if frame is not None:
+                received.append((frame[1], frame_seq(frame), unpack_th(frame)))
+        sender.poll(now)
+        receiver.poll(now)
+        if trace is not None:
+            trace['min_credit'] = min(trace.get('min_credit', inbox), sender.credit)
+            trace['max_in_flight'] = max(trace.get('max_in_flight', 0), sender.in_flight())
+    return received, sender, receiver, forward
+
+
+class ReliableLinkTest(unittest.TestCase):
+
+    def check_in_order(self, received, messages=300):
+        self.assertEqual([value for _, _, value in received], list(range(messages)))
+        self.assertEqual({ftype for ftype, _, _ in received}, {TYPE_TH})
+        self.assertEqual([seq for _, seq, _ in received], [i & 0xFF for i in range(messages)]) # SEQ d'origine gardé
+
+    def test_clean_line(self):
+        received, sender, receiver, _ = run()
+        self.check_in_order(received)
+        self.assertEqual(sender.retransmits, 0)
+        self.assertEqual(receiver.duplicates, 0)
+
+    def test_loss(self):
+        received, sender, receiver, forward = run(loss=0.1)
+        self.check_in_order(received)
+        self.assertGreater(forward.dropped, 0)
+        self.assertGreater(sender.retransmits, 0)
+        self.assertEqual(receiver.delivered, 300)
+
+    def test_reordering_and_duplicates(self):
+        received, sender, receiver, forward = run(jitter_us=1500, duplicate=0.05)
+        self.check_in_order(received)
+        self.assertGreater(forward.reordered, 0)
+        self.assertGreater(receiver.out_of_order + receiver.duplicates, 0)
+
+    def test_loss_reordering_corruption(self):
+        for seed in range(5):
+            received, sender, receiver, _ = run(seed=seed, loss=0.05, corrupt=0.05, duplicate=0.02, jitter_us=1500, window=8)
+            self.check_in_order(received)
+
+    def test_backpressure(self):
+        # Récepteur lent (une trame toutes les 2 ms) : le crédit freine l'émetteur, rien n'est refusé
+        trace = {}
+        received, sender, receiver, _ = run(messages=100, receive_every_us=2000, inbox=4, window=8, trace=trace)
+        self.check_in_order(received, 100)
+        self.assertEqual(trace['min_credit'], 0)
+        self.assertLessEqual(trace['max_in_flight'], 4) # Fenêtre de 8, bornée par la boîte du récepteur
+        self.assertEqual(receiver.refused, 0)
+
+    def test_invalid_window(self):
+        for window in (0, 128):
+            with self.assertRaises(ValueError):
+                ReliableLink(window=window)
+
+
+if __name__ == "__main__":
+    unittest.main()
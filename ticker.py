@@ -0,0 +1,113 @@
+# Cadencement par interruption de timer (machine.Timer) au lieu de time.time() et time.sleep.
+# time.time() n'a qu'une résolution d'une seconde et une boucle "travail + pause"
+# dérive de la durée du travail : la période réelle n'est jamais celle annoncée.
+# Ici, un timer matériel périodique déclenche une interruption dont le seul travail
+# est d'horodater le tick (ticks_us) dans un tableau préalloué, de compter les ticks
+# non traités et, si un traitement est associé, de le programmer avec
+# micropython.schedule : il s'exécute hors interruption, entre deux instructions du
+# programme principal, et peut donc allouer, lire l'I2C ou afficher.
+#
+# Sans traitement associé, la boucle principale consomme les ticks avec wait()
+# (attente en machine.idle) ou ready() ; une tâche uasyncio peut attendre le
+# ThreadSafeFlag passé dans flag, levé par l'interruption.
+#
+# Gigue : écart entre deux ticks successifs et la période, d'après les horodatages
+# des interruptions ; latence : délai entre l'interruption et le début du traitement.
+
+from array import array
+
+from compat import ticks_us, ticks_diff, micropython
+
+
+class Ticker:
+    """Tick périodique d'un machine.Timer, horodaté dans l'interruption.
+
+    handler() est appelé hors interruption (micropython.schedule) à chaque tick ;
+    sans handler, les ticks s'accumulent dans pending jusqu'à ready() ou wait().
+    Compteurs : ticks, overruns (tick arrivé avant le traitement du précédent :
+    handler trop long ou boucle en retard) et latency_max_us (interruption ->
+    début du handler).
+    """
+
+    def __init__(self, period_ms, handler=None, flag=None, history=64, timer_id=-1):
+        from machine import Timer, disable_irq, enable_irq
+        self.period_ms = period_ms
+        self.period_us = period_ms * 1000
+        self.handler = handler
+        self.flag = flag # asyncio.ThreadSafeFlag levé à chaque tick (MicroPython)
+        self._disable_irq = disable_irq
+        self._enable_irq = enable_irq
+        self._stamps = array('i', bytes(4 * history)) # Horodatage des derniers ticks (circulaire)
+        self._head = 0
+        self._scheduled = False
+        self._run_ref = self._run # Méthode liée créée une fois : l'interruption ne doit pas allouer
+        self.pending = 0
+        self.ticks = 0
+        self.overruns = 0
+        self.latency_max_us = 0
+        self._latency_sum_us = 0
+        self._handled = 0
+        self.timer = Timer(timer_id, mode=Timer.PERIODIC, period=period_ms, callback=self._irq, hard=True)
+
+    def _irq(self, timer):
+        # Interruption matérielle : ni allocation ni appel bloquant
+        i = self._head
+        self._stamps[i] = ticks_us()
+        self._head = i + 1 if i + 1 < len(self._stamps) else 0
+        self.ticks += 1
+        if self.pending:
+            self.overruns += 1
+        self.pending += 1
+        if self.flag is not None:
+            self.flag.set()
+        if self.handler is not None and not self._scheduled:
+            self._scheduled = True # Un seul appel en file : la file de micropython.schedule est courte
+            micropython.schedule(self._run_ref, i)
+
+    def _run(self, index):
+        latency = ticks_diff(ticks_us(), self._stamps[index])
+        if latency > self.latency_max_us:
+            self.latency_max_us = latency
+        self._latency_sum_us += latency
+        self._handled += 1
+        self.ready()
+        self._scheduled = False
+        self.handler()
+
+    def ready(self):
+        """Nombre de ticks arrivés depuis le dernier appel (0 si aucun)"""
+        state = self._disable_irq()
+        count = self.pending
+        self.pending = 0
+        self._enable_irq(state)
+        return count
+
+    def wait(self):
+        """Attend le prochain tick (rend tout de suite si un tick n'a pas été consommé) ; retourne le nombre de ticks"""
+        from machine import idle
+        while not self.pending:
+            idle() # Processeur en veille jusqu'à la prochaine interruption
+        return self.ready()
+
+    def stop(self):
+        self.timer.deinit()
+
+    def jitter_us(self):
+        """Écarts (µs) entre les intervalles des derniers ticks et la période"""
+        stamps = self._stamps
+        size = len(stamps)
+        n = min(self.ticks, size)
+        first = self._head - n
+        return [abs(ticks_diff(stamps[(first + i) % size], stamps[(first + i - 1) % size]) - self.period_us)
+                for i in range(1, n)]
+
+    def stats(self):
+        jitter = sorted(self.jitter_us())
+        return {
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'jitter_p95_us': jitter[min(len(jitter) - 1, len(jitter) * 95 // 100)] if jitter else None,
+            'jitter_max_us': jitter[-1] if jitter else None,
+            'latency_mean_us': self._latency_sum_us // self._handled if self._handled else None,
+            'latency_max_us': self.latency_max_us,
+        }
@@ -0,0 +1,213 @@
+# Transport fiable à fenêtre glissante sur la liaison UART (Go-Back-N).
+# Sans lui, une trame TH ou ME corrompue est simplement perdue, et si Pico 1
+# émet plus vite que Pico 2 ne traite, le FIFO de réception déborde.
+#
+# Chaque trame applicative (TH, ME) est encapsulée dans une trame DATA :
+#   SYNC | TYPE_DATA | SEQ transport | LEN | type, seq et charge utile d'origine | CRC-8
+# Le SEQ d'origine est conservé : la corrélation TH/ME (correlation.py) est inchangée.
+# Le récepteur n'accepte que la trame attendue, la range dans sa boîte de réception
+# (inbox) et répond par une trame ACK :
+#   SYNC | TYPE_ACK | prochain SEQ attendu | 1 | crédit | CRC-8
+# Le crédit est le nombre de places libres de la boîte : l'émetteur n'envoie jamais
+# plus que min(window, crédit) trames non acquittées. Un récepteur lent freine donc
+# l'émetteur (contre-pression) au lieu de perdre des trames. Sans acquittement après
+# timeout_ms, toutes les trames en vol sont réémises (délai doublé à chaque échec,
+# jusqu'à 8 fois) ; cette réémission sert aussi de sonde quand le crédit est nul.
+#
+# Les deux cartes doivent utiliser le transport (même réglage dans les deux scripts).
+
+from array import array
+
+from compat import ticks_us, ticks_diff
+from protocol import (SYNC, TYPE_DATA, TYPE_ACK, HEADER_SIZE, MAX_PAYLOAD, MAX_FRAME,
+                      finish_frame)
+from correlation import seq_diff
+
+MAX_WINDOW = 127 # Moins de la moitié des 256 séquences (comparaisons par seq_diff)
+MAX_BACKOFF = 3 # Délai de réémission multiplié au plus par 2**3
+
+
+class ReliableLink:
+    """Émission et réception fiables, dans l'ordre, de trames du protocole.
+
+    write(frame) transmet une trame sur la ligne (uart.write, ou la file d'émission
+    d'un runtime). Compteurs : sent (trames nouvelles), retransmits, acked,
+    timeouts, delivered, duplicates (trames déjà reçues), out_of_order (trames en
+    avance, ignorées), refused (boîte pleine) et stalls (send refusé faute de place).
+    """
+
+    def __init__(self, write=None, window=4, timeout_ms=200, inbox=8):
+        if not 0 < window <= MAX_WINDOW:
+            raise ValueError(f"Fenetre de transport invalide: {window}")
+        self.write = write
+        self.window = window
+        self.timeout_us = timeout_ms * 1000
+        self._slots = [bytearray(MAX_FRAME) for _ in range(window)] # Trames DATA en vol, prêtes à réémettre
+        self._sizes = array('B', bytes(window))
+        self._inbox = [bytearray(MAX_FRAME) for _ in range(inbox)] # Trames reçues, format d'origine (sans CRC)
+        for inner in self._inbox:
+            inner[0] = SYNC
+        self._ack = bytearray(HEADER_SIZE + 2)
+        self.reset()
+
+    def reset(self):
+        """Repart des séquences 0 (l'autre carte a redémarré)"""
+        self._base = 0 # Plus ancienne séquence non acquittée
+        self._next = 0 # Prochaine séquence à émettre
+        self._head = 0 # Emplacement de la trame _base
+        self._timer = 0
+        self._backoff = 0
+        self.credit = len(self._inbox) # Dernier crédit annoncé par le récepteur distant
+        self._expected = 0 # Prochaine séquence attendue en réception
+        self._in_head = 0
+        self._in_count = 0
+        self._advertised = len(self._inbox)
+        self.sent = 0
+        self.retransmits = 0
+        self.acked = 0
+        self.timeouts = 0
+        self.delivered = 0
+        self.duplicates = 0
+        self.out_of_order = 0
+        self.refused = 0
+        self.stalls = 0
+
+    # Émission
+
+    def in_flight(self):
+        """Trames émises non encore acquittées"""
+        return (self._next - self._base) & 0xFF
+
+    def can_send(self):
+        """Vrai si la fenêtre et le crédit du récepteur autorisent une nouvelle trame"""
+        return self.in_flight() < min(self.window, self.credit)
+
+    def send(self, frame, now=None):
+        """Encapsule et émet une trame du protocole ; False si la fenêtre est pleine (réessayer plus tard)"""
+        if not self.can_send():
+            self.stalls += 1
+            return False
+        length = frame[3]
+        if length + 2 > MAX_PAYLOAD:
+            raise ValueError(f"Trame trop longue pour le transport: {length}")
+        slot_index = (self._head + self.in_flight()) % self.window
+        slot = self._slots[slot_index]
+        slot[HEADER_SIZE] = frame[1] # Type d'origine
+        slot[HEADER_SIZE + 1] = frame[2] # Séquence d'origine
+        for i in range(length):
+            slot[HEADER_SIZE + 2 + i] = frame[HEADER_SIZE + i]
+        size = finish_frame(slot, TYPE_DATA, self._next, length + 2)
+        self._sizes[slot_index] = size
+        if self._next == self._base: # Fenêtre vide : le minuteur part de cette trame
+            self._timer = ticks_us() if now is None else now
+        self._next = (self._next + 1) & 0xFF
+        self.sent += 1
+        self.write(memoryview(slot)[:size])
+        return True
+
+    def poll(self, now=None):
+        """Réémet les trames en vol si l'acquittement tarde ; retourne le nombre de trames réémises"""
+        count = self.in_flight()
+        first = self._head
+        if not count:
+            if self.credit or not self.sent:
+                return 0
+            # Crédit nul et rien en vol : si l'annonce de réouverture s'est perdue, la dernière
+            # trame acquittée sert de sonde (le récepteur répond au doublon avec son crédit)
+            count = 1
+            first = (self._head - 1) % self.window
+        if now is None:
+            now = ticks_us()
+        if ticks_diff(now, self._timer) < self.timeout_us << self._backoff:
+            return 0
+        self.timeouts += 1
+        if self._backoff < MAX_BACKOFF:
+            self._backoff += 1
+        for i in range(count):
+            slot_index = (first + i) % self.window
+            self.write(memoryview(self._slots[slot_index])[:self._sizes[slot_index]])
+        self.retransmits += count
+        self._timer = now
+        return count
+
+    def _on_ack(self, buf, now):
+        credit = buf[HEADER_SIZE]
+        acked = seq_diff(buf[2], self._base)
+        if 0 < acked <= self.in_flight() or (credit and not self.credit):
+            self._backoff = 0
+            self._timer = ticks_us() if now is None else now # Minuteur relancé pour les trames restantes
+        if 0 < acked <= self.in_flight():
+            self._base = buf[2]
+            self._head = (self._head + acked) % self.window
+            self.acked += acked
+        self.credit = credit
+
+    # Réception
+
+    def _send_ack(self):
+        free = len(self._inbox) - self._in_count
+        buf = self._ack
+        buf[HEADER_SIZE] = free
+        size = finish_frame(buf, TYPE_ACK, self._expected, 1)
+        self._advertised = free
+        self.write(memoryview(buf)[:size])
+
+    def _on_data(self, buf):
+        offset = seq_diff(buf[2], self._expected)
+        if offset == 0:
+            if self._in_count == len(self._inbox):
+                self.refused += 1 # Plus de place : l'émetteur réémettra
+            else:
+                inner = self._inbox[(self._in_head + self._in_count) % len(self._inbox)]
+                length = buf[3] - 2
+                inner[1] = buf[HEADER_SIZE] # Trame d'origine : type, séquence, longueur, charge utile
+                inner[2] = buf[HEADER_SIZE + 1]
+                inner[3] = length
+                for i in range(length):
+                    inner[HEADER_SIZE + i] = buf[HEADER_SIZE + 2 + i]
+                self._in_count += 1
+                self._expected = (self._expected + 1) & 0xFF
+        elif offset < 0:
+            self.duplicates += 1 # Acquittement perdu : on acquitte à nouveau
+        else:
+            self.out_of_order += 1 # Une trame précédente manque (Go-Back-N : réémission à venir)
+        self._send_ack()
+
+    def on_frame(self, ftype, buf, now=None):
+        """Traite une trame DATA ou ACK reçue ; False pour les autres types (à traiter par l'appelant)"""
+        if ftype == TYPE_DATA:
+            self._on_data(buf)
+            return True
+        if ftype == TYPE_ACK:
+            self._on_ack(buf, now)
+            return True
+        return False
+
+    def pending(self):
+        """Trames reçues en attente dans la boîte de réception"""
+        return self._in_count
+
+    def receive(self):
+        """Prochaine trame reçue, dans l'ordre (tampon valable jusqu'au prochain appel), ou None"""
+        if not self._in_count:
+            return None
+        inner = self._inbox[self._in_head]
+        self._in_head = (self._in_head + 1) % len(self._inbox)
+        self._in_count -= 1
+        self.delivered += 1
+        if not self._advertised: # L'émetteur attend une place : on la lui annonce
+            self._send_ack()
+        return inner
+
+    def stats(self):
+        return {
+            'sent': self.sent,
+            'retransmits': self.retransmits,
+            'acked': self.acked,
+            'timeouts': self.timeouts,
+            'delivered': self.delivered,
+            'duplicates': self.duplicates,
+            'out_of_order': self.out_of_order,
+            'refused': self.refused,
+            'stalls': self.stalls,
+        }